@@ -0,0 +1,119 @@
+# catalogo_precos.py
+"""
+Tabela de preços dos produtos em memória para o registro de pedidos.
+
+Antes cada item do pedido fazia um ``GET produtostodos/{id}`` para saber o
+``Valor_Prod``, um depois do outro. Aqui o catálogo é baixado uma vez
+(``listar_produtos``) e vira uma ``pd.Series`` ``id_Prod -> Valor_Prod``;
+os itens de um pedido são precificados todos de uma vez com ``map``.
+
+- Cada carga gera uma nova versão imutável (``Snapshot``): quem está
+  precificando um pedido usa a mesma versão do início ao fim, mesmo que
+  outra thread recarregue o catálogo no meio.
+- O catálogo é recarregado quando passa de ``CATALOGO_TTL`` segundos. Este
+  processo não recebe aviso de produto alterado (o cadastro é feito no
+  PDV), então o TTL é o único caminho de atualização de preço: um preço
+  alterado vale para os pedidos no máximo ``CATALOGO_TTL`` segundos depois.
+- Produto que não está na versão atual força uma recarga (produto novo);
+  se ainda assim não aparecer, cai na consulta individual de antes.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Iterable, List, NamedTuple, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CATALOGO_TTL = float(os.getenv("CATALOGO_TTL", "60"))  # segundos
+# Intervalo mínimo entre recargas provocadas por produto ausente
+CATALOGO_RECARGA_MIN = float(os.getenv("CATALOGO_RECARGA_MIN", "30"))
+
+
+class Snapshot(NamedTuple):
+    versao: int
+    carregado_em: float
+    precos: pd.Series  # índice: id_Prod (str)
+
+
+def _tabela_precos(produtos: Any) -> pd.Series:
+    df = pd.DataFrame(produtos if isinstance(produtos, list) else [])
+    if df.empty or "id_Prod" not in df.columns or "Valor_Prod" not in df.columns:
+        return pd.Series(dtype=float)
+    precos = pd.Series(pd.to_numeric(df["Valor_Prod"], errors="coerce").values, index=df["id_Prod"].astype(str))
+    return precos[~precos.index.duplicated(keep="last")]
+
+
+class CatalogoPrecos:
+    def __init__(self, produtos_api, ttl: float = CATALOGO_TTL):
+        self.produtos_api = produtos_api
+        self.ttl = ttl
+        self._snapshot: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def versao(self) -> int:
+        return self._snapshot.versao if self._snapshot else 0
+
+    def _carregar(self) -> Snapshot:
+        """Baixa o catálogo inteiro e publica uma nova versão (chamar com ``_lock``)."""
+        produtos = self.produtos_api.listar_produtos()
+        if produtos is None and self._snapshot is not None:
+            # API fora do ar: segue com a versão anterior e tenta de novo na próxima
+            logger.warning("Falha ao recarregar o catálogo; usando a versão anterior")
+            return self._snapshot
+        self._snapshot = Snapshot(self.versao + 1, time.monotonic(), _tabela_precos(produtos))
+        logger.info(f"Catálogo de preços carregado: versão {self._snapshot.versao}, "
+                    f"{len(self._snapshot.precos)} produto(s)")
+        return self._snapshot
+
+    def atual(self) -> Snapshot:
+        """Versão em uso, recarregada se expirou."""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.carregado_em < self.ttl:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.monotonic() - snapshot.carregado_em >= self.ttl:
+                snapshot = self._carregar()
+            return snapshot
+
+    def _recarregar_se_antigo(self, snapshot: Snapshot) -> Snapshot:
+        with self._lock:
+            if self._snapshot is not snapshot:
+                return self._snapshot  # outra thread já recarregou
+            if time.monotonic() - snapshot.carregado_em < CATALOGO_RECARGA_MIN:
+                return snapshot
+            return self._carregar()
+
+    def precos(self, ids: Iterable[Any]) -> List[Optional[float]]:
+        """Preço de cada ``id_Prod`` (None se o produto não existir), na mesma ordem."""
+        chaves = pd.Series(list(ids), dtype=object).astype(str)
+        if chaves.empty:
+            return []
+        snapshot = self.atual()
+        valores = chaves.map(snapshot.precos)
+        if valores.isna().any():
+            snapshot = self._recarregar_se_antigo(snapshot)
+            valores = chaves.map(snapshot.precos)
+        resultado = [None if pd.isna(v) else float(v) for v in valores]
+        # Ainda ausentes: consulta individual (produto criado depois da última carga)
+        for i, valor in enumerate(resultado):
+            if valor is None:
+                resultado[i] = self._preco_individual(chaves.iloc[i])
+        return resultado
+
+    def _preco_individual(self, produto_id: str) -> Optional[float]:
+        try:
+            produto = self.produtos_api.obter_produto(produto_id)
+        except Exception as e:
+            logger.warning(f"Erro ao buscar produto {produto_id}: {e}")
+            return None
+        if not produto:
+            return None
+        try:
+            return float(produto.get("Valor_Prod", 0.0))
+        except (TypeError, ValueError):
+            return None
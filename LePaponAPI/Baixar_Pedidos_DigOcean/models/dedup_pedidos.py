@@ -0,0 +1,149 @@
+# dedup_pedidos.py
+"""
+Registro de pedidos já processados (deduplicação).
+
+Substitui o ``set`` em memória de ``websocket_pedido``, que perdia tudo ao
+reiniciar e era podado com ``set.pop()`` (elementos arbitrários):
+
+- as chaves ficam num ``OrderedDict`` em ordem de inserção, com o horário
+  em que foram marcadas: consulta e marcação O(1), e as mais antigas saem
+  primeiro, seja por expirar (``PEDIDOS_DEDUP_TTL``), seja por passar do
+  limite de memória (``PEDIDOS_DEDUP_MAX``);
+- opcionalmente as chaves são gravadas num SQLite pequeno
+  (``PEDIDOS_DEDUP_PATH``; vazio desliga), recarregado na inicialização;
+- a chave de um item é o id do servidor (``id``) quando existe, senão um
+  hash do conteúdo (telefone, data, hora, produto, quantidade, observação).
+
+``websocket_pedido`` e ``salvar_pedido.PedidoManager`` usam a mesma
+instância (``get_dedup()``), o mesmo arquivo e as mesmas chaves
+(``chave_item``). A existência de um pedido na API local é sempre
+conferida na própria API; o registro só evita reprocessar itens.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PEDIDOS_DEDUP_TTL = float(os.getenv("PEDIDOS_DEDUP_TTL", str(3 * 24 * 3600)))  # segundos
+PEDIDOS_DEDUP_MAX = int(os.getenv("PEDIDOS_DEDUP_MAX", "10000"))
+PEDIDOS_DEDUP_PATH = os.getenv(
+    "PEDIDOS_DEDUP_PATH", os.path.join(_BASE_DIR, "..", "storage", "pedidos_processados.sqlite3")
+)
+
+CAMPOS_CONTEUDO = ("fone", "data", "hora", "id_Prod", "qtd", "observ")
+
+
+def chave_item(item: Dict[str, Any]) -> str:
+    """Id do servidor, ou hash do conteúdo quando o item não tem id."""
+    if item.get("id") not in (None, ""):
+        return f"id:{item['id']}"
+    conteudo = json.dumps([str(item.get(c, "")) for c in CAMPOS_CONTEUDO], ensure_ascii=False)
+    return "hash:" + hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+
+
+class DedupPedidos:
+    def __init__(self, ttl: float = PEDIDOS_DEDUP_TTL, max_itens: int = PEDIDOS_DEDUP_MAX,
+                 path: Optional[str] = PEDIDOS_DEDUP_PATH):
+        self.ttl = ttl
+        self.max_itens = max(1, max_itens)
+        self.path = path or None
+        self._chaves: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if self.path:
+            try:
+                self._abrir()
+            except sqlite3.Error as e:
+                logger.warning(f"Dedup sem persistência ({self.path}): {e}")
+                self._conn = None
+
+    # --- Persistência ---
+    def _abrir(self) -> None:
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS processados (chave TEXT PRIMARY KEY, marcado REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_processados_marcado ON processados (marcado)")
+            conn.execute("DELETE FROM processados WHERE marcado < ?", (time.time() - self.ttl,))
+        linhas = conn.execute(
+            "SELECT chave, marcado FROM processados ORDER BY marcado DESC LIMIT ?", (self.max_itens,)
+        ).fetchall()
+        for chave, marcado in reversed(linhas):
+            self._chaves[chave] = marcado
+        self._conn = conn
+        logger.info(f"Dedup: {len(self._chaves)} pedido(s) processado(s) carregado(s) de {self.path}")
+
+    def _gravar(self, sql: str, parametros: Iterable) -> None:
+        if self._conn is None:
+            return
+        try:
+            with self._conn:
+                self._conn.executemany(sql, parametros)
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao gravar dedup em {self.path}: {e}")
+
+    # --- Memória ---
+    def _podar(self, agora: float) -> None:
+        """Remove do início as chaves expiradas e as que passam do limite (chamar com ``_lock``)."""
+        removidas = []
+        while self._chaves:
+            chave, marcado = next(iter(self._chaves.items()))
+            if agora - marcado < self.ttl and len(self._chaves) <= self.max_itens:
+                break
+            self._chaves.popitem(last=False)
+            removidas.append((chave,))
+        if removidas:
+            self._gravar("DELETE FROM processados WHERE chave = ?", removidas)
+
+    def contem(self, chave: str) -> bool:
+        with self._lock:
+            marcado = self._chaves.get(chave)
+            if marcado is None:
+                return False
+            if time.time() - marcado >= self.ttl:
+                self._podar(time.time())
+                return False
+            return True
+
+    def marcar(self, *chaves: str) -> None:
+        agora = time.time()
+        with self._lock:
+            for chave in chaves:
+                self._chaves[chave] = agora
+                self._chaves.move_to_end(chave)
+            self._gravar("INSERT OR REPLACE INTO processados (chave, marcado) VALUES (?, ?)",
+                         [(c, agora) for c in chaves])
+            self._podar(agora)
+        logger.debug(f"Pedido(s) marcado(s) como processado(s): {chaves}")
+
+    def remover(self, chave: str) -> None:
+        with self._lock:
+            if self._chaves.pop(chave, None) is not None:
+                self._gravar("DELETE FROM processados WHERE chave = ?", [(chave,)])
+
+    def __len__(self) -> int:
+        return len(self._chaves)
+
+
+_dedup: Optional[DedupPedidos] = None
+_dedup_lock = threading.Lock()
+
+
+def get_dedup() -> DedupPedidos:
+    """Instância compartilhada (arquivo em ``PEDIDOS_DEDUP_PATH``)."""
+    global _dedup
+    with _dedup_lock:
+        if _dedup is None:
+            _dedup = DedupPedidos()
+        return _dedup
@@ -0,0 +1,149 @@
+# fila_pedidos.py
+"""
+Fila de processamento de pedidos recebidos pelo WebSocket.
+
+O laço que lê o WebSocket só enfileira a mensagem e volta a ler; quem busca
+e registra o pedido são ``workers`` tarefas asyncio consumindo uma
+``asyncio.Queue`` limitada:
+
+- pedidos de telefones diferentes são processados em paralelo;
+- pedidos do mesmo telefone são processados um de cada vez (lock por
+  telefone) e, enquanto um telefone já está aguardando na fila, novas
+  mensagens dele não geram outra entrada (a busca por telefone já traz tudo);
+- chamadas bloqueantes (HTTP com ``requests``) vão para um pool de threads
+  via ``executar``, sem travar o event loop (pings/pongs continuam em dia);
+- com a fila cheia, ``enfileirar`` aguarda vaga (backpressure) e a espera é
+  contabilizada nas métricas.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+PEDIDOS_WORKERS = int(os.getenv("PEDIDOS_WORKERS", "4"))
+PEDIDOS_FILA_MAX = int(os.getenv("PEDIDOS_FILA_MAX", "200"))
+
+
+class MetricasFila:
+    def __init__(self):
+        self.enfileirados = 0
+        self.agrupados = 0  # mensagens de um telefone que já estava na fila
+        self.concluidos = 0
+        self.erros = 0
+        self.em_processamento = 0
+        self.pico_fila = 0
+        self.esperas_fila_cheia = 0
+        self.tempo_espera_total = 0.0  # segundos entre enfileirar e começar
+        self.tempo_processamento_total = 0.0
+
+    def resumo(self, tamanho_fila: int) -> str:
+        iniciados = self.concluidos + self.erros
+        espera_media = self.tempo_espera_total / iniciados if iniciados else 0.0
+        proc_medio = self.tempo_processamento_total / iniciados if iniciados else 0.0
+        return (f"Fila: {tamanho_fila} (pico {self.pico_fila}) | "
+                f"Em processamento: {self.em_processamento} | "
+                f"Enfileirados: {self.enfileirados} | Agrupados: {self.agrupados} | "
+                f"Concluídos: {self.concluidos} | Erros: {self.erros} | "
+                f"Fila cheia: {self.esperas_fila_cheia}x | "
+                f"Espera média: {espera_media:.1f}s | Processamento médio: {proc_medio:.1f}s")
+
+
+class FilaPedidos:
+    """Pool de workers asyncio com serialização por chave (telefone)."""
+
+    def __init__(self, processar: Callable[[str, Optional[Dict[str, Any]]], Awaitable[Any]],
+                 workers: int = PEDIDOS_WORKERS, tamanho_max: int = PEDIDOS_FILA_MAX):
+        self.processar = processar
+        self.workers = max(1, workers)
+        self.tamanho_max = tamanho_max
+        self.metricas = MetricasFila()
+        self._fila: Optional[asyncio.Queue] = None
+        self._tarefas = []
+        self._pendentes: Set[str] = set()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._uso_locks: Dict[str, int] = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pedidos")
+
+    @property
+    def tamanho(self) -> int:
+        return self._fila.qsize() if self._fila is not None else 0
+
+    def iniciar(self) -> None:
+        """Cria a fila e os workers no event loop atual (uma vez só)."""
+        if self._tarefas:
+            return
+        self._fila = asyncio.Queue(maxsize=self.tamanho_max)
+        self._tarefas = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        logger.info(f"Fila de pedidos iniciada com {self.workers} worker(s)")
+
+    async def parar(self) -> None:
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+        self._executor.shutdown(wait=False)
+
+    async def enfileirar(self, chave: str, dados: Optional[Dict[str, Any]] = None) -> bool:
+        """Agenda o processamento; retorna False se a chave já estava aguardando."""
+        self.iniciar()
+        if chave in self._pendentes:
+            self.metricas.agrupados += 1
+            logger.info(f"Pedido de {chave} já está na fila - mensagem agrupada")
+            return False
+        self._pendentes.add(chave)
+        item = (chave, dados, time.monotonic())
+        try:
+            self._fila.put_nowait(item)
+        except asyncio.QueueFull:
+            self.metricas.esperas_fila_cheia += 1
+            logger.warning(f"Fila de pedidos cheia ({self.tamanho_max}); aguardando vaga")
+            await self._fila.put(item)
+        self.metricas.enfileirados += 1
+        self.metricas.pico_fila = max(self.metricas.pico_fila, self._fila.qsize())
+        return True
+
+    async def executar(self, funcao: Callable[..., Any], *args) -> Any:
+        """Roda ``funcao(*args)`` (bloqueante) no pool de threads da fila."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, funcao, *args)
+
+    async def _worker(self, numero: int) -> None:
+        while True:
+            chave, dados, enfileirado_em = await self._fila.get()
+            try:
+                await self._processar_item(chave, dados, enfileirado_em)
+            finally:
+                self._fila.task_done()
+
+    async def _processar_item(self, chave: str, dados: Optional[Dict[str, Any]], enfileirado_em: float) -> None:
+        lock = self._locks.setdefault(chave, asyncio.Lock())
+        self._uso_locks[chave] = self._uso_locks.get(chave, 0) + 1
+        try:
+            async with lock:
+                # Saiu da lista de pendentes: novas mensagens do telefone voltam a enfileirar
+                self._pendentes.discard(chave)
+                inicio = time.monotonic()
+                self.metricas.tempo_espera_total += inicio - enfileirado_em
+                self.metricas.em_processamento += 1
+                try:
+                    await self.processar(chave, dados)
+                    self.metricas.concluidos += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.metricas.erros += 1
+                    logger.error(f"Erro ao processar pedido de {chave}: {e}", exc_info=True)
+                finally:
+                    self.metricas.em_processamento -= 1
+                    self.metricas.tempo_processamento_total += time.monotonic() - inicio
+        finally:
+            self._uso_locks[chave] -= 1
+            if not self._uso_locks[chave]:
+                del self._uso_locks[chave]
+                self._locks.pop(chave, None)
+
+    def log_status(self) -> None:
+        logger.info(f"📥 {self.metricas.resumo(self.tamanho)}")
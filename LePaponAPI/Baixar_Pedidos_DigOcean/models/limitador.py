@@ -0,0 +1,183 @@
+# limitador.py
+"""
+Controle de taxa adaptativo para as chamadas à API (token bucket por endpoint).
+
+Substitui as pausas fixas (``DELAY_NUM_PEDIDO``, ``DELAY_ORDER_PEDIDO``...)
+que todo pedido pagava mesmo com a API ociosa:
+
+- cada endpoint tem um balde de fichas: com fichas disponíveis a chamada
+  sai na hora; sem fichas, espera só o tempo até a próxima;
+- a taxa se ajusta à resposta da API (AIMD): cada sucesso aumenta um pouco
+  a taxa (até ``API_TAXA_MAX``); um 429 ou 5xx a corta pela metade (até
+  ``API_TAXA_MIN``) e respeita o ``Retry-After`` quando o servidor informa;
+- ``aguardar`` (threads) e ``aguardar_async`` (asyncio, sem bloquear o
+  event loop) compartilham o mesmo balde: a ficha é reservada sob lock e
+  cada interface só dorme o tempo devolvido;
+- ``hook(endpoint)`` devolve um gancho de resposta do ``requests``
+  (``hooks={"response": ...}``) que alimenta o ajuste e as estatísticas;
+- ``backoff`` calcula a espera entre tentativas (exponencial com jitter).
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+API_TAXA_INICIAL = float(os.getenv("API_TAXA_INICIAL", "5"))  # requisições/segundo
+API_TAXA_MIN = float(os.getenv("API_TAXA_MIN", "0.5"))
+API_TAXA_MAX = float(os.getenv("API_TAXA_MAX", "20"))
+API_RAJADA = float(os.getenv("API_RAJADA", "5"))  # fichas acumuláveis
+API_INCREMENTO = float(os.getenv("API_INCREMENTO", "0.5"))  # taxa somada a cada sucesso
+BACKOFF_BASE = float(os.getenv("API_BACKOFF_BASE", "0.5"))  # segundos
+BACKOFF_MAX = float(os.getenv("API_BACKOFF_MAX", "30"))
+
+STATUS_SOBRECARGA = {429, 500, 502, 503, 504}
+
+
+def backoff(tentativa: int, base: float = BACKOFF_BASE, maximo: float = BACKOFF_MAX) -> float:
+    """Espera antes da tentativa seguinte: exponencial com jitter total (0 a base*2^n)."""
+    return random.uniform(0, min(maximo, base * 2 ** tentativa))
+
+
+def _retry_after(valor: Any) -> Optional[float]:
+    try:
+        return max(0.0, float(valor))
+    except (TypeError, ValueError):
+        return None  # formato de data HTTP: cai no backoff normal
+
+
+class Estatisticas:
+    def __init__(self):
+        self.chamadas = 0
+        self.sucessos = 0
+        self.sobrecargas = 0  # 429/5xx
+        self.outros_erros = 0
+        self.esperas = 0
+        self.tempo_espera = 0.0
+        self.tempo_resposta = 0.0
+
+    def como_dict(self, taxa: float) -> Dict[str, Any]:
+        respostas = self.sucessos + self.sobrecargas + self.outros_erros
+        return {
+            "taxa": round(taxa, 2),
+            "chamadas": self.chamadas,
+            "sucessos": self.sucessos,
+            "sobrecargas": self.sobrecargas,
+            "outros_erros": self.outros_erros,
+            "esperas": self.esperas,
+            "espera_media": round(self.tempo_espera / self.chamadas, 3) if self.chamadas else 0.0,
+            "resposta_media": round(self.tempo_resposta / respostas, 3) if respostas else 0.0,
+        }
+
+
+class BaldeFichas:
+    """Token bucket com taxa ajustável (thread-safe)."""
+
+    def __init__(self, taxa: float = API_TAXA_INICIAL, rajada: float = API_RAJADA,
+                 taxa_min: float = API_TAXA_MIN, taxa_max: float = API_TAXA_MAX):
+        self.taxa = taxa
+        self.rajada = max(1.0, rajada)
+        self.taxa_min = taxa_min
+        self.taxa_max = taxa_max
+        self.estatisticas = Estatisticas()
+        self._fichas = self.rajada
+        self._atualizado = time.monotonic()
+        self._pausado_ate = 0.0
+        self._lock = threading.Lock()
+
+    def reservar(self) -> float:
+        """Reserva uma ficha e devolve quantos segundos esperar antes de usá-la."""
+        with self._lock:
+            agora = time.monotonic()
+            self._fichas = min(self.rajada, self._fichas + (agora - self._atualizado) * self.taxa)
+            self._atualizado = agora
+            self._fichas -= 1  # negativo = fila de reservas à frente
+            espera = max(0.0, -self._fichas / self.taxa, self._pausado_ate - agora)
+            self.estatisticas.chamadas += 1
+            if espera > 0:
+                self.estatisticas.esperas += 1
+                self.estatisticas.tempo_espera += espera
+            return espera
+
+    def registrar(self, status: Optional[int], tempo_resposta: Optional[float] = None,
+                  retry_after: Optional[float] = None) -> None:
+        """Ajusta a taxa pela resposta (``status`` None = erro de conexão)."""
+        with self._lock:
+            if tempo_resposta is not None:
+                self.estatisticas.tempo_resposta += tempo_resposta
+            if status is None or status in STATUS_SOBRECARGA:
+                self.estatisticas.sobrecargas += 1
+                self.taxa = max(self.taxa_min, self.taxa / 2)
+                if retry_after:
+                    self._pausado_ate = max(self._pausado_ate, time.monotonic() + retry_after)
+            elif status < 400:
+                self.estatisticas.sucessos += 1
+                self.taxa = min(self.taxa_max, self.taxa + API_INCREMENTO)
+            else:
+                self.estatisticas.outros_erros += 1  # 4xx do próprio pedido: não muda a taxa
+
+
+class LimitadorAdaptativo:
+    """Um ``BaldeFichas`` por endpoint, criado no primeiro uso."""
+
+    def __init__(self, **config):
+        self._config = config
+        self._baldes: Dict[str, BaldeFichas] = {}
+        self._lock = threading.Lock()
+
+    def balde(self, endpoint: str) -> BaldeFichas:
+        with self._lock:
+            balde = self._baldes.get(endpoint)
+            if balde is None:
+                balde = self._baldes[endpoint] = BaldeFichas(**self._config)
+            return balde
+
+    def aguardar(self, endpoint: str) -> None:
+        espera = self.balde(endpoint).reservar()
+        if espera > 0:
+            logger.debug(f"Limite de taxa {endpoint}: aguardando {espera:.2f}s")
+            time.sleep(espera)
+
+    async def aguardar_async(self, endpoint: str) -> None:
+        espera = self.balde(endpoint).reservar()
+        if espera > 0:
+            logger.debug(f"Limite de taxa {endpoint}: aguardando {espera:.2f}s")
+            await asyncio.sleep(espera)
+
+    def registrar(self, endpoint: str, status: Optional[int], tempo_resposta: Optional[float] = None,
+                  retry_after: Any = None) -> None:
+        self.balde(endpoint).registrar(status, tempo_resposta, _retry_after(retry_after))
+
+    def hook(self, endpoint: str) -> Callable:
+        """Gancho ``response`` do ``requests`` que registra status e tempo de resposta."""
+        def ao_responder(resp, *args, **kwargs):
+            self.registrar(endpoint, resp.status_code, resp.elapsed.total_seconds(),
+                           resp.headers.get("Retry-After"))
+            return resp
+        return ao_responder
+
+    def estatisticas(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            baldes = dict(self._baldes)
+        return {nome: balde.estatisticas.como_dict(balde.taxa) for nome, balde in baldes.items()}
+
+    def log_status(self) -> None:
+        for nome, dados in self.estatisticas().items():
+            logger.info(f"⏱️  {nome}: {dados}")
+
+
+_limitador: Optional[LimitadorAdaptativo] = None
+_limitador_lock = threading.Lock()
+
+
+def get_limitador() -> LimitadorAdaptativo:
+    """Instância compartilhada pelo registro de pedidos e pelo WebSocket."""
+    global _limitador
+    with _limitador_lock:
+        if _limitador is None:
+            _limitador = LimitadorAdaptativo()
+        return _limitador
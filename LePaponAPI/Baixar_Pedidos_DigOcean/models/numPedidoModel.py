@@ -6,11 +6,15 @@ BASE_URL = "http://lepapon.api/api/numpedidos"
 # Criar um novo numPedido
 class NumPedidoAPI:
     def __init__(self, base_url=BASE_URL):
-        self.base_url = base_url        
+        self.base_url = base_url
+        # Ganchos de resposta do requests (ex.: limitador de taxa adaptativo)
+        self.hooks = {}
 
-    def criar_num_pedido(self, data):
+    def criar_num_pedido(self, data, chave=None):
+        # ``chave`` vai como Idempotency-Key: repetir o POST não duplica o numPedido
+        headers = {"Idempotency-Key": chave} if chave else None
         try:
-            resp = requests.post(self.base_url, json=data, timeout=10)
+            resp = requests.post(self.base_url, json=data, headers=headers, timeout=10, hooks=self.hooks)
             resp.raise_for_status()
             return resp.json()
         except requests.RequestException as e:
@@ -19,7 +23,7 @@ class NumPedidoAPI:
 
     def listar_num_pedidos(self):
         try:
-            resp = requests.get(self.base_url, timeout=10)
+            resp = requests.get(self.base_url, timeout=10, hooks=self.hooks)
             resp.raise_for_status()
             #print("Listar numPedidos:", resp.status_code, resp.json())
             return resp.json()
@@ -27,9 +31,24 @@ class NumPedidoAPI:
             print(f"Erro ao listar numPedidos: {e}")
             return None
 
+    def listar_por_fone(self, fone):
+        """numPedidos de um telefone (None se a consulta falhar)."""
+        try:
+            resp = requests.get(f"{self.base_url}/fone/{fone}", timeout=10, hooks=self.hooks)
+            if resp.status_code == 404:
+                return []
+            resp.raise_for_status()
+            dados = resp.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"Erro ao listar numPedidos do fone {fone}: {e}")
+            return None
+        if isinstance(dados, dict):
+            dados = [dados]
+        return dados if isinstance(dados, list) else None
+
     def buscar_num_pedido_por_id(self, id):
         try:
-            resp = requests.get(f"{self.base_url}/{id}", timeout=10)
+            resp = requests.get(f"{self.base_url}/{id}", timeout=10, hooks=self.hooks)
             resp.raise_for_status()
             return resp.json()
         except requests.RequestException as e:
@@ -38,7 +57,7 @@ class NumPedidoAPI:
 
     def atualizar_num_pedido(self, id, data):
         try:
-            resp = requests.put(f"{self.base_url}/{id}", json=data, timeout=10)
+            resp = requests.put(f"{self.base_url}/{id}", json=data, timeout=10, hooks=self.hooks)
             resp.raise_for_status()
             return resp.json()
         except requests.RequestException as e:
@@ -47,7 +66,7 @@ class NumPedidoAPI:
 
     def deletar_num_pedido(self, id):
         try:
-            resp = requests.delete(f"{self.base_url}/{id}", timeout=10)
+            resp = requests.delete(f"{self.base_url}/{id}", timeout=10, hooks=self.hooks)
             resp.raise_for_status()
             return True
         except requests.RequestException as e:
@@ -6,16 +6,20 @@ BASE_URL = "http://lepapon.api/api/orderpedidos"
 class OrderPedidoAPI:
     def __init__(self, base_url=BASE_URL):
         self.base_url = base_url
+        # Ganchos de resposta do requests (ex.: limitador de taxa adaptativo)
+        self.hooks = {}
         
 
-    def criar_ordem_pedido(self, id_cliente, num_pedido, hora):
+    def criar_ordem_pedido(self, id_cliente, num_pedido, hora, chave=None):
         data = {
             "id_cliente": id_cliente,
             "numPedido": num_pedido,
             "hora": hora
         }
+        # ``chave`` vai como Idempotency-Key: repetir o POST não duplica a ordem
+        headers = {"Idempotency-Key": chave} if chave else None
         try:
-            resp = requests.post(self.base_url, json=data)
+            resp = requests.post(self.base_url, json=data, headers=headers, timeout=10, hooks=self.hooks)
             resp.raise_for_status()
             return resp.json()
         except requests.RequestException as e:
@@ -24,7 +28,7 @@ class OrderPedidoAPI:
 
     def listar_ordem_pedidos(self):
         try:
-            resp = requests.get(self.base_url)
+            resp = requests.get(self.base_url, hooks=self.hooks)
             resp.raise_for_status()
             #print("Listar ordemPedidos:", resp.status_code, resp.json())
             return resp.json()
@@ -32,9 +36,26 @@ class OrderPedidoAPI:
             print(f"Erro ao listar ordemPedidos: {e}")
             return None
 
+    def listar_por_num_pedido(self, num_pedido):
+        """Ordens de um numPedido (None se a consulta falhar).
+
+        Pede o filtro na query string e filtra de novo aqui, para o caso de o
+        servidor ignorar o parâmetro.
+        """
+        try:
+            resp = requests.get(self.base_url, params={"numPedido": num_pedido}, timeout=10, hooks=self.hooks)
+            resp.raise_for_status()
+            dados = resp.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"Erro ao listar ordens do numPedido {num_pedido}: {e}")
+            return None
+        if not isinstance(dados, list):
+            return None
+        return [o for o in dados if isinstance(o, dict) and str(o.get("numPedido")) == str(num_pedido)]
+
     def buscar_ordem_pedido_por_id(self, id):
         try:
-            resp = requests.get(f"{self.base_url}/{id}")
+            resp = requests.get(f"{self.base_url}/{id}", hooks=self.hooks)
             resp.raise_for_status()
             return resp.json()
         except requests.RequestException as e:
@@ -44,7 +65,7 @@ class OrderPedidoAPI:
     def atualizar_ordem_pedido(self, id, hora):
         data = {"hora": hora}
         try:
-            resp = requests.put(f"{self.base_url}/{id}", json=data)
+            resp = requests.put(f"{self.base_url}/{id}", json=data, hooks=self.hooks)
             resp.raise_for_status()
             return resp.json()
         except requests.RequestException as e:
@@ -53,7 +74,7 @@ class OrderPedidoAPI:
 
     def deletar_ordem_pedido(self, id):
         try:
-            resp = requests.delete(f"{self.base_url}/{id}")
+            resp = requests.delete(f"{self.base_url}/{id}", hooks=self.hooks)
             resp.raise_for_status()
             return True
         except requests.RequestException as e:
@@ -1,20 +1,39 @@
 import requests
+import hashlib
 import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from limitador import backoff
 
 load_dotenv()
 
 BASE_URL = "http://lepapon.api/api/pedidos"
+# Criação em lote: API_BULK=0 desativa o endpoint /bulk; BULK_MAX_WORKERS limita
+# os POSTs paralelos usados quando o servidor não tem o endpoint.
+API_BULK = os.getenv("API_BULK", "1") != "0"
+BULK_MAX_WORKERS = int(os.getenv("BULK_MAX_WORKERS", "4"))
+BULK_UNSUPPORTED_STATUS = (404, 405, 501)
+# Respostas em que o lote pode ter sido gravado: repete o mesmo POST (mesma
+# Idempotency-Key) em vez de cair para POSTs individuais.
+BULK_RETRY_STATUS = (408, 429, 500, 502, 503, 504)
+BULK_TENTATIVAS = int(os.getenv("BULK_TENTATIVAS", "3"))
+BULK_TIMEOUT = float(os.getenv("BULK_TIMEOUT", "15"))  # segundos
 
 
 class PedidoAPI:
     def __init__(self, base_url=BASE_URL):
         self.base_url = base_url
+        # Ganchos de resposta do requests (ex.: limitador de taxa adaptativo)
+        self.hooks = {}
+        self.bulk_suportado = API_BULK
         
 
-    def criar_pedido(self, data):
+    def criar_pedido(self, data, chave=None):
         try:
-            resp = requests.post(self.base_url, json=data)
+            headers = {"Idempotency-Key": chave} if chave else None
+            resp = requests.post(self.base_url, json=data, headers=headers, hooks=self.hooks)
             resp.raise_for_status()
             #print("Criar pedido:", resp.status_code, resp.json())
             return resp.json()
@@ -22,9 +41,60 @@ class PedidoAPI:
             print(f"Erro ao criar pedido: {e}")
             return None
 
+    def criar_pedidos(self, itens, chaves=None):
+        """Cria todos os itens de um pedido; retorna um resultado por item (None = falhou).
+
+        ``chaves`` (opcional) é a ``Idempotency-Key`` de cada item; a do lote é
+        derivada delas, então repetir os mesmos itens repete a mesma chave.
+        Usa um único POST em /bulk quando o servidor suporta. Só cai para POSTs paralelos (limitados a BULK_MAX_WORKERS) quando
+        o servidor não tem o endpoint: em erro de rede, timeout ou 5xx o lote
+        pode ter sido gravado, então o mesmo POST é repetido com a mesma chave
+        e, se continuar falhando, todos os itens voltam None.
+        """
+        itens = list(itens)
+        if not itens:
+            return []
+        chaves = list(chaves) if chaves else [None] * len(itens)
+        if len(itens) > 1 and self.bulk_suportado:
+            chave_lote = (hashlib.sha1("|".join(chaves).encode("utf-8")).hexdigest()
+                          if all(chaves) else uuid.uuid4().hex)
+            headers = {"Idempotency-Key": chave_lote}
+            retry_after = None
+            for tentativa in range(max(1, BULK_TENTATIVAS)):
+                if tentativa:
+                    # Jitter evita que vários processos repitam juntos; Retry-After manda
+                    time.sleep(max(backoff(tentativa), retry_after or 0.0))
+                    retry_after = None
+                try:
+                    resp = requests.post(f"{self.base_url}/bulk", json=itens, headers=headers,
+                                         timeout=BULK_TIMEOUT, hooks=self.hooks)
+                except requests.RequestException as e:
+                    print(f"Erro ao criar pedidos em lote: {e}")
+                    continue
+                if resp.status_code in BULK_UNSUPPORTED_STATUS:
+                    self.bulk_suportado = False
+                    break
+                if resp.status_code < 400:
+                    try:
+                        dados = resp.json()
+                    except ValueError:
+                        dados = None
+                    return dados if isinstance(dados, list) and len(dados) == len(itens) else itens
+                print(f"Erro ao criar pedidos em lote: HTTP {resp.status_code}")
+                if resp.status_code not in BULK_RETRY_STATUS:
+                    break  # lote recusado: nada foi gravado
+                try:
+                    retry_after = float(resp.headers.get("Retry-After"))
+                except (TypeError, ValueError):
+                    retry_after = None  # ausente ou em formato de data: só o backoff
+            if self.bulk_suportado:
+                return [None] * len(itens)
+        with ThreadPoolExecutor(max_workers=max(1, min(BULK_MAX_WORKERS, len(itens)))) as pool:
+            return list(pool.map(self.criar_pedido, itens, chaves))
+
     def listar_pedidos(self):
         try:
-            resp = requests.get(self.base_url)
+            resp = requests.get(self.base_url, hooks=self.hooks)
             resp.raise_for_status()
             #print("Listar pedidos:", resp.status_code, resp.json())
             return resp.json()
@@ -32,9 +102,27 @@ class PedidoAPI:
             print(f"Erro ao listar pedidos: {e}")
             return None
 
+    def listar_por_num_pedido(self, num_pedido):
+        """Itens já gravados de um numPedido (None se a consulta falhar).
+
+        Pede o filtro na query string e filtra de novo aqui, para o caso de o
+        servidor ignorar o parâmetro.
+        """
+        try:
+            resp = requests.get(self.base_url, params={"numPedido": num_pedido},
+                                timeout=BULK_TIMEOUT, hooks=self.hooks)
+            resp.raise_for_status()
+            dados = resp.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"Erro ao listar itens do numPedido {num_pedido}: {e}")
+            return None
+        if not isinstance(dados, list):
+            return None
+        return [p for p in dados if isinstance(p, dict) and str(p.get("numPedido")) == str(num_pedido)]
+
     def buscar_pedido_por_id(self, id):
         try:
-            resp = requests.get(f"{self.base_url}/{id}")
+            resp = requests.get(f"{self.base_url}/{id}", hooks=self.hooks)
             resp.raise_for_status()
             print(f"Buscar pedido {id}:", resp.status_code, resp.json())
             return resp.json()
@@ -44,7 +132,7 @@ class PedidoAPI:
 
     def atualizar_pedido(self, id, data):
         try:
-            resp = requests.put(f"{self.base_url}/{id}", json=data)
+            resp = requests.put(f"{self.base_url}/{id}", json=data, hooks=self.hooks)
             resp.raise_for_status()
             #print(f"Atualizar pedido {id}:", resp.status_code, resp.json())
             return resp.json()
@@ -54,7 +142,7 @@ class PedidoAPI:
 
     def deletar_pedido(self, id):
         try:
-            resp = requests.delete(f"{self.base_url}/{id}")
+            resp = requests.delete(f"{self.base_url}/{id}", hooks=self.hooks)
             resp.raise_for_status()
             print(f"Deletar pedido {id}:", resp.status_code)
             return resp.status_code
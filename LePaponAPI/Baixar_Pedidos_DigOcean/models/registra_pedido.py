@@ -8,8 +8,10 @@ from produtosTodos import Produtos
 from pedidosModel import PedidoAPI
 from datetime import datetime
 import time
-import threading
 from functools import wraps
+from limitador import backoff, get_limitador
+from catalogo_precos import CatalogoPrecos
+from saga_pedido import DiarioSagas, GravadorPedido
 
 # Configuração de logging
 logging.basicConfig(
@@ -19,37 +21,13 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class RateLimiter:
+def retry_on_failure(max_retries: int = 3, delay: float = 1.0, endpoint: Optional[str] = None):
     """
-    Gerenciador de rate limiting mais elegante que substitui time.sleep()
-    """
-    def __init__(self):
-        self._locks = {}
-        self._last_call = {}
+    Decorator para implementar retry logic em chamadas de API.
     
-    def wait(self, operation_type: str, delay: float):
-        """
-        Implementa rate limiting para diferentes tipos de operação
-        """
-        if operation_type not in self._locks:
-            self._locks[operation_type] = threading.Lock()
-            self._last_call[operation_type] = 0
-        
-        with self._locks[operation_type]:
-            current_time = time.time()
-            time_since_last = current_time - self._last_call[operation_type]
-            
-            if time_since_last < delay:
-                sleep_time = delay - time_since_last
-                logger.debug(f"Rate limiting {operation_type}: aguardando {sleep_time:.2f}s")
-                time.sleep(sleep_time)
-            
-            self._last_call[operation_type] = time.time()
-
-
-def retry_on_failure(max_retries: int = 3, delay: float = 1.0):
-    """
-    Decorator para implementar retry logic em chamadas de API
+    Cada tentativa passa pelo limitador de taxa do ``endpoint`` (se
+    informado); entre tentativas a espera é exponencial com jitter
+    (``delay`` é a base).
     """
     def decorator(func):
         @wraps(func)
@@ -57,6 +35,8 @@ def retry_on_failure(max_retries: int = 3, delay: float = 1.0):
             last_exception = None
             
             for tentativa in range(max_retries):
+                if endpoint:
+                    rate_limiter.aguardar(endpoint)
                 try:
                     result = func(*args, **kwargs)
                     if result:  # Se o resultado é válido, retorna
@@ -67,7 +47,7 @@ def retry_on_failure(max_retries: int = 3, delay: float = 1.0):
                     logger.warning(f"Tentativa {tentativa + 1}/{max_retries} gerou exceção em {func.__name__}: {str(e)}")
                 
                 if tentativa < max_retries - 1:  # Não aguarda na última tentativa
-                    time.sleep(delay * (tentativa + 1))  # Backoff exponencial
+                    time.sleep(backoff(tentativa, delay))  # Backoff exponencial com jitter
             
             logger.error(f"Todas as {max_retries} tentativas falharam para {func.__name__}")
             if last_exception:
@@ -79,14 +59,11 @@ def retry_on_failure(max_retries: int = 3, delay: float = 1.0):
 # Constantes
 API_BASE_URL = "http://lepapon.api"  # URL base da API (HTTP para desenvolvimento)
 ID_CLIENTE_SEM_CADASTRO = 13  # ID usado quando o cliente não possui cadastro no sistema
-DELAY_NUM_PEDIDO = 3.0  # segundos
-DELAY_ORDER_PEDIDO = 2.0  # segundos  
-DELAY_ITEM_PEDIDO = 1.0  # segundo
 MAX_RETRIES = 3  # Número máximo de tentativas para operações críticas
 RETRY_DELAY = 1.0  # Delay base para retry (com backoff exponencial)
 
-# Inicialização do rate limiter
-rate_limiter = RateLimiter()
+# Limitador de taxa adaptativo (token bucket por endpoint, ajustado por 429/5xx)
+rate_limiter = get_limitador()
 
 # Inicialização das APIs
 client = ClientesAPI(API_BASE_URL)
@@ -94,6 +71,11 @@ num_pedido_api = NumPedidoAPI()
 order_pedido_api = OrderPedidoAPI()
 pedido_api = PedidoAPI()
 produtos_api = Produtos()
+# Preços do catálogo em memória (recarregado a cada CATALOGO_TTL segundos)
+catalogo_precos = CatalogoPrecos(produtos_api)
+num_pedido_api.hooks = {"response": rate_limiter.hook("num_pedido")}
+order_pedido_api.hooks = {"response": rate_limiter.hook("order_pedido")}
+pedido_api.hooks = {"response": rate_limiter.hook("pedidos")}
 
 
 def _parse_data(raw_data: Optional[str]) -> Optional[str]:
@@ -245,31 +227,71 @@ def _validar_dados_pedido(pedido: Dict[str, Any]) -> bool:
     return True
 
 
-@retry_on_failure(max_retries=MAX_RETRIES, delay=RETRY_DELAY)
-def _criar_numero_pedido(dados_pedido: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def _criar_numero_pedido(dados_pedido: Dict[str, Any], chave: str) -> Optional[Dict[str, Any]]:
     """
-    Cria o número do pedido com retry automático
+    Cria o número do pedido (uma tentativa; sem resposta, a saga concilia pelo telefone)
     """
-    return num_pedido_api.criar_num_pedido(dados_pedido)
+    rate_limiter.aguardar('num_pedido')
+    return num_pedido_api.criar_num_pedido(dados_pedido, chave)
 
 
-@retry_on_failure(max_retries=MAX_RETRIES, delay=RETRY_DELAY)
-def _criar_ordem_pedido(id_cliente: int, num_pedido_id: int, hora_pedido: str) -> Optional[Dict[str, Any]]:
+def _criar_ordem_pedido(id_cliente: int, num_pedido_id: int, hora_pedido: str, chave: str) -> Optional[Dict[str, Any]]:
     """
-    Cria a ordem do pedido com retry automático
+    Cria a ordem do pedido (uma tentativa; sem resposta, a saga concilia pelo numPedido)
     """
-    return order_pedido_api.criar_ordem_pedido(id_cliente, num_pedido_id, hora_pedido)
+    rate_limiter.aguardar('order_pedido')
+    return order_pedido_api.criar_ordem_pedido(id_cliente, num_pedido_id, hora_pedido, chave)
 
 
-@retry_on_failure(max_retries=MAX_RETRIES, delay=RETRY_DELAY)
-def _criar_item_pedido(dados_item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def _listar_num_pedidos(dados_pedido: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
     """
-    Cria um item individual do pedido com retry automático
+    numPedidos já gravados do telefone do pedido (conciliação da saga); None se falhar
     """
-    return pedido_api.criar_pedido(dados_item)
+    rate_limiter.aguardar('num_pedido')
+    return num_pedido_api.listar_por_fone(dados_pedido.get("fone", ""))
 
 
-@retry_on_failure(max_retries=MAX_RETRIES, delay=RETRY_DELAY)
+def _listar_ordens_pedido(num_pedido: Any) -> Optional[List[Dict[str, Any]]]:
+    """
+    Ordens já gravadas de um numPedido (conciliação da saga); None se falhar
+    """
+    rate_limiter.aguardar('order_pedido')
+    return order_pedido_api.listar_por_num_pedido(num_pedido)
+
+
+def _criar_itens_pedido(itens: List[Dict[str, Any]], chaves: List[str]) -> List[Any]:
+    """
+    Cria todos os itens de uma vez (bulk ou POSTs paralelos); um resultado por item.
+    ``chaves`` são as Idempotency-Key de cada item (repetição não duplica)
+    """
+    rate_limiter.aguardar('pedidos')
+    return pedido_api.criar_pedidos(itens, chaves)
+
+
+def _listar_itens_pedido(num_pedido: Any) -> Optional[List[Dict[str, Any]]]:
+    """
+    Itens já gravados de um numPedido (conciliação da saga); None se falhar
+    """
+    rate_limiter.aguardar('pedidos')
+    return pedido_api.listar_por_num_pedido(num_pedido)
+
+
+# Gravação em saga: etapas no diário local, desfeitas se o pedido não for criado inteiro
+gravador_pedidos = GravadorPedido(
+    DiarioSagas(),
+    criar_num_pedido=_criar_numero_pedido,
+    criar_ordem=_criar_ordem_pedido,
+    criar_itens=_criar_itens_pedido,
+    listar_itens=_listar_itens_pedido,
+    listar_num_pedidos=_listar_num_pedidos,
+    listar_ordens=_listar_ordens_pedido,
+    deletar_num_pedido=num_pedido_api.deletar_num_pedido,
+    deletar_ordem=order_pedido_api.deletar_ordem_pedido,
+    deletar_item=pedido_api.deletar_pedido,
+)
+
+
+@retry_on_failure(max_retries=MAX_RETRIES, delay=RETRY_DELAY, endpoint="clientes")
 def _buscar_cliente_por_telefone(telefone: str) -> Optional[Dict[str, Any]]:
     """
     Busca cliente pelo telefone com retry automático.
@@ -319,6 +341,7 @@ def _criar_registros_pedido(
         
     Returns:
         True se todos os registros foram criados com sucesso, False caso contrário
+        (nesse caso os registros criados parcialmente são desfeitos)
     """
     try:
         # Sanitizar dados de entrada
@@ -326,8 +349,6 @@ def _criar_registros_pedido(
         sobrenome_sanitizado = _sanitizar_string(sobrenome)
         fone_sanitizado = _sanitizar_string(fone_cliente)
         
-        # Criar número do pedido com retry automático
-        logger.info(f"Criando número do pedido para cliente ID: {id_cliente}")
         dados_num_pedido = {
             "id_cliente": id_cliente,
             "nome": nome_sanitizado,
@@ -337,109 +358,39 @@ def _criar_registros_pedido(
             "hora": hora_pedido
         }
         
-        criar_num = _criar_numero_pedido(dados_num_pedido)
-        if not criar_num:
-            logger.error("Falha ao criar número do pedido após todas as tentativas")
-            return False
-        
-        numero_pedido_id = criar_num.get('id')
-        if not numero_pedido_id:
-            logger.error("ID do número do pedido não foi retornado")
-            return False
+        # Preço de todos os itens de uma vez, pela tabela de preços em memória
+        try:
+            precos = catalogo_precos.precos(pedido.get('id_Prod') for pedido in lista_pedidos)
+            logger.info(f"Itens precificados pelo catálogo (versão {catalogo_precos.versao})")
+        except Exception as e:
+            logger.warning(f"Erro ao consultar o catálogo de preços: {str(e)}")
+            precos = [None] * len(lista_pedidos)
+        
+        # Itens sem numPedido/idOrderPedido: o gravador preenche depois de criá-los
+        itens_payload = []
+        for i, (pedido, preco) in enumerate(zip(lista_pedidos, precos), 1):
+            produto_id = pedido.get('id_Prod')
+            if preco is None:
+                logger.warning(f"Produto não encontrado: {produto_id}. Usando valor 0.0")
+                preco = 0.0
             
-        logger.info(f"Número do pedido criado com sucesso: {numero_pedido_id}")
-        
-        # Rate limiting elegante
-        rate_limiter.wait('num_pedido', DELAY_NUM_PEDIDO)
-        
-        # Criar ordem do pedido com retry automático
-        logger.info(f"Criando ordem do pedido: {numero_pedido_id}")
-        hora_pedido_str = hora_pedido or ""
-        criar_order = _criar_ordem_pedido(id_cliente, int(numero_pedido_id), hora_pedido_str)
-        
-        if not criar_order:
-            logger.error("Falha ao criar ordem do pedido após todas as tentativas")
-            return False
-        
-        ordem_pedido_id = criar_order.get('id')
-        logger.info(f"Ordem do pedido criada com sucesso: {ordem_pedido_id}")
-        
-        # Rate limiting elegante
-        rate_limiter.wait('order_pedido', DELAY_ORDER_PEDIDO)
-        
-        # Criar itens individuais do pedido com processamento mais robusto
-        itens_criados_com_sucesso = 0
-        itens_com_falha = []
-        
-        for i, pedido in enumerate(lista_pedidos, 1):
-            try:
-                produto_id = pedido.get('id_Prod')
-                logger.info(f"Processando item {i}/{len(lista_pedidos)} - Produto ID: {produto_id}")
-                
-                # Buscar informações do produto com tratamento de erro
-                produto_info = None
-                try:
-                    produto_info = produtos_api.obter_produto(produto_id)
-                except Exception as e:
-                    logger.warning(f"Erro ao buscar produto {produto_id}: {str(e)}")
-                
-                if not produto_info:
-                    logger.warning(f"Produto não encontrado: {produto_id}. Usando valor 0.0")
-                    valor_unitario = 0.0
-                else:
-                    valor_unitario = float(produto_info.get('Valor_Prod', 0.0))
-                
-                # Rate limiting para cada item
-                rate_limiter.wait('item_pedido', DELAY_ITEM_PEDIDO)
-                
-                # Log estruturado em vez de print
-                logger.info(f"Criando item do pedido - numPedido: {numero_pedido_id}, "
-                           f"idOrderPedido: {ordem_pedido_id}, id_Prod: {produto_id}, "
-                           f"V_unit: {valor_unitario}, qtd: {pedido.get('qtd')}, "
-                           f"data: {data_pedido}, hora: {hora_pedido}")
-                
-                dados_item = {
-                    "id_cliente": id_cliente,
-                    "numPedido": numero_pedido_id,
-                    "idOrderPedido": ordem_pedido_id,
-                    "id_Prod": produto_id,
-                    "V_unit": valor_unitario,
-                    "qtd": pedido.get('qtd'),
-                    "observ": _sanitizar_string(pedido.get('observ', '')),
-                    "data": data_pedido,
-                    "hora": hora_pedido
-                }
-                
-                resultado = _criar_item_pedido(dados_item)
-                
-                if resultado:
-                    itens_criados_com_sucesso += 1
-                    logger.info(f"Item {i} criado com sucesso")
-                else:
-                    itens_com_falha.append(i)
-                    logger.error(f"Falha ao criar item {i} do pedido após todas as tentativas")
-                    
-            except Exception as e:
-                itens_com_falha.append(i)
-                logger.error(f"Erro inesperado ao processar item {i}: {str(e)}")
-        
-        # Relatório final
-        total_itens = len(lista_pedidos)
-        logger.info(f"Processamento concluído - Sucessos: {itens_criados_com_sucesso}/{total_itens}")
-        
-        if itens_com_falha:
-            logger.warning(f"Itens com falha: {itens_com_falha}")
-        
-        # Considera sucesso se pelo menos 80% dos itens foram processados
-        taxa_sucesso = itens_criados_com_sucesso / total_itens
-        sucesso_parcial = taxa_sucesso >= 0.8
-        
-        if sucesso_parcial:
-            logger.info(f"Pedido processado com sucesso! Taxa de sucesso: {taxa_sucesso:.1%}")
-            return True
-        else:
-            logger.error(f"Taxa de sucesso muito baixa: {taxa_sucesso:.1%}")
-            return False
+            # Log estruturado em vez de print
+            logger.info(f"Item {i}/{len(lista_pedidos)} - id_Prod: {produto_id}, "
+                       f"V_unit: {preco}, qtd: {pedido.get('qtd')}, "
+                       f"data: {data_pedido}, hora: {hora_pedido}")
+            
+            itens_payload.append({
+                "id_cliente": id_cliente,
+                "id_Prod": produto_id,
+                "V_unit": preco,
+                "qtd": pedido.get('qtd'),
+                "observ": _sanitizar_string(pedido.get('observ', '')),
+                "data": data_pedido,
+                "hora": hora_pedido
+            })
+        
+        # numPedido -> ordem -> itens: tudo ou nada (falha desfaz o que foi criado)
+        return gravador_pedidos.registrar(dados_num_pedido, id_cliente, hora_pedido or "", itens_payload)
         
     except Exception as e:
         logger.error(f"Erro crítico ao criar registros do pedido: {str(e)}", exc_info=True)
@@ -0,0 +1,534 @@
+# saga_pedido.py
+"""
+Gravação de pedidos em etapas com diário local e compensação (saga).
+
+Um pedido são vários registros na API: o numPedido, a ordem e um registro
+por item. Antes, uma falha no meio deixava numPedido/ordem órfãos e o
+pedido era dado como certo com 80% dos itens; repetir o pedido criava
+tudo de novo. Aqui:
+
+- cada etapa concluída (numPedido, ordem, cada item) é gravada num diário
+  append-only com ``fsync`` (``PEDIDOS_SAGA_PATH``), junto com os dados
+  necessários para continuar;
+- o pedido só é dado como registrado com todos os itens criados; se uma
+  etapa falhar, o que já foi criado é apagado na ordem inversa (itens,
+  ordem, numPedido) e cada remoção também vai para o diário;
+- o id da saga vem do conteúdo do pedido: o mesmo pedido entregue de novo
+  não é duplicado (já concluído devolve sucesso; interrompido continua de
+  onde parou);
+- antes de cada POST (numPedido, ordem, itens) o diário registra o que está
+  em envio, e cada registro leva uma ``Idempotency-Key`` determinística
+  derivada da saga. Se a resposta se perder (timeout, queda do processo)
+  ou vier sem ids, nada é reenviado às cegas: o numPedido é procurado pelo
+  telefone, a ordem pelo numPedido e os itens pela lista do numPedido, e
+  o que for achado é associado à saga;
+- ``recuperar()`` (na inicialização) termina as sagas que ficaram abertas
+  por queda do processo: continua as em andamento e conclui as
+  compensações pendentes. Depois de ``SAGA_COMPENSACAO_MAX`` tentativas sem
+  conseguir apagar, a saga vira ``falhou`` e os ids restantes ficam
+  registrados no log e no diário para limpeza manual.
+
+Eventos do diário (uma linha JSON cada; ``estado`` é usado na compactação):
+
+- ``{"saga", "op": "inicio", "dados_num_pedido", "id_cliente", "hora", "itens"}``
+- ``{"saga", "op": "enviando_recurso", "recurso": "num_pedido" | "ordem"}`` (antes do POST)
+- ``{"saga", "op": "num_pedido" | "ordem", "id"}``
+- ``{"saga", "op": "recurso_conciliado", "recurso"}`` (em envio e ausente na API)
+- ``{"saga", "op": "enviando", "pos": [...]}`` (antes do POST dos itens)
+- ``{"saga", "op": "item", "pos", "id"}``
+- ``{"saga", "op": "conciliado"}`` (posições em envio ausentes na API)
+- ``{"saga", "op": "concluida" | "compensando" | "compensada"}``
+- ``{"saga", "op": "desfeito", "recurso", "pos"?}``
+- ``{"saga", "op": "falhou", "residuos"}``
+- ``{"saga", "op": "estado", "estado"}``
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PEDIDOS_SAGA_PATH = os.getenv(
+    "PEDIDOS_SAGA_PATH", os.path.join(_BASE_DIR, "..", "storage", "sagas_pedidos.jsonl")
+)
+SAGA_COMPACT_AFTER = int(os.getenv("PEDIDOS_SAGA_COMPACT_AFTER", "500"))
+# Sagas encerradas ficam no diário por esse tempo (pedido reenviado não duplica)
+SAGA_RETENCAO = float(os.getenv("PEDIDOS_SAGA_RETENCAO", str(3 * 24 * 3600)))  # segundos
+SAGA_COMPENSACAO_MAX = int(os.getenv("PEDIDOS_SAGA_COMPENSACAO_MAX", "3"))
+
+EM_ANDAMENTO, CONCLUIDA, COMPENSANDO, COMPENSADA, FALHOU = (
+    "em_andamento", "concluida", "compensando", "compensada", "falhou"
+)
+ABERTAS = (EM_ANDAMENTO, COMPENSANDO)
+
+
+class ErroEtapa(Exception):
+    """Etapa da saga sem sucesso após as tentativas (dispara a compensação)."""
+
+
+def chave_saga(id_cliente: Any, dados_num_pedido: Dict[str, Any], itens: List[Dict[str, Any]]) -> str:
+    """Id da saga a partir do conteúdo do pedido (cliente, data, hora e itens)."""
+    conteudo = json.dumps([
+        str(id_cliente),
+        str(dados_num_pedido.get("fone", "")),
+        str(dados_num_pedido.get("data", "")),
+        str(dados_num_pedido.get("hora", "")),
+        [[str(i.get("id_Prod")), str(i.get("qtd")), str(i.get("observ", ""))] for i in itens],
+    ], ensure_ascii=False)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+
+
+def chave_recurso_saga(saga_id: str, recurso: str, num_pedido: Any = None) -> str:
+    """``Idempotency-Key`` do numPedido/ordem da saga (a ordem depende do numPedido)."""
+    return f"{saga_id}:{recurso}" if num_pedido is None else f"{saga_id}:{recurso}:{num_pedido}"
+
+
+def _mesmos_campos(registro: Dict[str, Any], esperado: Dict[str, Any]) -> bool:
+    return all(str(registro.get(k)) == str(v) for k, v in esperado.items() if v not in (None, ""))
+
+
+def chave_item_saga(saga_id: str, num_pedido: Any, pos: int) -> str:
+    """``Idempotency-Key`` do item ``pos``: a mesma em toda repetição do envio."""
+    return f"{saga_id}:{num_pedido}:{pos}"
+
+
+def _conteudo_item(item: Dict[str, Any]) -> tuple:
+    """Campos que identificam um item na conciliação (quantidade normalizada)."""
+    try:
+        qtd = float(item.get("qtd"))
+    except (TypeError, ValueError):
+        qtd = str(item.get("qtd"))
+    return str(item.get("id_Prod")), qtd, str(item.get("observ") or "")
+
+
+class DiarioSagas:
+    """Estado das sagas em memória, reconstruído do diário no primeiro acesso."""
+
+    def __init__(self, path: str = PEDIDOS_SAGA_PATH):
+        self.path = path
+        self._sagas: Optional[Dict[str, Dict[str, Any]]] = None
+        self._linhas = 0
+        self._lock = threading.RLock()
+
+    def _carregar(self) -> None:
+        """Lê o diário (chamar com ``_lock``)."""
+        if self._sagas is not None:
+            return
+        self._sagas, self._linhas = {}, 0
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for linha in f:
+                self._linhas += 1
+                try:
+                    self._aplicar(json.loads(linha))
+                except (ValueError, KeyError, TypeError):
+                    continue  # última linha truncada por queda de energia
+
+    def _aplicar(self, evento: Dict[str, Any]) -> None:
+        saga_id, op = evento["saga"], evento["op"]
+        if op == "estado":
+            self._sagas[saga_id] = evento["estado"]
+            return
+        if op == "inicio":
+            self._sagas[saga_id] = {
+                "status": EM_ANDAMENTO,
+                "dados_num_pedido": evento["dados_num_pedido"],
+                "id_cliente": evento["id_cliente"],
+                "hora": evento["hora"],
+                "itens": evento["itens"],
+                "num_pedido": None,
+                "ordem": None,
+                "criados": {},  # posição do item -> id criado
+                "enviando": [],  # posições enviadas sem resposta registrada
+                "recursos_enviando": [],  # numPedido/ordem enviados sem resposta registrada
+                "tentativas_compensacao": 0,
+            }
+        estado = self._sagas.get(saga_id)
+        if estado is None:
+            return
+        estado["atualizado"] = evento.get("ts", time.time())
+        if op in ("num_pedido", "ordem"):
+            estado[op] = evento["id"]
+            if op in estado.get("recursos_enviando", []):
+                estado["recursos_enviando"].remove(op)
+        elif op == "enviando_recurso":
+            enviando = estado.setdefault("recursos_enviando", [])
+            if evento["recurso"] not in enviando:
+                enviando.append(evento["recurso"])
+        elif op == "recurso_conciliado":
+            if evento["recurso"] in estado.get("recursos_enviando", []):
+                estado["recursos_enviando"].remove(evento["recurso"])
+        elif op == "enviando":
+            enviando = estado.setdefault("enviando", [])
+            enviando.extend(pos for pos in evento["pos"] if pos not in enviando)
+        elif op == "item":
+            estado["criados"][str(evento["pos"])] = evento.get("id")
+        elif op == "conciliado":
+            estado["enviando"] = []
+        elif op == "desfeito":
+            if evento["recurso"] == "item":
+                estado["criados"].pop(str(evento["pos"]), None)
+            else:
+                estado[evento["recurso"]] = None
+        elif op == "compensando":
+            estado["status"] = COMPENSANDO
+            estado["tentativas_compensacao"] += 1
+        elif op in (CONCLUIDA, COMPENSADA):
+            estado["status"] = op
+        elif op == FALHOU:
+            estado["status"] = FALHOU
+            estado["residuos"] = evento.get("residuos")
+
+    def registrar(self, saga_id: str, op: str, **dados) -> None:
+        """Grava o evento (fsync) e aplica no estado em memória."""
+        with self._lock:
+            self._carregar()
+            evento = dict(dados, saga=saga_id, op=op, ts=time.time())
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(evento, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._linhas += 1
+            self._aplicar(evento)
+            # Limite relativo: as sagas retidas não provocam compactação a cada evento
+            if self._linhas >= max(SAGA_COMPACT_AFTER, 2 * len(self._sagas)):
+                self.compactar()
+
+    def compactar(self) -> None:
+        """Reescreve o diário com uma linha por saga aberta ou recente (troca atômica)."""
+        with self._lock:
+            self._carregar()
+            limite = time.time() - SAGA_RETENCAO
+            self._sagas = {
+                saga_id: estado for saga_id, estado in self._sagas.items()
+                if estado["status"] in ABERTAS or estado.get("atualizado", 0) >= limite
+            }
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for saga_id, estado in self._sagas.items():
+                    evento = {"saga": saga_id, "op": "estado", "estado": estado}
+                    f.write(json.dumps(evento, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._linhas = len(self._sagas)
+
+    def estado(self, saga_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._carregar()
+            estado = self._sagas.get(saga_id)
+            return copy.deepcopy(estado) if estado is not None else None
+
+    def abertas(self) -> List[str]:
+        with self._lock:
+            self._carregar()
+            return [saga_id for saga_id, estado in self._sagas.items() if estado["status"] in ABERTAS]
+
+
+class GravadorPedido:
+    """Cria numPedido, ordem e itens como uma saga registrada em ``diario``.
+
+    As funções de criação recebem a ``Idempotency-Key`` e devolvem o registro
+    criado (dict com ``id``) ou algo falso em caso de falha; ``criar_itens
+    (payloads, chaves)`` devolve um resultado por item. As de listagem
+    (``listar_num_pedidos(dados_num_pedido)``, ``listar_ordens(num_pedido)``,
+    ``listar_itens(num_pedido)``) devolvem os registros gravados na API ou
+    None se a consulta falhar. As de remoção devolvem algo verdadeiro se
+    apagaram.
+    """
+
+    def __init__(self, diario: DiarioSagas,
+                 criar_num_pedido: Callable[[Dict[str, Any], str], Any],
+                 criar_ordem: Callable[[int, int, str, str], Any],
+                 criar_itens: Callable[[List[Dict[str, Any]], List[str]], List[Any]],
+                 listar_itens: Callable[[Any], Optional[List[Dict[str, Any]]]],
+                 listar_num_pedidos: Callable[[Dict[str, Any]], Optional[List[Dict[str, Any]]]],
+                 listar_ordens: Callable[[Any], Optional[List[Dict[str, Any]]]],
+                 deletar_num_pedido: Callable[[Any], Any],
+                 deletar_ordem: Callable[[Any], Any],
+                 deletar_item: Callable[[Any], Any]):
+        self.diario = diario
+        self.criar_num_pedido = criar_num_pedido
+        self.criar_ordem = criar_ordem
+        self.criar_itens = criar_itens
+        self.listar_itens = listar_itens
+        self.listar_num_pedidos = listar_num_pedidos
+        self.listar_ordens = listar_ordens
+        self.deletar_num_pedido = deletar_num_pedido
+        self.deletar_ordem = deletar_ordem
+        self.deletar_item = deletar_item
+        self._em_execucao = set()
+        self._lock = threading.Lock()
+
+    def registrar(self, dados_num_pedido: Dict[str, Any], id_cliente: int, hora: str,
+                  itens: List[Dict[str, Any]]) -> bool:
+        """Grava o pedido inteiro ou nada; ``itens`` sem numPedido/idOrderPedido."""
+        saga_id = chave_saga(id_cliente, dados_num_pedido, itens)
+        if not self._reservar(saga_id):
+            logger.warning(f"Saga {saga_id[:8]} já está em execução - ignorando")
+            return False
+        try:
+            estado = self.diario.estado(saga_id)
+            if estado is not None and estado["status"] == CONCLUIDA:
+                logger.info(f"Pedido já registrado anteriormente (saga {saga_id[:8]}) - nada a fazer")
+                return True
+            if estado is not None and estado["status"] == COMPENSANDO:
+                # Resto de uma tentativa anterior: limpa antes de começar de novo
+                if not self._compensar(saga_id):
+                    return False
+                estado = None
+            if estado is not None and estado["status"] == FALHOU:
+                logger.warning(f"Saga {saga_id[:8]} anterior deixou registros para limpeza manual: "
+                               f"{estado.get('residuos')}")
+            if estado is None or estado["status"] in (COMPENSADA, FALHOU):
+                self.diario.registrar(saga_id, "inicio", dados_num_pedido=dados_num_pedido,
+                                      id_cliente=id_cliente, hora=hora, itens=itens)
+            else:
+                logger.info(f"Retomando saga {saga_id[:8]} interrompida")
+            return self._executar(saga_id)
+        finally:
+            self._liberar(saga_id)
+
+    def recuperar(self) -> None:
+        """Termina as sagas abertas no diário (chamar na inicialização)."""
+        for saga_id in self.diario.abertas():
+            if not self._reservar(saga_id):
+                continue
+            try:
+                estado = self.diario.estado(saga_id)
+                if estado is None:
+                    continue
+                if estado["status"] == EM_ANDAMENTO:
+                    logger.info(f"Recuperando saga {saga_id[:8]} interrompida")
+                    self._executar(saga_id)
+                elif estado["status"] == COMPENSANDO:
+                    logger.info(f"Concluindo compensação da saga {saga_id[:8]}")
+                    self._compensar(saga_id)
+            except Exception as e:
+                logger.error(f"Erro ao recuperar saga {saga_id[:8]}: {str(e)}", exc_info=True)
+            finally:
+                self._liberar(saga_id)
+
+    # --- Execução ---
+    def _reservar(self, saga_id: str) -> bool:
+        with self._lock:
+            if saga_id in self._em_execucao:
+                return False
+            self._em_execucao.add(saga_id)
+            return True
+
+    def _liberar(self, saga_id: str) -> None:
+        with self._lock:
+            self._em_execucao.discard(saga_id)
+
+    def _executar(self, saga_id: str) -> bool:
+        try:
+            self._criar_recurso(saga_id, "num_pedido", "número do pedido")
+            self._criar_recurso(saga_id, "ordem", "ordem do pedido")
+            estado = self.diario.estado(saga_id)
+            self._criar_itens(saga_id, estado)
+            self.diario.registrar(saga_id, CONCLUIDA)
+            logger.info(f"Pedido {estado['num_pedido']} registrado por completo ({len(estado['itens'])} item(ns))")
+            return True
+        except Exception as e:
+            logger.error(f"Saga {saga_id[:8]} interrompida: {str(e)} - desfazendo registros criados")
+            self._compensar(saga_id)
+            return False
+
+    def _criar_recurso(self, saga_id: str, recurso: str, descricao: str) -> None:
+        """Cria o numPedido ou a ordem uma vez só: registra o envio antes do POST
+        e, se a resposta não vier, procura o registro na API em vez de repetir."""
+        estado = self.diario.estado(saga_id)
+        if estado[recurso]:
+            return
+        if recurso in estado.get("recursos_enviando", []):
+            # Tentativa anterior parou entre o POST e a resposta
+            if not self._conciliar_recurso(saga_id, recurso):
+                raise ErroEtapa(f"Não foi possível conferir a {descricao} já enviada")
+            estado = self.diario.estado(saga_id)
+            if estado[recurso]:
+                return
+        logger.info(f"Criando {descricao} para cliente ID: {estado['id_cliente']}")
+        self.diario.registrar(saga_id, "enviando_recurso", recurso=recurso)
+        try:
+            if recurso == "num_pedido":
+                criado = self.criar_num_pedido(estado["dados_num_pedido"], chave_recurso_saga(saga_id, recurso))
+            else:
+                criado = self.criar_ordem(estado["id_cliente"], int(estado["num_pedido"]), estado["hora"] or "",
+                                          chave_recurso_saga(saga_id, recurso, estado["num_pedido"]))
+        except Exception as e:
+            logger.error(f"Erro ao criar {descricao}: {str(e)}")
+            criado = None
+        if isinstance(criado, dict) and criado.get("id"):
+            self.diario.registrar(saga_id, recurso, id=criado["id"])
+            logger.info(f"{descricao.capitalize()} criada com sucesso: {criado['id']}")
+            return
+        # Sem resposta: o POST pode ter sido gravado mesmo assim
+        if not self._conciliar_recurso(saga_id, recurso):
+            raise ErroEtapa(f"Não foi possível conferir a {descricao} enviada")
+        if not self.diario.estado(saga_id)[recurso]:
+            raise ErroEtapa(f"Falha ao criar {descricao}")
+
+    def _conciliar_recurso(self, saga_id: str, recurso: str) -> bool:
+        """Associa à saga o numPedido/ordem em envio que já existe na API.
+
+        O numPedido é procurado pelo telefone (mesmo cliente, data e hora); a
+        ordem, entre as do numPedido (mesma hora). ``False`` se a consulta
+        falhar (nada é alterado).
+        """
+        estado = self.diario.estado(saga_id)
+        if recurso not in estado.get("recursos_enviando", []):
+            return True
+        if recurso == "num_pedido":
+            dados = estado["dados_num_pedido"]
+            esperado = {k: dados.get(k) for k in ("id_cliente", "fone", "data", "hora")}
+            listar, argumento = self.listar_num_pedidos, dados
+        else:
+            if not estado["num_pedido"]:
+                return True
+            esperado = {"numPedido": estado["num_pedido"], "hora": estado["hora"]}
+            listar, argumento = self.listar_ordens, estado["num_pedido"]
+        try:
+            gravados = listar(argumento)
+        except Exception as e:
+            logger.warning(f"Erro ao procurar {recurso} da saga {saga_id[:8]}: {str(e)}")
+            gravados = None
+        if gravados is None:
+            return False
+        achados = [g for g in gravados if isinstance(g, dict) and g.get("id") and _mesmos_campos(g, esperado)]
+        if len(achados) > 1:
+            logger.warning(f"Saga {saga_id[:8]}: {len(achados)} registros de {recurso} iguais: "
+                           f"{[g['id'] for g in achados]}")
+        if achados:
+            self.diario.registrar(saga_id, recurso, id=achados[-1]["id"])
+        else:
+            self.diario.registrar(saga_id, "recurso_conciliado", recurso=recurso)
+        return True
+
+    def _criar_itens(self, saga_id: str, estado: Dict[str, Any]) -> None:
+        if self._sem_confirmacao(estado):
+            # Tentativa anterior parou entre o POST e a resposta: a API diz o que gravou
+            if not self._conciliar(saga_id):
+                raise ErroEtapa("Não foi possível conferir os itens já enviados")
+            estado = self.diario.estado(saga_id)
+        pendentes = [
+            (pos, dict(item, numPedido=estado["num_pedido"], idOrderPedido=estado["ordem"]))
+            for pos, item in enumerate(estado["itens"], 1)
+            if str(pos) not in estado["criados"]
+        ]
+        if not pendentes:
+            return
+        posicoes = [pos for pos, _ in pendentes]
+        logger.info(f"Criando {len(pendentes)} item(ns) do pedido {estado['num_pedido']}")
+        self.diario.registrar(saga_id, "enviando", pos=posicoes)
+        chaves = [chave_item_saga(saga_id, estado["num_pedido"], pos) for pos in posicoes]
+        try:
+            resultados = self.criar_itens([payload for _, payload in pendentes], chaves)
+        except Exception as e:
+            logger.error(f"Erro ao criar itens do pedido {estado['num_pedido']}: {str(e)}")
+            resultados = []
+        for pos, resultado in zip(posicoes, resultados):
+            id_item = resultado.get("id") if isinstance(resultado, dict) else None
+            if id_item is not None:
+                self.diario.registrar(saga_id, "item", pos=pos, id=id_item)
+        estado = self.diario.estado(saga_id)
+        if self._sem_confirmacao(estado):
+            # Falha ou resposta sem ids: confere na API em vez de reenviar
+            if not self._conciliar(saga_id):
+                raise ErroEtapa("Não foi possível conferir os itens enviados")
+            estado = self.diario.estado(saga_id)
+        falhas = [pos for pos in posicoes if str(pos) not in estado["criados"]]
+        if falhas:
+            raise ErroEtapa(f"Itens com falha: {falhas}")
+
+    @staticmethod
+    def _sem_confirmacao(estado: Dict[str, Any]) -> List[int]:
+        """Posições enviadas à API cujo id ainda não está no diário."""
+        return [pos for pos in estado.get("enviando", []) if str(pos) not in estado["criados"]]
+
+    def _conciliar(self, saga_id: str) -> bool:
+        """Registra os ids dos itens em envio que já existem na API.
+
+        Cada item gravado do numPedido (com a ordem da saga e ainda não
+        associado) é casado com uma posição de mesmo produto, quantidade e
+        observação. As posições que sobram não foram gravadas e voltam a
+        ser pendentes. ``False`` se a consulta falhar (nada é alterado).
+        """
+        estado = self.diario.estado(saga_id)
+        aguardando = self._sem_confirmacao(estado)
+        if not aguardando:
+            return True
+        try:
+            gravados = self.listar_itens(estado["num_pedido"])
+        except Exception as e:
+            logger.warning(f"Erro ao listar itens do pedido {estado['num_pedido']}: {str(e)}")
+            gravados = None
+        if gravados is None:
+            return False
+        conhecidos = {str(id_item) for id_item in estado["criados"].values()}
+        livres = [
+            g for g in gravados
+            if str(g.get("id")) not in conhecidos and str(g.get("idOrderPedido")) == str(estado["ordem"])
+        ]
+        for pos in aguardando:
+            conteudo = _conteudo_item(estado["itens"][pos - 1])
+            achado = next((g for g in livres if _conteudo_item(g) == conteudo), None)
+            if achado is not None and achado.get("id") is not None:
+                livres.remove(achado)
+                self.diario.registrar(saga_id, "item", pos=pos, id=achado["id"])
+        self.diario.registrar(saga_id, "conciliado")
+        return True
+
+    # --- Compensação ---
+    def _compensar(self, saga_id: str) -> bool:
+        """Apaga o que a saga criou (itens, ordem, numPedido); True se não sobrou nada."""
+        self.diario.registrar(saga_id, "compensando")
+        # Registros enviados sem resposta também precisam ser apagados: busca os ids
+        self._conciliar_recurso(saga_id, "num_pedido")
+        self._conciliar_recurso(saga_id, "ordem")
+        self._conciliar(saga_id)
+        estado = self.diario.estado(saga_id)
+        for pos, id_item in sorted(estado["criados"].items(), key=lambda p: -int(p[0])):
+            if id_item is not None and self._apagar(self.deletar_item, id_item):
+                self.diario.registrar(saga_id, "desfeito", recurso="item", pos=int(pos))
+        for recurso, deletar in (("ordem", self.deletar_ordem), ("num_pedido", self.deletar_num_pedido)):
+            if self._sem_confirmacao(estado) or estado.get("recursos_enviando"):
+                break  # ordem/numPedido ficam até saber o que existe abaixo deles
+            if estado[recurso] and self._apagar(deletar, estado[recurso]):
+                self.diario.registrar(saga_id, "desfeito", recurso=recurso)
+
+        estado = self.diario.estado(saga_id)
+        residuos = {
+            "itens": list(estado["criados"].values()),
+            "itens_sem_confirmacao": self._sem_confirmacao(estado),
+            "recursos_sem_confirmacao": list(estado.get("recursos_enviando", [])),
+            "ordem": estado["ordem"],
+            "num_pedido": estado["num_pedido"],
+        }
+        if not any(residuos.values()):
+            self.diario.registrar(saga_id, COMPENSADA)
+            logger.info(f"Saga {saga_id[:8]} desfeita: nenhum registro órfão")
+            return True
+        if estado["tentativas_compensacao"] >= SAGA_COMPENSACAO_MAX or None in residuos["itens"]:
+            # Sem id (diário antigo) ou API recusando: só manualmente
+            self.diario.registrar(saga_id, FALHOU, residuos=residuos)
+            logger.error(f"Saga {saga_id[:8]}: não foi possível desfazer tudo; limpar manualmente: {residuos}")
+        else:
+            logger.warning(f"Saga {saga_id[:8]}: compensação incompleta, nova tentativa depois: {residuos}")
+        return False
+
+    @staticmethod
+    def _apagar(deletar: Callable[[Any], Any], id_registro: Any) -> bool:
+        try:
+            return bool(deletar(id_registro))
+        except Exception as e:
+            logger.warning(f"Erro ao apagar registro {id_registro}: {str(e)}")
+            return False
@@ -4,10 +4,13 @@ import websockets
 import json
 import logging
 import os
-from typing import Set, Optional, Dict, Any
+from typing import List, Optional, Dict, Any
 from datetime import datetime
 from pedidosDropletModel import LePaponAPI
-from registra_pedido import processar_json
+from registra_pedido import catalogo_precos, gravador_pedidos, processar_json
+from fila_pedidos import FilaPedidos
+from dedup_pedidos import chave_item, get_dedup
+from limitador import get_limitador
 
 # Configuração de logging
 logging.basicConfig(
@@ -31,8 +34,8 @@ RECONNECT_DELAY = 5  # segundos
 DELAY_BUSCAR_PEDIDO = 5  # segundos
 DELAY_ANTES_PROCESSAR = 2  # segundos
 
-# Controle de pedidos processados (evita duplicatas)
-pedidos_processados: Set[str] = set()
+# Controle de pedidos processados (evita duplicatas; persistido entre reinícios)
+pedidos_processados = get_dedup()
 
 # Métricas
 class Metricas:
@@ -56,49 +59,44 @@ metricas = Metricas()
 api = LePaponAPI(URL_BASE_API_REMOTE)
 
 
-def _criar_chave_pedido(session_id: str, timestamp: Optional[str] = None) -> str:
+def _itens_pedido(pedido: Any) -> List[Dict[str, Any]]:
     """
-    Cria uma chave única para identificar um pedido processado.
+    Normaliza a resposta de ``buscar_por_fone`` para uma lista de itens.
     
     Args:
-        session_id: ID da sessão (telefone do cliente)
-        timestamp: Timestamp opcional para maior especificidade
+        pedido: Lista, objeto ou string JSON retornado pela API
         
     Returns:
-        String única representando o pedido
+        Lista de itens (dicts) do pedido
     """
-    if timestamp:
-        return f"{session_id}_{timestamp}"
-    return f"{session_id}_{datetime.now().strftime('%Y%m%d%H%M')}"
+    if isinstance(pedido, str):
+        pedido = json.loads(pedido)
+    if isinstance(pedido, dict):
+        pedido = [pedido]
+    return [p for p in (pedido or []) if isinstance(p, dict)]
 
 
 def _ja_processado(chave: str) -> bool:
     """
-    Verifica se um pedido já foi processado.
+    Verifica se um item de pedido já foi processado.
     
     Args:
-        chave: Chave única do pedido
+        chave: Chave do item (id do servidor ou hash do conteúdo)
         
     Returns:
         True se já foi processado, False caso contrário
     """
-    return chave in pedidos_processados
+    return pedidos_processados.contem(chave)
 
 
-def _marcar_como_processado(chave: str) -> None:
+def _marcar_como_processado(*chaves: str) -> None:
     """
-    Marca um pedido como processado.
+    Marca itens de pedido como processados (memória + disco).
     
     Args:
-        chave: Chave única do pedido
+        chaves: Chaves dos itens
     """
-    pedidos_processados.add(chave)
-    # Limita o tamanho do set para evitar uso excessivo de memória
-    if len(pedidos_processados) > 1000:
-        # Remove os 100 mais antigos
-        for _ in range(100):
-            pedidos_processados.pop()
-    logger.debug(f"Pedido marcado como processado: {chave}")
+    pedidos_processados.marcar(*chaves)
 
 
 async def _processar_pedido(session_id: str, dados: Optional[Dict[str, Any]] = None) -> bool:
@@ -113,38 +111,38 @@ async def _processar_pedido(session_id: str, dados: Optional[Dict[str, Any]] = N
         True se processado com sucesso, False caso contrário
     """
     try:
-        # Cria chave única para evitar duplicatas
-        chave_pedido = _criar_chave_pedido(session_id)
-        
-        if _ja_processado(chave_pedido):
-            logger.warning(f"Pedido já processado anteriormente: {session_id}")
-            return False
-        
         logger.info(f"Buscando pedido para telefone: {session_id}")
         await asyncio.sleep(DELAY_BUSCAR_PEDIDO)
         
-        pedido = api.buscar_por_fone(session_id)
+        await get_limitador().aguardar_async("droplet")
+        pedido = await fila_pedidos.executar(api.buscar_por_fone, session_id)
         
-        if not pedido:
+        itens = _itens_pedido(pedido)
+        if not itens:
             logger.warning(f"Nenhum pedido encontrado para o telefone: {session_id}")
             return False
         
+        # Só os itens ainda não registrados (por id do servidor ou conteúdo)
+        chaves = [chave_item(item) for item in itens]
+        novos = [(chave, item) for chave, item in zip(chaves, itens) if not _ja_processado(chave)]
+        if not novos:
+            logger.warning(f"Pedido já processado anteriormente: {session_id}")
+            return False
+        if len(novos) < len(itens):
+            logger.info(f"{len(itens) - len(novos)} item(ns) de {session_id} já processado(s) - ignorando")
+        
         logger.info(f"Pedido encontrado para {session_id}. Preparando para processar...")
         await asyncio.sleep(DELAY_ANTES_PROCESSAR)
         
-        # Converte pedido para JSON string se necessário
-        if isinstance(pedido, (list, dict)):
-            pedido_json = json.dumps(pedido)
-        else:
-            pedido_json = pedido
+        pedido_json = json.dumps([item for _, item in novos])
         
-        # Processa o pedido
-        resultado = processar_json(pedido_json)
+        # Processa o pedido (HTTP bloqueante: roda no pool de threads da fila)
+        resultado = await fila_pedidos.executar(processar_json, pedido_json)
         
         if resultado and resultado.get('sucesso'):
             logger.info(f"✅ Pedido processado com sucesso: {session_id}")
             logger.info(f"   {resultado.get('mensagem')}")
-            _marcar_como_processado(chave_pedido)
+            _marcar_como_processado(*(chave for chave, _ in novos))
             metricas.pedidos_processados_sucesso += 1
             return True
         else:
@@ -164,6 +162,11 @@ async def _processar_pedido(session_id: str, dados: Optional[Dict[str, Any]] = N
         return False
 
 
+# Fila com workers: pedidos de telefones diferentes em paralelo, do mesmo telefone em sequência
+# (PEDIDOS_WORKERS / PEDIDOS_FILA_MAX configuram o tamanho)
+fila_pedidos = FilaPedidos(_processar_pedido)
+
+
 async def listen_custom_messages():
     """
     Escuta mensagens do WebSocket e processa pedidos em tempo real.
@@ -173,6 +176,18 @@ async def listen_custom_messages():
     
     logger.info(f"🚀 Iniciando cliente WebSocket...")
     logger.info(f"📡 Conectando a: {WEBSOCKET_URL}")
+    # Workers ficam de pé entre reconexões: pedidos na fila não se perdem
+    fila_pedidos.iniciar()
+    # Carrega o catálogo de preços antes do primeiro pedido
+    try:
+        await fila_pedidos.executar(catalogo_precos.atual)
+    except Exception as e:
+        logger.warning(f"Não foi possível carregar o catálogo de preços: {e}")
+    # Termina pedidos interrompidos por uma queda anterior (continua ou desfaz)
+    try:
+        await fila_pedidos.executar(gravador_pedidos.recuperar)
+    except Exception as e:
+        logger.error(f"Erro ao recuperar pedidos interrompidos: {e}", exc_info=True)
     
     while True:
         try:
@@ -183,6 +198,7 @@ async def listen_custom_messages():
             ) as websocket:
                 logger.info("✅ Conectado ao WebSocket com sucesso!")
                 metricas.log_status()
+                fila_pedidos.log_status()
                 
                 async for message in websocket:
                     try:
@@ -201,7 +217,8 @@ async def listen_custom_messages():
                             logger.info(f"   Sessão: {session_id}")
                             
                             if session_id:
-                                await _processar_pedido(session_id, dados_adicionais)
+                                # Só enfileira: o laço volta a ler o socket na hora
+                                await fila_pedidos.enfileirar(session_id, dados_adicionais)
                             else:
                                 logger.warning("Mensagem sem session_id - ignorando")
                         
@@ -224,6 +241,8 @@ async def listen_custom_messages():
                         # Log de métricas a cada 50 mensagens
                         if metricas.total_mensagens % 50 == 0:
                             metricas.log_status()
+                            fila_pedidos.log_status()
+                            get_limitador().log_status()
                     
                     except json.JSONDecodeError as e:
                         logger.error(f"Erro ao decodificar mensagem JSON: {str(e)}")
@@ -258,6 +277,8 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logger.info("\n⚠️  Interrompido pelo usuário")
         metricas.log_status()
+        fila_pedidos.log_status()
+        get_limitador().log_status()
         logger.info("👋 Encerrando cliente WebSocket...")
     except Exception as e:
         logger.error(f"Erro fatal: {str(e)}", exc_info=True)
\ No newline at end of file
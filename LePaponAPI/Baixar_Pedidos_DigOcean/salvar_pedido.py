@@ -6,6 +6,7 @@ from datetime import datetime
 from typing import Optional, Dict, List, Any
 from models.numPedidoModel import NumPedidoAPI
 from models.pedidosModel import PedidoAPI
+from models.dedup_pedidos import chave_item, get_dedup
 
 class PedidoManager:
     """
@@ -17,6 +18,8 @@ class PedidoManager:
         self.base_url = local_base_url
         self.num_pedido_api = NumPedidoAPI()
         self.pedido_api = PedidoAPI()
+        # Mesmo registro de processados usado pelo websocket_pedido
+        self.dedup = get_dedup()
     
     # ===== MÉTODOS UTILITÁRIOS =====
     
@@ -89,7 +92,8 @@ class PedidoManager:
         """Verifica se o pedido já existe no servidor local para evitar duplicidade."""
         if not num_pedido:
             return False
-            
+        
+        # Sempre confirmado na API: um registro local pode ter sido desfeito
         url_temp = f"{self.base_url}/numpedidos/{num_pedido}"
         try:
             resp_temp = requests.get(url_temp)
@@ -102,7 +106,6 @@ class PedidoManager:
                 p.get("hora") == pedido_payload["hora"] 
                 for p in pedidos_temp
             )
-            
             return existe_temp
         except Exception as e:
             print(f"Erro ao buscar pedidos temporários: {e}")
@@ -166,6 +169,11 @@ class PedidoManager:
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, self.salvar_pedido_local, endpoint, item)
     
+    async def async_salvar_pedidos_local(self, itens: List[Dict]) -> List[Any]:
+        """Cria vários itens de pedido de uma vez; retorna um resultado por item."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.pedido_api.criar_pedidos, itens)
+    
     async def async_pedido_existe_localmente(self, pedido_payload: Dict, num_pedido: Optional[int] = None) -> bool:
         """Versão assíncrona de pedido_existe_localmente."""
         loop = asyncio.get_event_loop()
@@ -178,20 +186,33 @@ class PedidoManager:
                                        hora_item: str, data: str, 
                                        df_produtos: Optional[pd.DataFrame] = None) -> None:
         """
-        Processa e salva uma lista de pedidos usando pandas para merge com produtos.
+        Processa e salva uma lista de pedidos, buscando o preço de cada item em df_produtos.
         """
         if df_produtos is not None and not df_produtos.empty:
             df_pedidos = pd.DataFrame(pedidos)
-            df_merged = pd.merge(df_pedidos, df_produtos, left_on="id_Prod", right_on="id_Prod", how="left")
+            if not df_pedidos.empty and "Valor_Prod" not in df_pedidos.columns:
+                # Preço por id do produto via map (vetorizado, sem merge/iterrows)
+                precos = pd.Series(df_produtos["Valor_Prod"].values, index=df_produtos["id_Prod"].astype(str))
+                precos = precos[~precos.index.duplicated()]
+                df_pedidos["Valor_Prod"] = df_pedidos["id_Prod"].astype(str).map(precos)
             
-            for _, pedido in df_merged.iterrows():
-                data_pedido = pedido.get("data", data)
-                hora_pedido = pedido.get("hora", hora_item)
-                pedido_dict = pedido.to_dict()
-                payload = self.montar_pedido_payload(
-                    id_cliente, num_pedido, id_order_pedido, 
-                    pedido_dict, data_pedido, hora_pedido
+            payloads = [
+                self.montar_pedido_payload(
+                    id_cliente, num_pedido, id_order_pedido,
+                    pedido, pedido.get("data", data), pedido.get("hora", hora_item)
                 )
-                await self.async_salvar_pedido_local("pedidos", payload)
+                for pedido in df_pedidos.to_dict(orient="records")
+            ]
+            # Todos os itens do pedido numa só chamada (bulk ou POSTs paralelos)
+            resultados = await self.async_salvar_pedidos_local(payloads)
+            # Mesmas chaves (id do servidor ou hash do conteúdo) do websocket_pedido
+            salvos = []
+            for pedido, payload, resultado in zip(pedidos, payloads, resultados):
+                if not resultado:
+                    print(f"Erro ao salvar pedido localmente - Payload: {payload}")
+                else:
+                    salvos.append(chave_item(pedido))
+            if salvos:
+                self.dedup.marcar(*salvos)
         else:
             print("DataFrame de produtos está vazio ou não foi fornecido. Não será possível processar os pedidos.")
@@ -2,83 +2,170 @@ import flet as ft
 from models.pedidosModel import PedidoAPI
 from models.numPedidoModel import NumPedidoAPI
 from models.orderPedidoModel import OrderPedidoAPI
+from models.websocket_eventos import escutar_eventos
+from models.cozinha_model import CozinhaModel
+from utils.lista_chaveada import ListaChaveada
 import asyncio
-import pandas as pd
+import os
 from models.produtosTodos import Produtos
 
 pedidoAPI = PedidoAPI()
 numPedidoAPI = NumPedidoAPI()
 orderPedidoAPI = OrderPedidoAPI()
 
+# A tela é atualizada por partes: só os itens novos (sinceId) e as ordens a
+# que pertencem. Isso roda a cada COZINHA_POLL segundos (pedidos do balcão
+# não geram evento) e logo após cada "new_order" do WebSocket. A recarga
+# completa fica para a reconciliação (ordens encerradas em outro terminal,
+# itens apagados). Se o servidor ignorar sinceId cada passada baixaria a
+# lista inteira: o intervalo passa a COZINHA_POLL_SEM_FILTRO.
+POLL_SEGUNDOS = float(os.getenv("COZINHA_POLL", "5"))
+POLL_SEM_FILTRO_SEGUNDOS = float(os.getenv("COZINHA_POLL_SEM_FILTRO", "60"))
+RECONCILIACAO_SEGUNDOS = float(os.getenv("COZINHA_RECONCILIACAO", "120"))
+# Após um new_order o Baixar_Pedidos ainda está gravando os itens na API local
+ATRASO_APOS_EVENTO = 0.5
+
 def main(page: ft.Page):
     page.title = "Pedidos da Cozinha"
     page.vertical_alignment = ft.MainAxisAlignment.START
-    lista_widgets = []
     page.theme_mode = ft.ThemeMode.LIGHT
 
-    async def atualizar_pedidos():
-        produtos_api = Produtos()
-        produtos = produtos_api.listar_produtos() or []
-        df_produtos = pd.DataFrame(produtos)
-        # host = "192.168.15.6"
-        # port = 2380
+    produtos_api = Produtos()
+    # Nomes dos produtos indexados uma única vez; ordens e itens a cada recarga
+    modelo = CozinhaModel(produtos_api.listar_produtos() or [])
+
+    lista = ft.Column([], height=900, scroll=ft.ScrollMode.AUTO)
+    page.add(
+        ft.Container(
+            content=lista,
+            width=1200,
+            height=900,
+            bgcolor=ft.Colors.WHITE,
+            padding=10,
+            border_radius=10
+        )
+    )
+    recarga_lock = asyncio.Lock()
+    carga_inicial = asyncio.Event()
+
+    def buscar_dados():
+        pedidos = pedidoAPI.listar_pedidos() or []
+        num_pedido = numPedidoAPI.listar_num_pedidos() or []
+        order_pedidos = orderPedidoAPI.listar_ordem_pedidos() or []
+        return pedidos, num_pedido, order_pedidos
+
+    def buscar_novos(ultimo_item_id):
+        """Itens novos e as ordens/clientes que o modelo ainda não tem (None se falhar)."""
+        itens = pedidoAPI.listar_pedidos_desde(ultimo_item_id)
+        if not itens:
+            return None if itens is None else ([], [], [])
+        ordens = []
+        for order_id in modelo.ordens_faltantes(itens):
+            ordem = orderPedidoAPI.buscar_ordem_pedido_por_id(order_id)
+            if not isinstance(ordem, dict):
+                return None  # tenta de novo na próxima passada, sem perder os itens
+            ordens.append(ordem)
+        clientes = []
+        for num_id in {o.get("numPedido") for o in ordens} - set(modelo.nomes_cliente):
+            num = numPedidoAPI.buscar_num_pedido_por_id(num_id)
+            if isinstance(num, dict):
+                clientes.append(num)
+        return itens, ordens, clientes
+
+    def montar_tickets(pedidos, num_pedido, order_pedidos):
+        """Retorna {id da ordem: (hora, cliente, itens_texto)} das ordens ativas com itens da cozinha."""
+        modelo.carregar(pedidos, num_pedido, order_pedidos)
+        return modelo.tickets()
+
+    def desativar_ordem(order_id):
+        hora = modelo.ordens.get(order_id, {}).get("hora", "")
+        resOrderUpdate = orderPedidoAPI.atualizar_ordem_pedido(order_id, hora=hora, ativo_status=0)
+        print(f"Ordem {order_id} atualizada: {resOrderUpdate}")
+        # Remove o ticket na hora, sem esperar a próxima recarga
+        modelo.remover_ordem(order_id)
+        aplicar_diff(modelo.tickets())
+
+    def criar_widgets(order_id, ticket):
+        hora, cliente_nome, itens_texto = ticket
+        checkbox = ft.Checkbox(
+            label="Desativar ordem",
+            value=False,
+            on_change=lambda e, order_id=order_id: desativar_ordem(order_id),
+            width=200,
+        )
+        item = ft.ListTile(
+            title=ft.Text(f"Hora: {hora} - Cliente: {cliente_nome}", size=26, color=ft.Colors.BLUE_800, weight=ft.FontWeight.BOLD),
+            subtitle=ft.Text(itens_texto, size=24),
+            trailing=checkbox,
+            width=1100,
+        )
+        return [item, ft.Divider()]
+
+    def atualizar_widgets(widgets, ticket):
+        hora, cliente_nome, itens_texto = ticket
+        item = widgets[0]
+        item.title.value = f"Hora: {hora} - Cliente: {cliente_nome}"
+        item.subtitle.value = itens_texto
+
+    # Tickets por id da ordem: só os criados/alterados/removidos vão para a TV
+    tickets = ListaChaveada(criar_widgets, atualizar_widgets)
+
+    def aplicar_diff(novos):
+        """Cria/atualiza/remove só os tickets que mudaram e envia um único update."""
+        tickets.aplicar(lista, novos.items(), page)
+
+    async def recarregar():
+        async with recarga_lock:
+            loop = asyncio.get_running_loop()
+            dados = await loop.run_in_executor(None, buscar_dados)
+            aplicar_diff(montar_tickets(*dados))
+            carga_inicial.set()
+
+    async def atualizar_novos():
+        """Aplica só os itens criados desde a última passada."""
+        async with recarga_lock:
+            loop = asyncio.get_running_loop()
+            dados = await loop.run_in_executor(None, buscar_novos, modelo.ultimo_item_id)
+            if not dados or not dados[0]:
+                return
+            itens, ordens, clientes = dados
+            for ordem in ordens:
+                modelo.atualizar_ordem(ordem)
+            for num in clientes:
+                modelo.atualizar_cliente(num)
+            for item in itens:
+                modelo.adicionar_item(item)
+            aplicar_diff(modelo.tickets())
+
+    async def atualizar_apos(atraso):
+        await asyncio.sleep(atraso)
+        try:
+            await atualizar_novos()
+        except Exception as e:
+            print(f"Erro ao atualizar pedidos: {e}")
+
+    async def on_evento(evento, dados):
+        if carga_inicial.is_set():
+            asyncio.create_task(atualizar_apos(ATRASO_APOS_EVENTO))
+
+    async def acompanhar():
+        await carga_inicial.wait()
+        while True:
+            if pedidoAPI.since_id_suportado is False:
+                await atualizar_apos(POLL_SEM_FILTRO_SEGUNDOS)
+            else:
+                await atualizar_apos(POLL_SEGUNDOS)
+
+    async def reconciliar():
         while True:
-            pedidos = pedidoAPI.listar_pedidos() or []
-            num_pedido = numPedidoAPI.listar_num_pedidos() or []
-            order_pedidos = orderPedidoAPI.listar_ordem_pedidos() or []
-            pedidos_ativos = [order for order in order_pedidos if order.get("ativo") == 1]
-            lista_widgets.clear()
-            for order in pedidos_ativos:
-                num_pedido_id = order.get("numPedido")
-                cliente_nome = "Desconhecido"
-                for numpedido in num_pedido:
-                    if numpedido["id"] == num_pedido_id:
-                        cliente_nome = numpedido["nome"]
-                        break
-                pedido = [pedido for pedido in pedidos if pedido["idOrderPedido"] == order["id"] and 10100 <= pedido["id_Prod"] <= 11017]
-                if not pedido:
-                    continue  # pula ordens sem itens após filtro
-                df_pedido = pd.DataFrame(pedido)
-                df_merged = pd.merge(df_pedido, df_produtos, left_on="id_Prod", right_on="id_Prod", how="left")
-                itens_texto = "\n".join(f"{row['qtd']} - {row['nome_Prod']} - {row['observ']}" for _, row in df_merged.iterrows())
-                def on_checkbox_change(e, order_id=order["id"]):
-                    # Atualiza status da ordem para inativo
-                    resOrderUpdate = orderPedidoAPI.atualizar_ordem_pedido(order_id, hora=order["hora"], ativo_status=0)
-                    print(f"Ordem {order_id} atualizada: {resOrderUpdate}")
-                    # Atualiza a lista imediatamente
-                    page.clean()
-                    page.add(ft.Column(lista_widgets))
-                    page.update()
-
-                checkbox = ft.Checkbox(
-                    label="Desativar ordem",
-                    value=False,
-                    on_change=on_checkbox_change,
-                    width=200,
-                )
-                item = ft.ListTile(
-                    title=ft.Text(f"Hora: {order['hora']} - Cliente: {cliente_nome}", size=26, color=ft.Colors.BLUE_800, weight=ft.FontWeight.BOLD),
-                    subtitle=ft.Text(itens_texto, size=24),
-                    trailing=checkbox,
-                    width=1100,
-                )
-                lista_widgets.append(item)
-                lista_widgets.append(ft.Divider())
-            page.clean()
-            # Adiciona rolagem à lista de ordens
-            page.add(
-                ft.Container(
-                    content=ft.Column(lista_widgets, height=900, scroll=ft.ScrollMode.AUTO),
-                    width=1200,
-                    height=900,
-                    bgcolor=ft.Colors.WHITE,
-                    padding=10,
-                    border_radius=10
-                )
-            )
-            page.update()
-            await asyncio.sleep(15)
-
-    page.run_task(atualizar_pedidos)
+            try:
+                await recarregar()
+            except Exception as e:
+                print(f"Erro ao recarregar pedidos: {e}")
+            await asyncio.sleep(RECONCILIACAO_SEGUNDOS)
+
+    page.run_task(reconciliar)
+    page.run_task(acompanhar)
+    page.run_task(escutar_eventos, on_evento)
 
 ft.app(target=main, view=ft.AppView.FLET_APP)
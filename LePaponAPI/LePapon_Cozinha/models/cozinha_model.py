@@ -0,0 +1,112 @@
+"""Modelo em memória da tela da cozinha, com índices por dicionário.
+
+Os índices são montados numa única passada por recarga (O(n) no total de
+registros); a montagem dos tickets percorre só as ordens ativas, então o
+custo de desenhar a tela acompanha o número de tickets abertos e não o
+histórico inteiro de pedidos.
+
+Entre as recargas completas o modelo é atualizado por partes: itens novos
+(id acima de ``ultimo_item_id``) entram com ``adicionar_item`` e as ordens
+e clientes que eles referenciam com ``atualizar_ordem``/``atualizar_cliente``.
+"""
+
+ID_PROD_COZINHA = (10100, 11017)  # faixa de produtos preparados na cozinha
+
+
+def _id(registro):
+    try:
+        return int(registro.get("id"))
+    except (TypeError, ValueError):
+        return 0
+
+
+class CozinhaModel:
+    def __init__(self, produtos=None, faixa_produtos=ID_PROD_COZINHA):
+        self.faixa_produtos = faixa_produtos
+        self.nomes_produto = {}     # id_Prod -> nome_Prod
+        self.nomes_cliente = {}     # id do numPedido -> nome
+        self.ordens = {}            # id da ordem ativa -> ordem
+        self.itens_por_ordem = {}   # idOrderPedido -> [itens da cozinha]
+        self.ultimo_item_id = 0     # maior id de item já visto (carga incremental)
+        if produtos:
+            self.carregar_produtos(produtos)
+
+    # --- Montagem ---
+    def carregar_produtos(self, produtos):
+        self.nomes_produto = {p.get("id_Prod"): p.get("nome_Prod") for p in produtos if isinstance(p, dict)}
+
+    def _da_cozinha(self, item):
+        try:
+            return self.faixa_produtos[0] <= int(item.get("id_Prod")) <= self.faixa_produtos[1]
+        except (TypeError, ValueError):
+            return False
+
+    def carregar(self, pedidos, num_pedido, order_pedidos):
+        """Reconstrói os índices a partir das listas da API."""
+        ordens = {o["id"]: o for o in order_pedidos if isinstance(o, dict) and o.get("ativo") == 1}
+        itens_por_ordem = {}
+        ultimo_item_id = 0
+        for item in pedidos:
+            if not isinstance(item, dict):
+                continue
+            ultimo_item_id = max(ultimo_item_id, _id(item))
+            order_id = item.get("idOrderPedido")
+            # Itens de ordens já encerradas não interessam à cozinha
+            if order_id in ordens and self._da_cozinha(item):
+                itens_por_ordem.setdefault(order_id, []).append(item)
+        # Troca os índices de uma vez (a UI pode ler o modelo de outra thread)
+        self.nomes_cliente = {n.get("id"): n.get("nome") for n in num_pedido if isinstance(n, dict)}
+        self.ordens, self.itens_por_ordem = ordens, itens_por_ordem
+        self.ultimo_item_id = ultimo_item_id
+
+    # --- Atualizações pontuais ---
+    def atualizar_ordem(self, ordem):
+        if ordem.get("ativo") == 1:
+            self.ordens[ordem["id"]] = ordem
+        else:
+            self.remover_ordem(ordem["id"])
+
+    def remover_ordem(self, order_id):
+        self.ordens.pop(order_id, None)
+        self.itens_por_ordem.pop(order_id, None)
+
+    def atualizar_cliente(self, num_pedido):
+        self.nomes_cliente[num_pedido.get("id")] = num_pedido.get("nome")
+
+    def ordens_faltantes(self, itens):
+        """Ids das ordens dos ``itens`` da cozinha que ainda não estão no modelo."""
+        faltantes = []
+        for item in itens:
+            order_id = item.get("idOrderPedido")
+            if self._da_cozinha(item) and order_id not in self.ordens and order_id not in faltantes:
+                faltantes.append(order_id)
+        return faltantes
+
+    def adicionar_item(self, item):
+        self.ultimo_item_id = max(self.ultimo_item_id, _id(item))
+        order_id = item.get("idOrderPedido")
+        if order_id in self.ordens and self._da_cozinha(item):
+            itens = self.itens_por_ordem.setdefault(order_id, [])
+            itens[:] = [i for i in itens if i.get("id") != item.get("id")] + [item]
+
+    # --- Leitura ---
+    def ticket(self, order_id):
+        """``(hora, cliente, itens_texto)`` da ordem ou ``None`` se não há itens da cozinha."""
+        ordem = self.ordens.get(order_id)
+        itens = self.itens_por_ordem.get(order_id)
+        if ordem is None or not itens:
+            return None
+        cliente_nome = self.nomes_cliente.get(ordem.get("numPedido")) or "Desconhecido"
+        itens_texto = "\n".join(
+            f"{i.get('qtd')} - {self.nomes_produto.get(i.get('id_Prod'))} - {i.get('observ')}" for i in itens
+        )
+        return ordem.get("hora"), cliente_nome, itens_texto
+
+    def tickets(self):
+        """``{id da ordem: ticket}`` na ordem em que as ordens chegaram da API."""
+        saida = {}
+        for order_id in list(self.ordens):
+            ticket = self.ticket(order_id)
+            if ticket is not None:
+                saida[order_id] = ticket
+        return saida
@@ -5,11 +5,14 @@ from dotenv import load_dotenv
 load_dotenv()
 
 BASE_URL = "http://lepapon.api/api/pedidos"
+TIMEOUT = float(os.getenv("COZINHA_TIMEOUT", "10"))
 
 
 class PedidoAPI:
     def __init__(self, base_url=BASE_URL):
         self.base_url = base_url
+        # None até a primeira resposta que permita saber se o servidor aplica sinceId
+        self.since_id_suportado = None
         
 
     def criar_pedido(self, data):
@@ -32,6 +35,42 @@ class PedidoAPI:
             print(f"Erro ao listar pedidos: {e}")
             return None
 
+    def listar_pedidos_desde(self, ultimo_id):
+        """Itens com id maior que ``ultimo_id``.
+
+        Pede ``sinceId`` ao servidor e filtra de novo aqui, para o caso de o
+        servidor ignorar o parâmetro e devolver a lista inteira; nesse caso
+        ``since_id_suportado`` passa a False.
+        """
+        try:
+            resp = requests.get(self.base_url, params={"sinceId": ultimo_id}, timeout=TIMEOUT)
+            resp.raise_for_status()
+            dados = resp.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"Erro ao listar pedidos desde {ultimo_id}: {e}")
+            return None
+        if not isinstance(dados, list):
+            return None
+        novos = []
+        antigos = 0
+        for item in dados:
+            try:
+                if not isinstance(item, dict):
+                    continue
+                if int(item.get("id")) > ultimo_id:
+                    novos.append(item)
+                else:
+                    antigos += 1
+            except (TypeError, ValueError):
+                continue
+        if antigos:
+            if self.since_id_suportado is not False:
+                print("Servidor ignora sinceId: consulta rápida desativada")
+            self.since_id_suportado = False
+        elif ultimo_id and dados:
+            self.since_id_suportado = True
+        return novos
+
     def buscar_pedido_por_id(self, id):
         try:
             resp = requests.get(f"{self.base_url}/{id}")
@@ -0,0 +1,100 @@
+"""Assinatura dos eventos do WebSocket do LePapon para a tela da cozinha.
+
+Mesma origem de conexão usada em ``Baixar_Pedidos_DigOcean/main.py``: a URI
+(e o token) vem do endpoint ``/api/websocket/connection`` com fallback para
+as variáveis ``WS_URL`` / ``WS_AUTH_TOKEN``. A conexão é refeita
+automaticamente se cair.
+"""
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs, urlparse, urlunparse
+
+import requests
+import websockets
+
+RECONNECT_DELAY = 5  # segundos
+PING_INTERVAL = 20  # segundos
+
+
+def _http_to_ws(url):
+    if url.startswith("https://"):
+        return "wss://" + url[len("https://"):]
+    if url.startswith("http://"):
+        return "ws://" + url[len("http://"):]
+    return url
+
+
+def _normalize_public_ws_uri(uri):
+    """Normaliza URIs retornadas pelo servidor (ex: ws://localhost:3001) para uso externo."""
+    try:
+        parsed = urlparse(uri)
+        if parsed.hostname in {"localhost", "127.0.0.1"}:
+            port = parsed.port or 3001
+            return urlunparse(parsed._replace(netloc=f"lepapon.com.br:{port}"))
+    except Exception:
+        pass
+    return uri
+
+
+def get_connection_uri():
+    """Monta a URI do WebSocket já com o token (ou None se não houver token)."""
+    endpoint = os.getenv("WS_CONNECTION_INFO_ENDPOINT", "https://lepapon.com.br/api/websocket/connection")
+    uri = None
+    token = os.getenv("WS_AUTH_TOKEN") or os.getenv("WEBSOCKET_TOKEN")
+    try:
+        response = requests.get(endpoint, timeout=10)
+        if response.status_code == 200:
+            ws = ((response.json() or {}).get("data") or {}).get("websocket") or {}
+            if ws.get("url"):
+                uri = _http_to_ws(ws["url"])
+            elif ws.get("port"):
+                uri = f"ws://lepapon.com.br:{ws['port']}"
+    except Exception:
+        pass
+    uri = _normalize_public_ws_uri(uri or os.getenv("WS_URL", "ws://lepapon.com.br:3001"))
+
+    if "token" in parse_qs(urlparse(uri).query):
+        return uri
+    if not token:
+        try:
+            r = requests.get(os.getenv("WS_TOKEN_ENDPOINT", "https://lepapon.com.br/api/websocket/token"), timeout=10)
+            if r.status_code == 200:
+                token = (r.json() or {}).get("token")
+        except Exception:
+            token = None
+    if not token:
+        return None
+    joiner = "&" if urlparse(uri).query else "?"
+    return f"{uri}{joiner}token={token}"
+
+
+async def escutar_eventos(callback, eventos=("new_order",)):
+    """Chama ``await callback(evento, dados)`` para cada evento de interesse.
+
+    Roda indefinidamente, reconectando após quedas. A URI é obtida numa
+    thread para não travar o loop da interface.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        uri = await loop.run_in_executor(None, get_connection_uri)
+        if not uri:
+            print("⚠️ Token do WebSocket ausente; nova tentativa em breve")
+            await asyncio.sleep(RECONNECT_DELAY * 12)
+            continue
+        try:
+            async with websockets.connect(uri, ping_interval=PING_INTERVAL) as websocket:
+                print("✅ Cozinha conectada ao WebSocket LePapon")
+                async for message in websocket:
+                    try:
+                        data = json.loads(message)
+                    except ValueError:
+                        continue
+                    evento = data.get("event")
+                    if evento in eventos:
+                        await callback(evento, data.get("data") or {})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ WebSocket da cozinha desconectado: {e}")
+        await asyncio.sleep(RECONNECT_DELAY)
@@ -0,0 +1,99 @@
+"""
+Reconciliação de listas de controles do Flet por chave.
+
+Em vez de recriar todos os controles a cada recarga, ``ListaChaveada`` guarda
+o controle de cada registro (pela chave, normalmente o id) e entre uma
+recarga e outra:
+
+- reaproveita o controle se os dados não mudaram (nada é enviado);
+- altera o controle existente se os dados mudaram;
+- cria controles só para chaves novas e descarta as que sumiram.
+
+O Flet só envia ao cliente as propriedades que mudaram nos controles já
+montados, então reaproveitar os objetos evita o redesenho completo (e o
+"piscar") da lista. ``aplicar`` ainda restringe o ``page.update`` aos
+controles alterados quando a ordem/composição da lista não mudou.
+"""
+
+
+class ListaChaveada:
+    """Mantém os controles de uma lista entre redesenhos, indexados por chave.
+
+    ``criar(chave, dados)`` devolve o controle (ou uma lista de controles) do
+    registro; ``atualizar(controle, dados)`` altera em lugar o que ``criar``
+    devolveu. Sem ``atualizar``, registros alterados são recriados.
+    """
+
+    def __init__(self, criar, atualizar=None):
+        self.criar = criar
+        self.atualizar = atualizar
+        self._dados = {}       # chave -> dados usados no último desenho
+        self._controles = {}   # chave -> controle (ou lista de controles)
+        self._ordem = []
+        self.alterados = []    # controles criados/alterados na última reconciliação
+        self.estrutura_mudou = False
+
+    def __contains__(self, chave):
+        return chave in self._controles
+
+    def controle(self, chave):
+        return self._controles.get(chave)
+
+    def reconciliar(self, itens):
+        """Recebe ``(chave, dados)`` na ordem de exibição e devolve a lista de controles."""
+        self.alterados = []
+        ordem = []
+        vistos = set()
+        trocados = False  # controle recriado: a lista precisa ser reenviada
+        for chave, dados in itens:
+            if chave in vistos:
+                continue  # chave repetida: vale a primeira ocorrência
+            vistos.add(chave)
+            ordem.append(chave)
+            if chave not in self._controles:
+                self._controles[chave] = self.criar(chave, dados)
+                self._dados[chave] = dados
+                continue
+            if self._dados[chave] == dados:
+                continue
+            if self.atualizar is not None:
+                self.atualizar(self._controles[chave], dados)
+                self.alterados.extend(_como_lista(self._controles[chave]))
+            else:
+                self._controles[chave] = self.criar(chave, dados)
+                trocados = True
+            self._dados[chave] = dados
+
+        for chave in list(self._controles):
+            if chave not in vistos:
+                del self._controles[chave]
+                del self._dados[chave]
+
+        self.estrutura_mudou = trocados or ordem != self._ordem
+        self._ordem = ordem
+        return [c for chave in ordem for c in _como_lista(self._controles[chave])]
+
+    def aplicar(self, container, itens, page, atributo="controls"):
+        """Reconcilia ``itens`` em ``container.<atributo>`` com o menor ``page.update`` possível.
+
+        Retorna ``True`` se algo mudou. Se o container ainda não está na página,
+        só atribui os controles (o ``page.update`` de quem monta a tela envia tudo).
+        """
+        controles = self.reconciliar(itens)
+        if self.estrutura_mudou:
+            setattr(container, atributo, controles)
+            alvos = [container]
+        else:
+            alvos = self.alterados
+        if alvos and getattr(container, "page", None) is not None:
+            page.update(*alvos)
+        return bool(alvos)
+
+    def limpar(self):
+        self._dados.clear()
+        self._controles.clear()
+        self._ordem = []
+
+
+def _como_lista(controle):
+    return controle if isinstance(controle, (list, tuple)) else [controle]
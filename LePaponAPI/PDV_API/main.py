@@ -88,4 +88,6 @@ def main(page: ft.Page):
     )
     page.update()
 
-ft.app(target=main)
\ No newline at end of file
+# Guarda: os processos do pool de extratos (spawn/forkserver) reimportam este módulo
+if __name__ == "__main__":
+    ft.app(target=main)
@@ -0,0 +1,71 @@
+"""Variante assíncrona do ``BaseAPI`` para buscas concorrentes.
+
+As chamadas HTTP continuam passando pelo ``BaseAPI`` (e, portanto, pela
+sessão compartilhada de ``http_session``), mas rodam num executor limitado
+para que várias requisições possam ser aguardadas ao mesmo tempo.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Dict, Optional
+
+from utils.logger import get_logger
+from .base_api import BaseAPI, DEFAULT_TIMEOUT
+from .http_session import POOL_MAXSIZE
+
+# Nunca mais workers que conexões no pool, senão as threads só esperam vaga
+_executor = ThreadPoolExecutor(max_workers=POOL_MAXSIZE, thread_name_prefix="api")
+logger = get_logger("api.async")
+
+
+class AsyncBaseAPI:
+    """Mesma interface CRUD do ``BaseAPI``, mas com métodos ``async``."""
+
+    def __init__(self, base_url: str, resource: str, timeout: int = DEFAULT_TIMEOUT, api: Optional[BaseAPI] = None):
+        self.api = api or BaseAPI(base_url, resource, timeout)
+
+    @classmethod
+    def from_api(cls, api: BaseAPI) -> "AsyncBaseAPI":
+        """Cria a variante assíncrona reaproveitando um client síncrono existente."""
+        return cls(api.base_url, api.resource, api.timeout, api=api)
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+    async def get_all(self):
+        return await self._run(self.api.get_all)
+
+    async def get_by_id(self, _id):
+        return await self._run(self.api.get_by_id, _id)
+
+    async def create(self, data: Dict[str, Any]):
+        return await self._run(self.api.create, data)
+
+    async def update(self, _id, data: Dict[str, Any]):
+        return await self._run(self.api.update, _id, data)
+
+    async def delete(self, _id):
+        return await self._run(self.api.delete, _id)
+
+
+async def gather_many(chamadas: Dict[str, Awaitable]) -> Dict[str, Any]:
+    """Aguarda várias chamadas em paralelo e devolve ``{nome: resultado}``.
+
+    Uma chamada que falhar não derruba as demais: o erro é logado e o
+    resultado correspondente fica ``None``.
+    """
+    nomes = list(chamadas.keys())
+    resultados = await asyncio.gather(*chamadas.values(), return_exceptions=True)
+    saida: Dict[str, Any] = {}
+    for nome, resultado in zip(nomes, resultados):
+        if isinstance(resultado, BaseException):
+            logger.error("gather_error", extra={"call": nome, "error": str(resultado)})
+            resultado = None
+        saida[nome] = resultado
+    return saida
+
+
+def fetch_many(chamadas: Dict[str, Awaitable]) -> Dict[str, Any]:
+    """Atalho síncrono de ``gather_many`` para callbacks do Flet (sem loop ativo)."""
+    return asyncio.run(gather_many(chamadas))
@@ -1,27 +1,59 @@
+import os
+import random
+import time
+import uuid
 import requests
-from typing import Any, Dict, Optional, Union, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Union, List
 from utils.logger import get_logger
+from .http_session import get_session
+from .resource_cache import resource_cache
+from . import consulta
+from .sqlite_replica import REPLICATED_RESOURCES, get_replica
 
 DEFAULT_TIMEOUT = 8  # segundos
+# Criação em lote: API_BULK=0 desativa o endpoint /bulk; BULK_MAX_WORKERS limita
+# os POSTs paralelos do fallback quando o servidor não tem o endpoint.
+API_BULK = os.getenv("API_BULK", "1") != "0"
+BULK_MAX_WORKERS = int(os.getenv("BULK_MAX_WORKERS", "4"))
+BULK_UNSUPPORTED_STATUS = (404, 405, 501)
+# Respostas em que o lote pode ou não ter sido gravado: repete o mesmo POST
+# (mesma Idempotency-Key) em vez de cair para POSTs individuais.
+BULK_RETRY_STATUS = (408, 429, 500, 502, 503, 504)
+BULK_TENTATIVAS = int(os.getenv("BULK_TENTATIVAS", "3"))
+BULK_BACKOFF_MAX = 10  # segundos
+
+_bulk_suporte: Dict[str, bool] = {}
+
+
+def bulk_suportado(resource: str) -> bool:
+    """``False`` se o servidor já respondeu que não tem ``/api/<resource>/bulk``."""
+    return API_BULK and _bulk_suporte.get(resource, True)
+
+
+def marcar_bulk(resource: str, suportado: bool) -> None:
+    _bulk_suporte[resource] = suportado
 
 class BaseAPI:
     """Classe base para simplificar clients REST.
 
     Fornece operações CRUD padronizadas com tratamento básico de erros.
+    Leituras de recursos com TTL configurado passam pelo ``resource_cache``.
     """
     def __init__(self, base_url: str, resource: str, timeout: int = DEFAULT_TIMEOUT):
         self.base_url = base_url.rstrip('/')
         self.resource = resource.strip('/')
         self.timeout = timeout
+        self.session = get_session(self.base_url)
         self.logger = get_logger(f"api.{self.resource}")
 
     def _url(self, suffix: str = "") -> str:
         return f"{self.base_url}/api/{self.resource}{suffix}"  # /api/<resource>[/suffix]
 
-    def _request(self, method: str, url: str, **kwargs) -> Union[Dict[str, Any], List, Any, None]:
+    def _send(self, method: str, url: str, **kwargs) -> Optional[requests.Response]:
         self.logger.debug(f"request", extra={"method": method, "url": url})
         try:
-            resp = requests.request(method, url, timeout=self.timeout, **kwargs)
+            resp = self.session.request(method, url, timeout=self.timeout, **kwargs)
             ok = resp.status_code < 400
             self.logger.info(
                 "response",
@@ -33,26 +65,230 @@ class BaseAPI:
                 }
             )
             resp.raise_for_status()
-            try:
-                return resp.json()
-            except ValueError:
-                return resp.text
+            return resp
         except requests.RequestException as e:
             self.logger.error("request_error", extra={"method": method, "url": url, "error": str(e)})
             return None
 
+    @staticmethod
+    def _parse(resp: requests.Response) -> Union[Dict[str, Any], List, Any]:
+        try:
+            return resp.json()
+        except ValueError:
+            return resp.text
+
+    def _request(self, method: str, url: str, **kwargs) -> Union[Dict[str, Any], List, Any, None]:
+        resp = self._send(method, url, **kwargs)
+        return self._parse(resp) if resp is not None else None
+
+    def _cached_get(self, url: str, parse=None, **kwargs):
+        return resource_cache.fetch(
+            self.resource,
+            url,
+            lambda headers: self._send("GET", url, headers=headers, **kwargs),
+            parse or self._parse,
+        )
+
+    @property
+    def replicated(self) -> bool:
+        return self.resource in REPLICATED_RESOURCES
+
+    def _write(self, method: str, url: str, **kwargs):
+        result = self._request(method, url, **kwargs)
+        resource_cache.invalidate(self.resource)
+        return result
+
     # Métodos CRUD genéricos
     def get_all(self):
-        return self._request("GET", self._url())
+        if not self.replicated:
+            return self._cached_get(self._url())
+
+        def parse_e_replica(resp):
+            dados = self._parse(resp)
+            if isinstance(dados, list):
+                get_replica().gravar_lista(self.resource, dados)
+            return dados
+
+        dados = self._cached_get(self._url(), parse=parse_e_replica)
+        if dados is None:
+            # API fora do ar: responde com a última cópia local
+            self.logger.warning("replica_fallback", extra={"resource": self.resource})
+            return get_replica().rows(self.resource)
+        return dados
 
     def get_by_id(self, _id):
-        return self._request("GET", self._url(f"/{_id}"))
+        dados = self._cached_get(self._url(f"/{_id}"))
+        if dados is None and self.replicated:
+            self.logger.warning("replica_fallback", extra={"resource": self.resource, "id": _id})
+            return get_replica().get(self.resource, _id)
+        return dados
+
+    def query(self, date_from=None, date_to=None, cliente_id=None, fields=None, order_by=None,
+              campo_cliente: str = "id_cliente") -> List[Dict[str, Any]]:
+        """Lista registros filtrados por período/cliente, já ordenados.
+
+        Os filtros vão na query string; se o servidor não os aplicar, filtra
+        localmente a resposta já recebida (e a grava na réplica); depois disso
+        usa ``get_all`` (cacheado) + filtro local. Ver ``models/consulta.py``.
+        """
+        filtros = dict(date_from=date_from, date_to=date_to, cliente_id=cliente_id, campo_cliente=campo_cliente)
+        params = consulta.montar_params(fields=fields, order_by=order_by, **filtros)
+        if params and consulta.suporta_filtros(self.resource):
+            dados = self._request("GET", self._url(), params=params)
+            if isinstance(dados, list):
+                if consulta.todos_dentro(dados, **filtros):
+                    return consulta.filtrar_registros(dados, fields=fields, order_by=order_by, **filtros)
+                consulta.marcar_suporte(self.resource, False)
+                self.logger.warning("server_filters_unsupported", extra={"resource": self.resource})
+                if consulta.registros_completos(dados, fields):
+                    # A resposta já é a lista inteira: não busca de novo
+                    if not self.replicated:
+                        return consulta.filtrar_registros(dados, fields=fields, order_by=order_by, **filtros)
+                    get_replica().merge(self.resource, dados)
+                    return get_replica().query(self.resource, fields=fields, order_by=order_by, **filtros)
+        dados = self.get_all()
+        if self.replicated:
+            # get_all acabou de atualizar a réplica (ou caiu nela): filtra por índice
+            return get_replica().query(self.resource, fields=fields, order_by=order_by, **filtros)
+        if not isinstance(dados, list):
+            dados = [dados] if dados else []
+        return consulta.filtrar_registros(dados, fields=fields, order_by=order_by, **filtros)
 
     def create(self, data: Dict[str, Any]):
-        return self._request("POST", self._url(), json=data)
+        return self._write("POST", self._url(), json=data)
+
+    def create_many(self, itens: Iterable[Dict[str, Any]]) -> List[Any]:
+        """Cria vários registros e devolve um resultado por item (``None`` = falhou).
+
+        Tenta um único ``POST /api/<resource>/bulk`` com a lista. Só cai para
+        POSTs paralelos (limitados a ``BULK_MAX_WORKERS``) quando o servidor
+        responde que não tem o endpoint; em erro de rede, timeout ou 5xx o lote
+        pode ter sido gravado, então o mesmo POST é repetido com a mesma
+        ``Idempotency-Key`` e, se ainda falhar, todos os itens voltam ``None``.
+        """
+        itens = list(itens)
+        if not itens:
+            return []
+        if len(itens) > 1 and bulk_suportado(self.resource):
+            dados = self._bulk_post(itens)
+            if dados is not None:
+                return dados
+            if bulk_suportado(self.resource):
+                return [None] * len(itens)
+        return self._em_paralelo(self.create, [(item,) for item in itens])
+
+    def _bulk_post(self, itens: List[Dict[str, Any]]) -> Optional[List[Any]]:
+        """``POST /api/<resource>/bulk``; ``None`` se falhou ou o endpoint não existe."""
+        url = self._url("/bulk")
+        headers = {"Idempotency-Key": uuid.uuid4().hex}
+        retry_after = None
+        for tentativa in range(max(1, BULK_TENTATIVAS)):
+            if tentativa:
+                # Jitter total evita que vários caixas repitam juntos; Retry-After manda
+                time.sleep(max(random.uniform(0, min(BULK_BACKOFF_MAX, 2 ** tentativa)), retry_after or 0.0))
+                retry_after = None
+            try:
+                resp = self.session.post(url, json=itens, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                self.logger.error("request_error", extra={"method": "POST", "url": url, "error": str(e)})
+                continue
+            if resp.status_code in BULK_UNSUPPORTED_STATUS:
+                marcar_bulk(self.resource, False)
+                self.logger.warning("bulk_unsupported", extra={"resource": self.resource})
+                return None
+            if resp.status_code < 400:
+                resource_cache.invalidate(self.resource)
+                dados = self._parse(resp)
+                # Sem a lista de criados na resposta, devolve os próprios payloads
+                return dados if isinstance(dados, list) and len(dados) == len(itens) else itens
+            self.logger.error("bulk_error", extra={"resource": self.resource, "status": resp.status_code})
+            if resp.status_code not in BULK_RETRY_STATUS:
+                return None  # lote recusado pelo servidor: nada foi gravado
+            try:
+                retry_after = float(resp.headers.get("Retry-After"))
+            except (TypeError, ValueError):
+                retry_after = None
+        return None
+
+    def _em_paralelo(self, func, argumentos: List[tuple]) -> List[Any]:
+        """Executa ``func(*args)`` para cada tupla com no máximo ``BULK_MAX_WORKERS`` threads."""
+        if not argumentos:
+            return []
+        workers = max(1, min(BULK_MAX_WORKERS, len(argumentos)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk") as pool:
+            return list(pool.map(lambda args: func(*args), argumentos))
+
+    def _bulk_patch(self, corpo: Any, chave: str) -> Optional[Any]:
+        """``PATCH /api/<resource>/bulk``; ``None`` se indisponível ou com erro."""
+        if not bulk_suportado(chave):
+            return None
+        url = self._url("/bulk")
+        try:
+            resp = self.session.patch(url, json=corpo, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.logger.error("request_error", extra={"method": "PATCH", "url": url, "error": str(e)})
+            return None
+        if resp.status_code in BULK_UNSUPPORTED_STATUS:
+            marcar_bulk(chave, False)
+            self.logger.warning("bulk_unsupported", extra={"resource": self.resource, "method": "PATCH"})
+            return None
+        if resp.status_code >= 400:
+            return None
+        resource_cache.invalidate(self.resource)
+        return self._parse(resp)
+
+    def patch_many(self, ids: Iterable[Any], changes: Dict[str, Any],
+                   rows: Optional[Dict[Any, Dict[str, Any]]] = None) -> Dict[Any, Any]:
+        """Aplica as mesmas alterações a vários registros; retorna ``{id: resultado}``
+        (``None`` = falhou).
+
+        Tenta um único ``PATCH /api/<resource>/bulk`` com ``{"ids", "changes"}``.
+        Sem o endpoint, faz PUTs paralelos: o corpo de cada PUT é a linha já
+        carregada em ``rows`` (sem ``id``) com ``changes`` aplicado; só busca o
+        registro com ``get_by_id`` quando ele não veio em ``rows``.
+        """
+        ids = list(ids)
+        if not ids:
+            return {}
+        if len(ids) > 1:
+            dados = self._bulk_patch({"ids": ids, "changes": changes}, f"{self.resource}:patch")
+            if dados is not None:
+                return {_id: dados for _id in ids}
+        rows = rows or {}
+
+        def put(_id):
+            atual = rows.get(_id)
+            if atual is None:
+                atual = self.get_by_id(_id)
+                if not isinstance(atual, dict):
+                    return None
+            corpo = {k: v for k, v in atual.items() if k != "id"}
+            corpo.update(changes)
+            return self.update(_id, corpo)
+
+        return dict(zip(ids, self._em_paralelo(put, [(_id,) for _id in ids])))
+
+    def update_many(self, updates: Dict[Any, Dict[str, Any]]) -> Dict[Any, Any]:
+        """Atualiza vários registros com dados diferentes; retorna ``{id: resultado}``.
+
+        Um ``PATCH /api/<resource>/bulk`` com ``[{"id": ..., **dados}]`` quando
+        suportado; senão, PUTs paralelos limitados a ``BULK_MAX_WORKERS``.
+        """
+        if not updates:
+            return {}
+        if len(updates) > 1:
+            corpo = [dict(dados, id=_id) for _id, dados in updates.items()]
+            dados = self._bulk_patch(corpo, f"{self.resource}:update")
+            if dados is not None:
+                return {_id: dados for _id in updates}
+        ids = list(updates)
+        return dict(zip(ids, self._em_paralelo(self.update, [(_id, updates[_id]) for _id in ids])))
 
     def update(self, _id, data: Dict[str, Any]):
-        return self._request("PUT", self._url(f"/{_id}"), json=data)
+        return self._write("PUT", self._url(f"/{_id}"), json=data)
 
     def delete(self, _id):
-        return self._request("DELETE", self._url(f"/{_id}"))
+        result = self._write("DELETE", self._url(f"/{_id}"))
+        if result is not None and self.replicated:
+            get_replica().delete(self.resource, _id)
+        return result
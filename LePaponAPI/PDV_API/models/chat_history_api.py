@@ -1,21 +1,22 @@
-import requests
+from .http_session import get_session
 
 class ChatHistoryAPI:
     def __init__(self, base_url):
         self.base_url = base_url.rstrip("/")
+        self.session = get_session(self.base_url)
 
     def get_history(self):
-        resp = requests.get(f"{self.base_url}/chat-history")
+        resp = self.session.get(f"{self.base_url}/chat-history")
         resp.raise_for_status()
         return resp.json()
 
     def get_history_by_session(self):
-        resp = requests.get(f"{self.base_url}/chat-history?group_by=session_id")
+        resp = self.session.get(f"{self.base_url}/chat-history?group_by=session_id")
         resp.raise_for_status()
         return resp.json()
 
     def send_message(self, sender, text, session_id=None):
-        resp = requests.post(
+        resp = self.session.post(
             f"{self.base_url}/chat-history",
             json={"sender": sender, "text": text, "session_id": session_id}
         )
@@ -23,6 +24,6 @@ class ChatHistoryAPI:
         return resp.json()
 
     def delete_history(self):
-        resp = requests.delete(f"{self.base_url}/chat-history")
+        resp = self.session.delete(f"{self.base_url}/chat-history")
         resp.raise_for_status()
         return resp.json()
@@ -1,6 +1,6 @@
 import requests
 import os
-import paramiko
+from .sftp_pool import get_sftp
 
 class EnviarRelatorioPedido:
     """Responsável por enviar relatório (PDF) de pedidos via WhatsApp e fazer upload no droplet."""
@@ -12,42 +12,20 @@ class EnviarRelatorioPedido:
     # --- Upload / Limpeza no Droplet ---
     def upload_pdf_droplet(self, host: str, usuario: str, caminho_local: str, caminho_remoto: str, caminho_chave: str) -> bool:
         """Envia um PDF local para o droplet via SFTP (chave SSH)."""
-        if not os.path.isfile(caminho_local):
-            raise FileNotFoundError(f"Arquivo não encontrado: {caminho_local}")
-        key = paramiko.RSAKey.from_private_key_file(caminho_chave)
-        transport = paramiko.Transport((host, 22))
-        try:
-            transport.connect(username=usuario, pkey=key)
-            sftp = paramiko.SFTPClient.from_transport(transport)
-            if sftp is None:
-                raise Exception("Falha ao criar cliente SFTP.")
-            sftp.put(caminho_local, caminho_remoto)
-            sftp.close()
-        finally:
-            transport.close()
-        return True
+        return get_sftp(host, usuario, caminho_chave).upload(caminho_local, caminho_remoto)
 
     def delete_all_pdfs_from_folder(self, host: str, usuario: str, pasta_remota: str, caminho_chave: str) -> int:
         """Remove todos PDFs de uma pasta remota para liberar espaço."""
         try:
-            key = paramiko.RSAKey.from_private_key_file(caminho_chave)
-            transport = paramiko.Transport((host, 22))
-            transport.connect(username=usuario, pkey=key)
-            sftp = paramiko.SFTPClient.from_transport(transport)
-            if sftp is None:
-                transport.close()
-                raise ConnectionError("Falha ao criar cliente SFTP.")
-            arquivos = sftp.listdir(pasta_remota)
+            conexao = get_sftp(host, usuario, caminho_chave)
             removidos = 0
-            for arq in arquivos:
+            for arq in conexao.listar(pasta_remota):
                 if arq.lower().endswith('.pdf'):
                     try:
-                        sftp.remove(f"{pasta_remota}/{arq}")
+                        conexao.remover(f"{pasta_remota}/{arq}")
                         removidos += 1
                     except Exception as e:
                         print(f"Erro ao remover {arq}: {e}")
-            sftp.close()
-            transport.close()
             return removidos
         except Exception as e:
             print(f"Erro ao limpar PDFs: {e}")
@@ -0,0 +1,73 @@
+"""Pool de conexões HTTP compartilhado pelos clients da API.
+
+Mantém uma única ``requests.Session`` por host (scheme + netloc), com
+keep-alive, pool de conexões configurável e retry automático para falhas
+transitórias. Todos os clients (``BaseAPI`` e os clients avulsos) devem
+obter a sessão por ``get_session`` em vez de chamar ``requests.<verbo>``.
+"""
+import os
+import threading
+from typing import Dict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Ajustáveis via variáveis de ambiente
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))
+RETRY_STATUS = (502, 503, 504)
+
+_sessions: Dict[str, requests.Session] = {}
+_lock = threading.Lock()
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        status=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS,
+        raise_on_status=False,
+    )  # métodos não idempotentes (POST) não são repetidos pelo urllib3
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+
+def get_session(base_url: str) -> requests.Session:
+    """Retorna a sessão compartilhada do host de ``base_url`` (cria sob demanda)."""
+    key = _host_key(base_url)
+    session = _sessions.get(key)
+    if session is None:
+        with _lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _build_session()
+                _sessions[key] = session
+    return session
+
+
+def close_all() -> None:
+    """Fecha todas as sessões abertas (útil ao encerrar o app)."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
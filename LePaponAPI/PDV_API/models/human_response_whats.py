@@ -1,8 +1,9 @@
-import requests
+from .http_session import get_session
 
 class HumanResponseWhatsSender:
     def __init__(self, base_url):
         self.base_url = base_url.rstrip('/')
+        self.session = get_session(self.base_url)
 
     def send_response(self, data, headers=None):
         """
@@ -16,7 +17,7 @@ class HumanResponseWhatsSender:
         default_headers = {'Content-Type': 'application/json'}
         if headers:
             default_headers.update(headers)
-        response = requests.post(url, json=data, headers=default_headers)
+        response = self.session.post(url, json=data, headers=default_headers)
         response.raise_for_status()
         return response
 
@@ -0,0 +1,267 @@
+"""Índices em memória de clientes e produtos.
+
+Substituem as buscas lineares (``next(c for c in clientes if ...)``) feitas
+uma vez por linha nos relatórios: o índice é montado uma vez a partir da
+lista já cacheada e as consultas por id/telefone são O(1).
+
+A busca por nome (filtro dos dropdowns) usa dois índices:
+
+- prefixo: lista ordenada de palavras normalizadas + ``bisect``, para
+  encontrar quem tem alguma palavra começando pelo termo digitado;
+- trigramas: para termos com 3+ letras, candidatos que contêm todos os
+  trigramas do termo, confirmados com ``in`` (busca por trecho do nome).
+
+Nomes e termos são comparados sem acentos ("joao" acha "João"). Enquanto o
+usuário digita, cada busca que estende a anterior filtra só o resultado
+anterior em vez de consultar os índices de novo.
+
+``get_cliente_index`` devolve uma instância por processo, remontada quando
+o ``resource_cache`` invalida o recurso (toda escrita via ``BaseAPI``
+invalida) ou quando o TTL do recurso vence; por isso o índice não tem
+escrita própria.
+"""
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional
+
+from .resource_cache import resource_cache
+
+
+def normalizar(texto: Any) -> str:
+    """Minúsculas, sem acentos e com espaços simples ("  JOÃO " -> "joao")."""
+    texto = unicodedata.normalize("NFKD", str(texto or "").lower())
+    return " ".join("".join(c for c in texto if not unicodedata.combining(c)).split())
+
+
+def somente_digitos(fone: Any) -> str:
+    return re.sub(r"\D", "", str(fone or ""))
+
+
+def _trigramas(texto: str):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class _IndiceTexto(ABC):
+    """Base: registros por id e busca por nome (prefixo de palavra + trigramas)."""
+
+    chave = "id"
+
+    def __init__(self, registros: Optional[Iterable[Dict[str, Any]]] = None):
+        self.carregar(registros or [])
+
+    @abstractmethod
+    def nome(self, registro: Dict[str, Any]) -> str:
+        """Texto pesquisável do registro."""
+
+    def carregar(self, registros: Iterable[Dict[str, Any]]) -> None:
+        self.por_id: Dict[str, Dict[str, Any]] = {}
+        self._ordem: Dict[str, int] = {}
+        self._nomes: Dict[str, str] = {}
+        self._palavras: List[tuple] = []
+        self._trigramas: Dict[str, set] = {}
+        self._ultima = ("", set())  # última busca: (termo, ids encontrados)
+        for registro in registros:
+            self._indexar(registro)
+        self._palavras.sort()
+
+    @property
+    def registros(self) -> List[Dict[str, Any]]:
+        return list(self.por_id.values())
+
+    def __len__(self) -> int:
+        return len(self.por_id)
+
+    def __contains__(self, _id) -> bool:
+        return str(_id) in self.por_id
+
+    def get(self, _id) -> Optional[Dict[str, Any]]:
+        return self.por_id.get(str(_id))
+
+    def _indexar(self, registro: Dict[str, Any]) -> None:
+        if not isinstance(registro, dict) or registro.get(self.chave) is None:
+            return
+        _id = str(registro.get(self.chave))
+        self.por_id[_id] = registro
+        self._ordem.setdefault(_id, len(self._ordem))
+        nome = normalizar(self.nome(registro))
+        self._nomes[_id] = nome
+        for palavra in set(nome.split()):
+            self._palavras.append((palavra, _id))
+        for tri in _trigramas(nome):
+            self._trigramas.setdefault(tri, set()).add(_id)
+
+    # --- Busca por nome ---
+    def _por_prefixo(self, termo: str) -> set:
+        ids = set()
+        i = bisect_left(self._palavras, (termo, ""))
+        while i < len(self._palavras) and self._palavras[i][0].startswith(termo):
+            ids.add(self._palavras[i][1])
+            i += 1
+        return ids
+
+    def _por_trecho(self, termo: str) -> set:
+        if len(termo) < 3:
+            return {_id for _id, nome in self._nomes.items() if termo in nome}
+        conjuntos = sorted((self._trigramas.get(tri, set()) for tri in _trigramas(termo)), key=len)
+        candidatos = set(conjuntos[0]).intersection(*conjuntos[1:]) if conjuntos else set()
+        return {_id for _id in candidatos if termo in self._nomes[_id]}
+
+    def _casa(self, _id: str, termo: str, palavras: List[str]) -> bool:
+        nome = self._nomes.get(_id)
+        if nome is None:
+            return False
+        if termo in nome:
+            return True
+        partes = nome.split()
+        return all(any(p.startswith(palavra) for p in partes) for palavra in palavras)
+
+    def _encontrar(self, termo: str) -> set:
+        palavras = termo.split()
+        anterior, ids_anterior = self._ultima
+        if anterior and termo.startswith(anterior):
+            # Digitação incremental: quem casa com "anab" já casava com "ana"
+            return {_id for _id in ids_anterior if self._casa(_id, termo, palavras)}
+        ids = self._por_prefixo(palavras[0])
+        for palavra in palavras[1:]:
+            ids &= self._por_prefixo(palavra)
+        return ids | self._por_trecho(termo)
+
+    def _relevancia(self, _id: str, termo: str, palavras: List[str]) -> tuple:
+        nome = self._nomes[_id]
+        if nome == termo:
+            nivel = 0
+        elif nome.startswith(termo):
+            nivel = 1
+        elif all(any(p.startswith(palavra) for p in nome.split()) for palavra in palavras):
+            nivel = 2
+        else:
+            nivel = 3  # termo só aparece no meio de uma palavra
+        return nivel, len(nome), self._ordem.get(_id, 0)
+
+    def buscar(self, texto: Any, limite: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Registros cujo nome casa com ``texto``, os mais relevantes primeiro.
+
+        Cada termo casa com o início de uma palavra do nome (ou o texto todo
+        com um trecho do nome), sem diferenciar maiúsculas nem acentos.
+        Ordem: nome igual, nome começando pelo texto, palavras começando
+        pelos termos, trecho no meio; nomes mais curtos primeiro. Texto vazio
+        devolve todos, na ordem original.
+        """
+        termo = normalizar(texto)
+        if not termo:
+            encontrados = list(self.por_id)
+        else:
+            ids = self._encontrar(termo)
+            self._ultima = (termo, ids)
+            palavras = termo.split()
+            if limite is not None and len(ids) > limite:
+                encontrados = heapq.nsmallest(limite, ids, key=lambda _id: self._relevancia(_id, termo, palavras))
+            else:
+                encontrados = sorted(ids, key=lambda _id: self._relevancia(_id, termo, palavras))
+        if limite is not None:
+            encontrados = encontrados[:limite]
+        return [self.por_id[_id] for _id in encontrados]
+
+
+class ClienteIndex(_IndiceTexto):
+    """Clientes por id, telefone (só dígitos) e nome completo normalizado."""
+
+    def nome(self, cliente: Dict[str, Any]) -> str:
+        return f"{cliente.get('nome', '') or ''} {cliente.get('sobrenome', '') or ''}"
+
+    def carregar(self, registros: Iterable[Dict[str, Any]]) -> None:
+        self.por_fone: Dict[str, Dict[str, Any]] = {}
+        super().carregar(registros)
+
+    def _indexar(self, cliente: Dict[str, Any]) -> None:
+        super()._indexar(cliente)
+        if isinstance(cliente, dict) and cliente.get(self.chave) is not None:
+            for campo in ("fone", "telefone"):
+                fone = somente_digitos(cliente.get(campo))
+                if fone:
+                    self.por_fone[fone] = cliente
+
+    def por_telefone(self, fone: Any) -> Optional[Dict[str, Any]]:
+        return self.por_fone.get(somente_digitos(fone))
+
+    def nome_completo(self, _id, padrao: Optional[str] = None) -> Optional[str]:
+        """"nome sobrenome" do cliente (mesmo formato de ``obter_nome_cliente``)."""
+        cliente = self.get(_id)
+        if cliente is None:
+            return padrao
+        return f"{cliente.get('nome', '')} {cliente.get('sobrenome', '')}"
+
+    def telefone(self, _id) -> Optional[str]:
+        cliente = self.get(_id)
+        if cliente is None:
+            return None
+        return cliente.get("fone") or cliente.get("telefone")
+
+
+class ProdutoIndex(_IndiceTexto):
+    """Produtos por ``id_Prod`` e nome normalizado."""
+
+    chave = "id_Prod"
+    campo_nome = "nome_Prod"
+
+    def nome(self, produto: Dict[str, Any]) -> str:
+        return produto.get(self.campo_nome, "") or ""
+
+    def nome_produto(self, _id, padrao: Optional[str] = None) -> Optional[str]:
+        produto = self.get(_id)
+        return produto.get(self.campo_nome) if produto is not None else padrao
+
+    def preco(self, _id, padrao=None):
+        produto = self.get(_id)
+        return produto.get("Valor_Prod", padrao) if produto is not None else padrao
+
+
+# --- Instâncias por processo, ligadas ao cache das APIs ---
+class _IndiceDaAPI:
+    def __init__(self, classe, api):
+        self.classe = classe
+        self.api = api
+        self.indice = None
+        self.montado_em = 0.0
+        self.sujo = True
+        self.lock = threading.Lock()
+
+    def marcar(self, resource: Optional[str] = None) -> None:
+        if resource is None or resource == self.api.resource:
+            self.sujo = True
+
+    def obter(self):
+        with self.lock:
+            vencido = time.monotonic() - self.montado_em > resource_cache.ttl_for(self.api.resource)
+            if self.indice is None or self.sujo or vencido:
+                dados = self.api.get_all()
+                if not isinstance(dados, list):
+                    dados = [dados] if dados else []
+                self.sujo = False
+                self.indice = self.classe(dados)
+                self.montado_em = time.monotonic()
+            return self.indice
+
+
+_indices: Dict[tuple, _IndiceDaAPI] = {}
+_indices_lock = threading.Lock()
+
+
+def _indice_da_api(classe, api) -> Any:
+    chave = (classe, api.base_url, api.resource)
+    with _indices_lock:
+        entrada = _indices.get(chave)
+        if entrada is None:
+            entrada = _indices[chave] = _IndiceDaAPI(classe, api)
+            resource_cache.add_listener(entrada.marcar)
+    return entrada.obter()
+
+
+def get_cliente_index(clientes_api) -> ClienteIndex:
+    """Índice de clientes montado a partir de ``clientes_api.get_all()`` (cacheado)."""
+    return _indice_da_api(ClienteIndex, clientes_api)
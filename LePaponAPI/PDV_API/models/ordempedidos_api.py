@@ -1,5 +1,5 @@
 from .base_api import BaseAPI
-import requests
+from .resource_cache import resource_cache
 
 class OrdemPedidosAPI(BaseAPI):
     def __init__(self, base_url):
@@ -7,7 +7,8 @@ class OrdemPedidosAPI(BaseAPI):
 
     def create(self, data):
         # Mantém comportamento especial retornando somente id
-        resp = requests.post(self._url(), json=data)
+        resp = self.session.post(self._url(), json=data, timeout=self.timeout)
+        resource_cache.invalidate(self.resource)
         try:
             js = resp.json()
             return js.get('id') if isinstance(js, dict) else js
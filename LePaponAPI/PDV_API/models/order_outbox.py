@@ -0,0 +1,301 @@
+"""Outbox local (write-ahead) para as escritas de pedidos.
+
+Toda escrita de pedido é primeiro gravada num diário append-only
+(``storage/data/outbox.jsonl``, com ``fsync``) e só depois enviada à API por
+uma thread em segundo plano. Assim o caixa não espera a rede e nenhum item
+se perde se a API cair no meio de um pedido.
+
+Cada linha do diário é um evento JSON:
+
+- ``{"op": "enqueue", "key": ..., "batch": ..., "resource": ..., "method": ..., "data": ...}``
+- ``{"op": "done", "key": ...}`` — aceito pela API
+- ``{"op": "failed", "key": ..., "error": ...}`` — rejeitado (4xx), não é repetido
+- ``{"op": "retry", "key": ...}`` — falha devolvida à fila manualmente
+
+O envio respeita a ordem de chegada: se a API estiver indisponível (erro de
+rede ou 5xx) o item da frente é repetido com backoff e os seguintes esperam.
+Cada requisição leva o cabeçalho ``Idempotency-Key`` com a chave do item,
+para que uma repetição após timeout não duplique o registro no servidor.
+Itens gravados juntos (``enqueue_many``) formam um lote, enviado num único
+``POST /api/<resource>/bulk`` (``Idempotency-Key`` = chave do lote). O lote
+só passa a sair item a item quando o servidor não tem o endpoint; em falha
+transitória ele é repetido inteiro, com a mesma chave.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+
+from utils.logger import get_logger
+from .base_api import BULK_UNSUPPORTED_STATUS, bulk_suportado, marcar_bulk
+from .http_session import get_session
+from .resource_cache import resource_cache
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", os.path.join(_BASE_DIR, "..", "storage", "data", "outbox.jsonl"))
+OUTBOX_TIMEOUT = float(os.getenv("OUTBOX_TIMEOUT", "8"))
+RETRY_BASE = float(os.getenv("OUTBOX_RETRY_BASE", "1"))
+RETRY_MAX = float(os.getenv("OUTBOX_RETRY_MAX", "60"))
+# Compacta o diário quando não há pendências e ele passa deste número de linhas
+COMPACT_AFTER = int(os.getenv("OUTBOX_COMPACT_AFTER", "500"))
+
+logger = get_logger("outbox")
+
+
+class OrderOutbox:
+    def __init__(self, base_url: str, path: str = OUTBOX_PATH):
+        self.base_url = base_url.rstrip('/')
+        self.path = path
+        self.session = get_session(self.base_url)
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._failed: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._linhas = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[Dict[str, int]], None]] = []
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._replay()
+
+    # --- Diário ---
+    def _replay(self) -> None:
+        """Reconstrói pendências e falhas a partir do diário (após reinício)."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for linha in f:
+                self._linhas += 1
+                try:
+                    evento = json.loads(linha)
+                except ValueError:
+                    # Última linha truncada por queda de energia: ignora
+                    continue
+                self._aplicar(evento)
+
+    def _aplicar(self, evento: Dict[str, Any]) -> None:
+        op, key = evento.get("op"), evento.get("key")
+        if op == "enqueue":
+            self._pending[key] = evento
+        elif op == "done":
+            self._pending.pop(key, None)
+            self._failed.pop(key, None)
+        elif op == "failed":
+            item = self._pending.pop(key, None)
+            if item is not None:
+                self._failed[key] = dict(item, error=evento.get("error"))
+        elif op == "retry":
+            item = self._failed.pop(key, None)
+            if item is not None:
+                item.pop("error", None)
+                self._pending[key] = item
+
+    def _append(self, eventos: Iterable[Dict[str, Any]]) -> None:
+        """Grava eventos no diário com fsync (chamar com ``_lock``)."""
+        eventos = list(eventos)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for evento in eventos:
+                f.write(json.dumps(evento, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._linhas += len(eventos)
+        for evento in eventos:
+            self._aplicar(evento)
+
+    def _compactar(self) -> None:
+        """Reescreve o diário só com o que ainda importa (chamar com ``_lock``)."""
+        if self._pending or self._linhas < COMPACT_AFTER:
+            return
+        eventos = []
+        for key, item in self._failed.items():
+            base = {k: v for k, v in item.items() if k != "error"}
+            eventos.append(base)
+            eventos.append({"op": "failed", "key": key, "error": item.get("error")})
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for evento in eventos:
+                f.write(json.dumps(evento, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._linhas = len(eventos)
+
+    # --- Enfileiramento ---
+    def enqueue(self, resource: str, data: Dict[str, Any], method: str = "POST") -> str:
+        return self.enqueue_many(resource, [data], method)[0]
+
+    def enqueue_many(self, resource: str, itens: Iterable[Dict[str, Any]], method: str = "POST") -> List[str]:
+        """Grava todos os itens de uma vez (um único fsync) e acorda o envio."""
+        batch = uuid.uuid4().hex
+        eventos = [
+            {"op": "enqueue", "key": uuid.uuid4().hex, "batch": batch, "resource": resource, "method": method,
+             "data": data, "ts": time.time()}
+            for data in itens
+        ]
+        with self._lock:
+            self._append(eventos)
+        self._notificar()
+        self._wake.set()
+        return [e["key"] for e in eventos]
+
+    def retry_failed(self) -> int:
+        """Devolve à fila os itens rejeitados (ex: após corrigir o cadastro)."""
+        with self._lock:
+            keys = list(self._failed.keys())
+            if keys:
+                self._append({"op": "retry", "key": k} for k in keys)
+        self._notificar()
+        self._wake.set()
+        return len(keys)
+
+    # --- Estado para a UI ---
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {"pending": len(self._pending), "failed": len(self._failed)}
+
+    def add_listener(self, callback: Callable[[Dict[str, int]], None]) -> None:
+        """``callback(counts)`` é chamado a cada mudança (pode vir de outra thread)."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[Dict[str, int]], None]) -> None:
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notificar(self) -> None:
+        counts = self.counts()
+        for callback in list(self._listeners):
+            try:
+                callback(counts)
+            except Exception as e:
+                logger.error("listener_error", extra={"error": str(e)})
+
+    # --- Envio ---
+    def _enviar(self, item: Dict[str, Any]) -> Optional[bool]:
+        """``True`` enviado, ``False`` rejeitado (4xx), ``None`` tentar de novo."""
+        url = f"{self.base_url}/api/{item['resource']}"
+        try:
+            resp = self.session.request(
+                item.get("method", "POST"), url, json=item.get("data"),
+                headers={"Idempotency-Key": item["key"]}, timeout=OUTBOX_TIMEOUT,
+            )
+        except requests.RequestException as e:
+            logger.warning("outbox_network_error", extra={"key": item["key"], "error": str(e)})
+            return None
+        if resp.status_code < 400:
+            return True
+        if resp.status_code >= 500 or resp.status_code in (408, 429):
+            return None
+        with self._lock:
+            self._append([{"op": "failed", "key": item["key"], "error": f"HTTP {resp.status_code}: {resp.text[:200]}"}])
+        return False
+
+    def _enviar_lote(self, lote: List[Dict[str, Any]]) -> Optional[bool]:
+        """Envia o lote num só POST.
+
+        ``True`` = resolvido (aceito, ou recusado com 4xx e marcado como falha);
+        ``False`` = servidor sem ``/bulk`` (o envio segue item a item);
+        ``None`` = falha transitória: o lote pode ter sido gravado, então é
+        repetido mais tarde com a mesma ``Idempotency-Key``.
+        """
+        resource, batch = lote[0]["resource"], lote[0]["batch"]
+        url = f"{self.base_url}/api/{resource}/bulk"
+        try:
+            resp = self.session.post(
+                url, json=[item.get("data") for item in lote],
+                headers={"Idempotency-Key": batch}, timeout=OUTBOX_TIMEOUT,
+            )
+        except requests.RequestException as e:
+            logger.warning("outbox_network_error", extra={"batch": batch, "error": str(e)})
+            return None
+        if resp.status_code in BULK_UNSUPPORTED_STATUS:
+            marcar_bulk(resource, False)
+            return False
+        if resp.status_code >= 500 or resp.status_code in (408, 429):
+            return None
+        with self._lock:
+            if resp.status_code >= 400:
+                erro = f"HTTP {resp.status_code}: {resp.text[:200]}"
+                self._append([{"op": "failed", "key": item["key"], "error": erro} for item in lote])
+            else:
+                self._append([{"op": "done", "key": item["key"]} for item in lote])
+        return True
+
+    def _lote_da_frente(self) -> List[Dict[str, Any]]:
+        """Itens pendentes consecutivos do mesmo lote do primeiro da fila (chamar com ``_lock``)."""
+        lote = []
+        for item in self._pending.values():
+            if lote and (item.get("batch") != lote[0].get("batch") or item.get("batch") is None):
+                break
+            lote.append(item)
+            if item.get("batch") is None:
+                break
+        return lote
+
+    def drain_once(self) -> bool:
+        """Envia em ordem tudo o que conseguir; ``False`` se parou por falha transitória."""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._compactar()
+                    return True
+                lote = self._lote_da_frente()
+            item = lote[0]
+            if item.get("method", "POST") == "POST" and len(lote) > 1 and bulk_suportado(item["resource"]):
+                resultado = self._enviar_lote(lote)
+                if resultado is None:
+                    return False
+                if resultado:
+                    resource_cache.invalidate(item["resource"])
+                    self._notificar()
+                    continue
+                # Sem /bulk (já marcado): daqui em diante o lote sai item a item
+            resultado = self._enviar(item)
+            if resultado is None:
+                return False
+            if resultado:
+                with self._lock:
+                    self._append([{"op": "done", "key": item["key"]}])
+                resource_cache.invalidate(item["resource"])
+            self._notificar()
+
+    def _loop(self) -> None:
+        espera = RETRY_BASE
+        while not self._stop.is_set():
+            if self.drain_once():
+                espera = RETRY_BASE
+                self._wake.wait()
+            else:
+                # API indisponível: backoff exponencial, mas acorda se chegar item novo
+                self._wake.wait(espera)
+                espera = min(espera * 2, RETRY_MAX)
+            self._wake.clear()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+
+_outbox: Optional[OrderOutbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox(base_url: str) -> OrderOutbox:
+    """Instância única por processo, já com o envio em segundo plano iniciado."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = OrderOutbox(base_url)
+            _outbox.start()
+        return _outbox
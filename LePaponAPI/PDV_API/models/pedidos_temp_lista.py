@@ -1,48 +1,178 @@
+"""Lista local de pedidos temporários (``storage/data/pedidos_temp.json``).
+
+A lista fica em memória e cada alteração é gravada como uma linha num
+diário append-only (``pedidos_temp.jsonl``, com ``fsync``): adicionar ou
+remover um item custa uma linha de I/O, não a reescrita do arquivo todo.
+
+Quando o diário passa de ``COMPACT_AFTER`` linhas ele é compactado: a lista
+inteira é gravada em ``pedidos_temp.json`` (arquivo temporário + fsync +
+``os.replace``, atômico) e o diário é zerado. Cada evento leva um número de
+sequência e o snapshot guarda o último aplicado, então uma queda entre a
+troca do snapshot e a limpeza do diário não aplica nada duas vezes.
+
+Eventos do diário:
+
+- ``{"seq": n, "op": "add", "pedido": {...}}``
+- ``{"seq": n, "op": "remove", "idx": i}``
+
+Substituir a lista inteira não passa pelo diário: vai direto para o
+snapshot, com o próximo número de sequência.
+
+O arquivo é lido no primeiro acesso, não na importação do módulo.
+"""
 import json
 import os
+import threading
 
-_PEDIDOS_TEMP_PATH = os.path.join(os.path.dirname(__file__), '../storage/data/pedidos_temp.json')
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+_PEDIDOS_TEMP_PATH = os.getenv(
+    "PEDIDOS_TEMP_PATH", os.path.join(_BASE_DIR, "..", "storage", "data", "pedidos_temp.json")
+)
+_JOURNAL_PATH = os.path.splitext(_PEDIDOS_TEMP_PATH)[0] + ".jsonl"
+COMPACT_AFTER = int(os.getenv("PEDIDOS_TEMP_COMPACT_AFTER", "200"))
 
-def _load_pedidos_temp():
-    if os.path.exists(_PEDIDOS_TEMP_PATH):
-        with open(_PEDIDOS_TEMP_PATH, 'r', encoding='utf-8') as f:
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return  # Windows não permite abrir diretórios
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _Armazenamento:
+    def __init__(self, path=_PEDIDOS_TEMP_PATH, journal_path=_JOURNAL_PATH):
+        self.path = path
+        self.journal_path = journal_path
+        self._lista = None
+        self._seq = 0
+        self._linhas = 0
+        self._lock = threading.RLock()
+
+    # --- Leitura ---
+    def _carregar(self):
+        """Snapshot + eventos do diário posteriores a ele (chamar com ``_lock``)."""
+        if self._lista is not None:
+            return
+        lista, seq = [], 0
+        if os.path.exists(self.path):
             try:
-                return json.load(f)
-            except Exception:
-                return []
-    return []
+                with open(self.path, "r", encoding="utf-8") as f:
+                    dados = json.load(f)
+                if isinstance(dados, dict):
+                    lista, seq = list(dados.get("pedidos") or []), int(dados.get("seq") or 0)
+                elif isinstance(dados, list):
+                    lista = dados  # formato antigo: só a lista
+            except (ValueError, OSError):
+                lista, seq = [], 0
+        self._lista, self._seq, self._linhas = lista, seq, 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for linha in f:
+                    self._linhas += 1
+                    try:
+                        evento = json.loads(linha)
+                    except ValueError:
+                        continue  # última linha truncada por queda de energia
+                    if int(evento.get("seq") or 0) > self._seq:
+                        self._aplicar(evento)
+
+    def _aplicar(self, evento):
+        op = evento.get("op")
+        if op == "add":
+            self._lista.append(evento.get("pedido"))
+        elif op == "remove":
+            idx = evento.get("idx")
+            if isinstance(idx, int) and 0 <= idx < len(self._lista):
+                self._lista.pop(idx)
+        elif op == "set":  # diários gravados antes de ``substituir``
+            self._lista = list(evento.get("lista") or [])
+        self._seq = int(evento.get("seq") or self._seq)
+
+    def lista(self):
+        with self._lock:
+            self._carregar()
+            return list(self._lista)
+
+    # --- Escrita ---
+    def registrar(self, op, **dados):
+        """Grava o evento no diário (fsync) e aplica na lista em memória."""
+        with self._lock:
+            self._carregar()
+            if op == "remove":
+                idx = dados.get("idx")
+                if not isinstance(idx, int) or not 0 <= idx < len(self._lista):
+                    return False
+            evento = dict(dados, seq=self._seq + 1, op=op)
+            os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(evento, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._linhas += 1
+            self._aplicar(evento)
+            if self._linhas >= COMPACT_AFTER:
+                self.compactar()
+            return True
+
+    def substituir(self, lista):
+        """Troca a lista inteira gravando só o snapshot (o diário é zerado)."""
+        with self._lock:
+            self._carregar()
+            self._lista = list(lista or [])
+            self._seq += 1
+            self.compactar()
+
+    def compactar(self):
+        """Grava a lista inteira no snapshot (troca atômica) e zera o diário."""
+        with self._lock:
+            self._carregar()
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"seq": self._seq, "pedidos": self._lista}, f, ensure_ascii=False, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            _fsync_dir(self.path)
+            # Eventos antigos que sobrarem no diário têm seq <= snapshot e são ignorados
+            with open(self.journal_path, "w", encoding="utf-8") as f:
+                f.flush()
+                os.fsync(f.fileno())
+            self._linhas = 0
+
+
+_armazenamento = _Armazenamento()
 
-def _save_pedidos_temp(lista):
-    os.makedirs(os.path.dirname(_PEDIDOS_TEMP_PATH), exist_ok=True)
-    with open(_PEDIDOS_TEMP_PATH, 'w', encoding='utf-8') as f:
-        json.dump(lista, f, ensure_ascii=False, indent=2)
 
 class PedidosTempLista:
     @staticmethod
     def get():
-        return _load_pedidos_temp()
+        return _armazenamento.lista()
 
     @staticmethod
     def set(lista):
-        _save_pedidos_temp(lista)
+        _armazenamento.substituir(lista)
+
+
+def __getattr__(nome):
+    # Para compatibilidade com o restante do código (``pedidosTemp`` era
+    # carregado na importação; agora é lido sob demanda)
+    if nome == "pedidosTemp":
+        return PedidosTempLista.get()
+    raise AttributeError(nome)
 
-# Para compatibilidade com o restante do código
-pedidosTemp = PedidosTempLista.get()
 
 def add_pedido_temp(pedido):
-    global pedidosTemp
-    pedidosTemp = PedidosTempLista.get()
-    pedidosTemp.append(pedido)
-    PedidosTempLista.set(pedidosTemp)
+    _armazenamento.registrar("add", pedido=pedido)
+
 
 def remove_pedido_temp(idx):
-    global pedidosTemp
-    pedidosTemp = PedidosTempLista.get()
-    if 0 <= idx < len(pedidosTemp):
-        pedidosTemp.pop(idx)
-        PedidosTempLista.set(pedidosTemp)
+    _armazenamento.registrar("remove", idx=idx)
+
 
 def update_pedidos_temp(lista):
-    global pedidosTemp
     PedidosTempLista.set(lista)
-    pedidosTemp = PedidosTempLista.get()
@@ -0,0 +1,141 @@
+"""Cache compartilhado (por processo) para recursos de leitura frequente.
+
+Cada recurso tem seu próprio TTL (``produtostodos``, ``clientes``...). Depois
+que o TTL expira, a próxima leitura é revalidada com ``If-None-Match`` /
+``If-Modified-Since`` quando o servidor devolveu ``ETag``/``Last-Modified``;
+uma resposta 304 apenas renova a validade. Escritas feitas pelos clients
+(``create``/``update``/``delete``) invalidam o recurso inteiro.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# TTL padrão em segundos por recurso; 0 desativa o cache.
+# Pode ser sobrescrito por variável de ambiente, ex: CACHE_TTL_PRODUTOSTODOS=900
+DEFAULT_TTLS = {
+    "produtostodos": 600,
+    "clientes": 300,
+}
+
+
+class CacheEntry:
+    __slots__ = ("data", "expires_at", "etag", "last_modified")
+
+    def __init__(self, data: Any, expires_at: float, etag: Optional[str], last_modified: Optional[str]):
+        self.data = data
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _copy(data: Any) -> Any:
+    """Cópia rasa dos registros para que a view não altere o conteúdo do cache."""
+    if isinstance(data, list):
+        return [dict(item) if isinstance(item, dict) else item for item in data]
+    if isinstance(data, dict):
+        return dict(data)
+    return data
+
+
+class ResourceCache:
+    def __init__(self, ttls: Optional[Dict[str, float]] = None):
+        self._ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self._entries: Dict[str, Dict[str, CacheEntry]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._listeners: List[Callable[[Optional[str]], None]] = []
+        self._lock = threading.Lock()
+
+    # --- Configuração ---
+    def ttl_for(self, resource: str) -> float:
+        env = os.getenv(f"CACHE_TTL_{resource.upper()}")
+        if env is not None:
+            try:
+                return float(env)
+            except ValueError:
+                pass
+        return self._ttls.get(resource, 0)
+
+    def set_ttl(self, resource: str, seconds: float) -> None:
+        self._ttls[resource] = seconds
+
+    # --- Contadores ---
+    def _count(self, resource: str, campo: str) -> None:
+        stats = self._stats.setdefault(resource, {"hits": 0, "misses": 0, "revalidated": 0, "stale": 0})
+        stats[campo] += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {res: dict(valores) for res, valores in self._stats.items()}
+
+    # --- Leitura ---
+    def fetch(self, resource: str, key: str, send: Callable[[Dict[str, str]], Any], parse: Callable[[Any], Any]) -> Any:
+        """Retorna ``key`` do cache ou busca via ``send(headers) -> Response|None``.
+
+        ``parse`` converte a resposta em dados. Se a busca falhar e houver uma
+        cópia expirada, ela é devolvida (melhor que nada durante quedas da API).
+        """
+        ttl = self.ttl_for(resource)
+        if ttl <= 0:
+            resp = send({})
+            return parse(resp) if resp is not None else None
+
+        agora = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(resource, {}).get(key)
+            if entry and entry.expires_at > agora:
+                self._count(resource, "hits")
+                return _copy(entry.data)
+
+        resp = send(entry.validators() if entry else {})
+
+        with self._lock:
+            if resp is None:
+                if entry:
+                    self._count(resource, "stale")
+                    return _copy(entry.data)
+                self._count(resource, "misses")
+                return None
+            if resp.status_code == 304 and entry:
+                entry.expires_at = time.monotonic() + ttl
+                self._count(resource, "revalidated")
+                return _copy(entry.data)
+            self._count(resource, "misses")
+
+        data = parse(resp)
+        if resp.status_code < 300 and data is not None:
+            with self._lock:
+                self._entries.setdefault(resource, {})[key] = CacheEntry(
+                    data,
+                    time.monotonic() + ttl,
+                    resp.headers.get("ETag"),
+                    resp.headers.get("Last-Modified"),
+                )
+        return _copy(data)
+
+    # --- Invalidação ---
+    def add_listener(self, callback: Callable[[Optional[str]], None]) -> None:
+        """Registra ``callback(resource)`` chamado a cada invalidação (ex: réplica do sync)."""
+        self._listeners.append(callback)
+
+    def invalidate(self, resource: Optional[str] = None) -> None:
+        """Descarta o recurso informado (ou todos, se ``None``)."""
+        with self._lock:
+            if resource is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(resource, None)
+        for callback in self._listeners:
+            callback(resource)
+
+
+# Instância única compartilhada por todos os clients do processo
+resource_cache = ResourceCache()
@@ -1,11 +1,12 @@
-import requests
+from .http_session import get_session
 
 class SessionAgentAPI:
     def __init__(self, base_url):
         self.base_url = base_url.rstrip('/')
+        self.session = get_session(self.base_url)
 
     def takeOver(self, data):
-        return requests.post(f"{self.base_url}/session/takeover", json=data).json()
+        return self.session.post(f"{self.base_url}/session/takeover", json=data).json()
 
     def release(self, data):
-        return requests.post(f"{self.base_url}/session/release", json=data).json()
+        return self.session.post(f"{self.base_url}/session/release", json=data).json()
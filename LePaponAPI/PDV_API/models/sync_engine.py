@@ -0,0 +1,267 @@
+"""Sincronização incremental (delta) de recursos grandes para uma réplica local.
+
+Para ``pedidos``, ``crediario``, ``vendas`` e ``recebido`` a view não deve
+baixar a tabela inteira a cada filtro. O ``SyncEngine`` guarda uma réplica
+por recurso e, a cada sincronização, pede ao servidor apenas as linhas novas
+ou alteradas desde a última marca d'água (``updatedSince``/``sinceId``).
+A réplica padrão é a SQLite de ``sqlite_replica``:
+
+- a marca d'água de cada recurso fica em ``last_sync.json``
+  (``{"crediario": {"updated_at": "...", "id": 123}, ...}``);
+- linhas recebidas são mescladas na réplica pelo ``id``;
+- se o servidor ignorar os parâmetros e devolver a tabela inteira, a
+  réplica é simplesmente substituída (o resultado continua correto);
+- de tempos em tempos (``SYNC_FULL_INTERVAL``) é feita uma carga completa
+  para refletir exclusões, que o delta não enxerga;
+- depois de uma escrita do próprio caixa (recurso marcado como sujo) a
+  carga é completa quando o delta não enxergaria a alteração: marca d'água
+  só por ``id`` (um PUT numa linha antiga não aparece em ``sinceId``) ou
+  recurso cujas exclusões não chegam à réplica pelo ``BaseAPI.delete``.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.logger import get_logger
+from .base_api import BaseAPI
+from . import consulta
+from .resource_cache import resource_cache
+from .sqlite_replica import REPLICATED_RESOURCES, get_replica
+
+RESOURCES = ("pedidos", "crediario", "vendas", "recebido")
+UPDATED_FIELDS = ("updated_at", "updatedAt")
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.getenv("SYNC_STATE_PATH", os.path.join(_BASE_DIR, "..", "..", "last_sync.json"))
+REPLICA_DIR = os.getenv("SYNC_REPLICA_DIR", os.path.join(_BASE_DIR, "..", "storage", "data", "replica"))
+# Intervalo mínimo entre sincronizações do mesmo recurso (evita ida ao
+# servidor a cada tecla digitada num filtro) e intervalo da carga completa.
+SYNC_MIN_INTERVAL = float(os.getenv("SYNC_MIN_INTERVAL", "10"))
+SYNC_FULL_INTERVAL = float(os.getenv("SYNC_FULL_INTERVAL", "3600"))
+
+logger = get_logger("sync")
+
+
+def _updated_at(row: Dict[str, Any]) -> Optional[str]:
+    for campo in UPDATED_FIELDS:
+        if row.get(campo):
+            return str(row[campo])
+    return None
+
+
+def _id(row: Dict[str, Any]) -> Optional[int]:
+    try:
+        return int(row.get("id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: Any) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+class JsonReplicaStore:
+    """Réplica em arquivos JSON (um por recurso), carregada em memória.
+
+    O padrão é a réplica SQLite (``sqlite_replica``); esta fica como opção
+    leve para testes ou ambientes sem disco persistente.
+    """
+
+    def __init__(self, directory: str = REPLICA_DIR):
+        self.directory = directory
+        self._rows: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+
+    def _path(self, resource: str) -> str:
+        return os.path.join(self.directory, f"{resource}.json")
+
+    def _load(self, resource: str) -> Dict[Any, Dict[str, Any]]:
+        if resource not in self._rows:
+            try:
+                with open(self._path(resource), "r", encoding="utf-8") as f:
+                    linhas = json.load(f)
+            except (FileNotFoundError, ValueError):
+                linhas = []
+            self._rows[resource] = {r.get("id"): r for r in linhas if isinstance(r, dict)}
+        return self._rows[resource]
+
+    def rows(self, resource: str) -> List[Dict[str, Any]]:
+        return [dict(r) for r in self._load(resource).values()]
+
+    def count(self, resource: str) -> int:
+        return len(self._load(resource))
+
+    def merge(self, resource: str, linhas: Iterable[Dict[str, Any]]) -> int:
+        atual = self._load(resource)
+        n = 0
+        for r in linhas:
+            atual[r.get("id")] = r
+            n += 1
+        _write_json(self._path(resource), list(atual.values()))
+        return n
+
+    def replace(self, resource: str, linhas: Iterable[Dict[str, Any]]) -> int:
+        self._rows[resource] = {r.get("id"): r for r in linhas}
+        _write_json(self._path(resource), list(self._rows[resource].values()))
+        return len(self._rows[resource])
+
+
+class SyncEngine:
+    def __init__(self, base_url: str, resources: Iterable[str] = RESOURCES, state_path: str = STATE_PATH,
+                 store=None, min_interval: float = SYNC_MIN_INTERVAL, full_interval: float = SYNC_FULL_INTERVAL):
+        self.apis = {r: BaseAPI(base_url, r) for r in resources}
+        self.state_path = state_path
+        self.store = store or get_replica()
+        self.min_interval = min_interval
+        self.full_interval = full_interval
+        self._state = self._load_state()
+        self._last_sync: Dict[str, float] = {}
+        # Réplica persistida: a primeira carga completa só ocorre após full_interval
+        self._last_full: Dict[str, float] = {r: time.monotonic() for r in resources}
+        self._dirty = set()
+        self._locks = {r: threading.Lock() for r in resources}
+        # Escritas feitas pelos clients marcam o recurso para sincronizar já
+        resource_cache.add_listener(self.mark_dirty)
+
+    # --- Estado (last_sync.json) ---
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def watermark(self, resource: str) -> Dict[str, Any]:
+        wm = self._state.get(resource)
+        # Formato antigo ("data T hora" em texto) não serve como marca d'água
+        return wm if isinstance(wm, dict) else {}
+
+    def _save_watermark(self, resource: str, linhas: List[Dict[str, Any]]) -> None:
+        wm = dict(self.watermark(resource))
+        datas = [d for d in (_updated_at(r) for r in linhas) if d]
+        ids = [i for i in (_id(r) for r in linhas) if i is not None]
+        if datas:
+            wm["updated_at"] = max(datas + ([wm["updated_at"]] if wm.get("updated_at") else []))
+        if ids:
+            wm["id"] = max(ids + ([wm["id"]] if wm.get("id") is not None else []))
+        self._state[resource] = wm
+        _write_json(self.state_path, self._state)
+
+    # --- Sincronização ---
+    def mark_dirty(self, resource: Optional[str] = None) -> None:
+        if resource is None:
+            self._dirty.update(self.apis)
+        elif resource in self.apis:
+            self._dirty.add(resource)
+
+    def _delta_ve_escrita(self, resource: str, wm: Dict[str, Any]) -> bool:
+        """``True`` se o delta reflete as escritas locais em ``resource``."""
+        return bool(wm.get("updated_at")) and resource in REPLICATED_RESOURCES
+
+    def _is_delta(self, linhas: List[Dict[str, Any]], wm: Dict[str, Any]) -> bool:
+        """``True`` se todas as linhas são posteriores à marca d'água (servidor aplicou o filtro)."""
+        for r in linhas:
+            atualizado = _updated_at(r)
+            if wm.get("updated_at") and atualizado and atualizado > wm["updated_at"]:
+                continue
+            if wm.get("id") is not None and (_id(r) or 0) > wm["id"]:
+                continue
+            return False
+        return True
+
+    def sync(self, resource: str, force: bool = False, full: bool = False) -> int:
+        """Sincroniza ``resource`` e retorna quantas linhas foram mescladas."""
+        with self._locks[resource]:
+            agora = time.monotonic()
+            if not (force or full or resource in self._dirty):
+                if agora - self._last_sync.get(resource, float("-inf")) < self.min_interval:
+                    return 0
+            wm = self.watermark(resource)
+            full = full or not wm or self.store.count(resource) == 0 \
+                or agora - self._last_full[resource] >= self.full_interval \
+                or (resource in self._dirty and not self._delta_ve_escrita(resource, wm))
+            api = self.apis[resource]
+            params = {}
+            if not full:
+                if wm.get("updated_at"):
+                    params["updatedSince"] = wm["updated_at"]
+                if wm.get("id") is not None:
+                    params["sinceId"] = str(wm["id"])
+            linhas = api._request("GET", api._url(), params=params or None)
+            if not isinstance(linhas, list):
+                if linhas is None:
+                    # Falha de rede: mantém a réplica atual e tenta de novo no próximo ciclo
+                    return 0
+                linhas = [linhas] if linhas else []
+            linhas = [r for r in linhas if isinstance(r, dict)]
+
+            if full or not self._is_delta(linhas, wm):
+                n = self.store.replace(resource, linhas)
+                self._last_full[resource] = agora
+                modo = "full"
+            else:
+                n = self.store.merge(resource, linhas)
+                modo = "delta"
+            self._save_watermark(resource, linhas)
+            self._last_sync[resource] = agora
+            self._dirty.discard(resource)
+            logger.info("sync", extra={"resource": resource, "mode": modo, "rows": n})
+            return n
+
+    def sync_all(self, force: bool = False) -> Dict[str, int]:
+        return {r: self.sync(r, force=force) for r in self.apis}
+
+    # --- Leitura ---
+    def rows(self, resource: str) -> List[Dict[str, Any]]:
+        """Linhas da réplica (sincroniza antes, respeitando ``min_interval``)."""
+        self.sync(resource)
+        return self.store.rows(resource)
+
+    def query(self, resource: str, date_from=None, date_to=None, cliente_id=None, fields=None, order_by=None,
+              campo_cliente: str = "id_cliente") -> List[Dict[str, Any]]:
+        self.sync(resource)
+        if hasattr(self.store, "query"):
+            return self.store.query(resource, date_from, date_to, cliente_id, fields, order_by, campo_cliente)
+        return consulta.filtrar_registros(self.store.rows(resource), date_from, date_to, cliente_id,
+                                          campo_cliente, fields, order_by)
+
+    def api(self, resource: str) -> "ReplicaAPI":
+        return ReplicaAPI(self, resource)
+
+
+class ReplicaAPI:
+    """Fachada de leitura com a mesma interface das APIs (``get_all``/``query``).
+
+    Permite trocar ``crediario_api`` por ``sync_engine.api("crediario")`` nas
+    views sem mudar o restante do código.
+    """
+
+    def __init__(self, engine: SyncEngine, resource: str):
+        self.engine = engine
+        self.resource = resource
+
+    def get_all(self):
+        return self.engine.rows(self.resource)
+
+    def query(self, date_from=None, date_to=None, cliente_id=None, fields=None, order_by=None,
+              campo_cliente: str = "id_cliente"):
+        return self.engine.query(self.resource, date_from, date_to, cliente_id, fields, order_by, campo_cliente)
+
+
+_engine: Optional[SyncEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_sync_engine(base_url: str) -> SyncEngine:
+    """Instância única por processo (a réplica é compartilhada pelas views)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = SyncEngine(base_url)
+        return _engine
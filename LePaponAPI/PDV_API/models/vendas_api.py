@@ -1,20 +1,22 @@
-import requests
+from .http_session import get_session
+from .sqlite_replica import ler_com_replica
 
 class VendasAPI:
     def __init__(self, base_url):
         self.base_url = base_url.rstrip('/')
+        self.session = get_session(self.base_url)
 
     def get_all(self):
-        return requests.get(f"{self.base_url}/api/vendas").json()
+        return ler_com_replica("vendas", lambda: self.session.get(f"{self.base_url}/api/vendas").json())
 
     def get_by_id(self, id):
-        return requests.get(f"{self.base_url}/api/vendas/{id}").json()
+        return self.session.get(f"{self.base_url}/api/vendas/{id}").json()
 
     def create(self, data):
-        return requests.post(f"{self.base_url}/api/vendas", json=data).json()
+        return self.session.post(f"{self.base_url}/api/vendas", json=data).json()
 
     def update(self, id, data):
-        return requests.put(f"{self.base_url}/api/vendas/{id}", json=data).json()
+        return self.session.put(f"{self.base_url}/api/vendas/{id}", json=data).json()
 
     def delete(self, id):
-        return requests.delete(f"{self.base_url}/api/vendas/{id}").json()
+        return self.session.delete(f"{self.base_url}/api/vendas/{id}").json()
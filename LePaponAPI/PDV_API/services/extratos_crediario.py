@@ -0,0 +1,443 @@
+"""Extratos de crediário em lote (fechamento do mês).
+
+Em vez de exportar e enviar cliente a cliente pela tela, ``LoteExtratos``
+monta as etapas de um job (``services/job_runner.py``):
+
+1. ``calcular``: uma única passada nos lançamentos do período — filtra os
+   não pagos, junta os produtos e agrupa por ``id_cliente`` (saldo
+   recebido de todos os clientes vem de uma só chamada à API);
+2. ``renderizar``: desenha os PDFs num pool de processos (reportlab é CPU);
+3. ``upload``: envia todos os PDFs numa única sessão SFTP (``upload_many``);
+4. ``whatsapp``: envia os links com concorrência limitada e intervalo
+   mínimo entre mensagens (limite da Graph API);
+5. ``manifesto``: grava ``manifesto.json`` com o resultado de cada cliente.
+
+As etapas só processam o que ainda falta (PDF não gerado, upload ou envio
+pendente), então a repetição automática de uma etapa não reenvia nada. Erro
+de um cliente (PDF, upload) fica registrado no extrato dele e os demais
+seguem para o envio; a etapa só falha (e é repetida) quando nada do que
+estava pendente deu certo e não há outro cliente pronto para a próxima.
+
+O manifesto é regravado ao fim de cada etapa. Um novo lote do mesmo
+período retoma o último manifesto: clientes com a mesma conta já enviados
+não recebem de novo, e PDFs já gerados ou no servidor são reaproveitados.
+"""
+import datetime
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from models.sftp_pool import get_sftp
+from services.job_runner import Etapa
+from utils import transformacoes
+from utils.logger import get_logger
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PASTA_CREDIARIO = os.path.join(_BASE_DIR, "..", "Crediario")
+LOGO_PATH = os.path.join(_BASE_DIR, "..", "acents", "L.png")
+EXTRATOS_PROCESSOS = int(os.getenv("EXTRATOS_PROCESSOS", str(min(4, os.cpu_count() or 2))))
+ENVIO_CONCORRENCIA = int(os.getenv("EXTRATOS_ENVIO_CONCORRENCIA", "3"))
+ENVIO_INTERVALO = float(os.getenv("EXTRATOS_ENVIO_INTERVALO", "1.0"))  # segundos entre mensagens
+
+CAMPOS_PDF = ['data', 'qtd', 'nome_Prod', 'Valor_Prod', 'sub_total_calc']
+LEGENDAS_PDF = {
+    'data': 'Data',
+    'qtd': 'Qtd',
+    'nome_Prod': 'Produto',
+    'Valor_Prod': 'Valor Unit.',
+    'sub_total_calc': 'Subtotal'
+}
+
+logger = get_logger("extratos")
+
+
+def nome_pasta(nome: str) -> str:
+    """Nome do cliente sem caracteres inválidos para pasta/arquivo."""
+    return re.sub(r'[^a-zA-Z0-9_\-]', '_', nome)
+
+
+def desenhar_extrato(pdf_path: str, cliente_nome: str, linhas: List[tuple], total_bruto: float,
+                     saldo_anterior: float) -> str:
+    """Desenha o PDF do extrato (mesmo layout da exportação individual).
+
+    Função de módulo (e não método) para poder rodar num processo do pool.
+    """
+    os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
+    c = canvas.Canvas(pdf_path, pagesize=A4)
+    width, height = A4
+    try:
+        c.drawImage(LOGO_PATH, 40, height-100, width=60, height=60, preserveAspectRatio=True, mask='auto')
+    except Exception:
+        pass  # Se não encontrar o logo, ignora
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(110, height-60, "LePapon Lanches - Claudemir")
+    c.setFont("Helvetica", 10)
+    c.drawString(110, height-80, "Endereço: João Venâncio Girarde, nº 260")
+    c.drawString(110, height-95, "CNPJ: 33.794.253/0001-33   Fone: (54) 99125-3180")
+    c.setFont("Helvetica", 10)
+    c.drawString(400, height-60, f"Data: {datetime.datetime.now().strftime('%d/%m/%Y')}")
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(40, height-120, f"Relatório de Crediário: {cliente_nome}")
+    c.setFont("Helvetica", 10)
+    y = height-150
+    col_widths = [70, 50, 200, 70, 70]  # data, qtd, nome_Prod, Valor_Prod, sub_total_calc
+    x_positions = [40]
+    for w in col_widths[:-1]:
+        x_positions.append(x_positions[-1] + w)
+    for i, campo in enumerate(CAMPOS_PDF):
+        c.drawString(x_positions[i], y, LEGENDAS_PDF[campo])
+    y -= 20
+    for valores in linhas:
+        for i, valor in enumerate(valores):
+            c.drawString(x_positions[i], y, valor)
+        y -= 18
+        if y < 60:
+            c.showPage()
+            y = height-40
+    # Totais com abatimento do saldo anterior
+    if y < 120:
+        c.showPage()
+        y = height-40
+    total_liquido = total_bruto - saldo_anterior
+    credito_restante = 0.0
+    if total_liquido < 0:
+        credito_restante = abs(total_liquido)
+        total_liquido = 0.0
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(40, y-10, f"Total bruto: R$ {total_bruto:.2f}")
+    y -= 18
+    c.setFont("Helvetica", 11)
+    c.drawString(40, y-10, f"Saldo anterior: R$ {saldo_anterior:.2f}")
+    y -= 18
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(40, y-10, f"Total a pagar: R$ {total_liquido:.2f}")
+    y -= 18
+    if credito_restante > 0:
+        c.setFont("Helvetica", 11)
+        c.drawString(40, y-10, f"Crédito restante após abatimento: R$ {credito_restante:.2f}")
+    c.save()
+    return pdf_path
+
+
+def _desenhar(extrato: Dict[str, Any]) -> str:
+    return desenhar_extrato(extrato['_destino'], extrato['nome'], extrato['linhas'],
+                            extrato['total_bruto'], extrato['saldo_anterior'])
+
+
+def saldos_por_cliente(saldos) -> Dict[str, float]:
+    """Soma do saldo recebido de cada cliente (``{id_cliente: valor}``)."""
+    df = pd.DataFrame(saldos or [])
+    if df.empty or 'id_cliente' not in df.columns or 'valor' not in df.columns:
+        return {}
+    return transformacoes.para_decimal(df['valor']).groupby(df['id_cliente'].astype(str)).sum().to_dict()
+
+
+def calcular_extratos(crediarios, produtos, indice_clientes, saldos) -> List[Dict[str, Any]]:
+    """Extrato de cada cliente com crediário em aberto, numa passada só (groupby)."""
+    df = pd.DataFrame(crediarios or [])
+    if df.empty or 'id_cliente' not in df.columns or 'pago' not in df.columns:
+        return []
+    df = df[df['pago'].astype(str) == '0']
+    if df.empty:
+        return []
+    df = transformacoes.juntar_produtos(df, produtos)
+    df = df.sort_values('data') if 'data' in df.columns else df
+    df = df.assign(sub_total_calc=transformacoes.sub_total(df))
+    if 'data' in df.columns:
+        df['data'] = transformacoes.formatar_datas(df['data'])
+    saldos = saldos_por_cliente(saldos)
+
+    extratos = []
+    for id_cliente, grupo in df.groupby(df['id_cliente'].astype(str), sort=False):
+        total_bruto = float(grupo['sub_total_calc'].sum())
+        saldo_anterior = float(saldos.get(id_cliente, 0.0))
+        if total_bruto - saldo_anterior <= 0:
+            continue  # saldo recebido cobre tudo: nada a cobrar
+        nome = indice_clientes.nome_completo(id_cliente, f'cliente_{id_cliente}')
+        extratos.append({
+            'id_cliente': id_cliente,
+            'nome': nome,
+            'telefone': indice_clientes.telefone(id_cliente),
+            'linhas': transformacoes.linhas_texto(grupo, CAMPOS_PDF),
+            'total_bruto': total_bruto,
+            'saldo_anterior': saldo_anterior,
+            'total_liquido': total_bruto - saldo_anterior,
+        })
+    extratos.sort(key=lambda e: e['nome'].lower())
+    return extratos
+
+
+class _Intervalo:
+    """Garante ``intervalo`` segundos entre chamadas, mesmo vindas de várias threads."""
+
+    def __init__(self, intervalo: float):
+        self.intervalo = intervalo
+        self._proxima = 0.0
+        self._lock = threading.Lock()
+
+    def aguardar(self) -> None:
+        with self._lock:
+            agora = time.monotonic()
+            espera = self._proxima - agora
+            self._proxima = max(agora, self._proxima) + self.intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+
+class LoteExtratos:
+    """Etapas do job de extratos do mês.
+
+    - ``carregar()`` devolve ``(crediarios, produtos, indice_clientes, saldos)``;
+    - ``uploader``: ``EnviarContaCliente`` (só ``enviar_pdf`` é usado);
+    - ``droplet``: ``host``, ``usuario``, ``caminho_chave``, ``pasta_remota`` e ``url_base``;
+    - ``registrar(extrato, resposta)``: opcional, chamado após cada envio bem-sucedido;
+    - ``on_progresso(texto)``: opcional, progresso item a item;
+    - ``periodo``: identifica o lote (ex.: ``"2024-05-01_2024-05-31"``); com
+      ele, um novo lote retoma o último manifesto do mesmo período.
+    """
+
+    def __init__(self, carregar: Callable[[], tuple], uploader, droplet: Dict[str, str],
+                 registrar: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+                 on_progresso: Optional[Callable[[str], None]] = None, pasta_base: str = PASTA_CREDIARIO,
+                 enviar_whatsapp: bool = True, periodo: Optional[str] = None):
+        self.carregar = carregar
+        self.uploader = uploader
+        self.droplet = droplet
+        self.registrar = registrar
+        self.on_progresso = on_progresso
+        self.pasta_base = pasta_base
+        self.enviar_whatsapp = enviar_whatsapp
+        self.periodo = periodo
+        self.retomado_de: Optional[str] = None
+        self.carimbo = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        self.pasta_lote = os.path.join(pasta_base, "_lotes", self.carimbo)
+        self.manifesto_path = os.path.join(self.pasta_lote, "manifesto.json")
+
+    def etapas(self) -> List[Etapa]:
+        etapas = [
+            Etapa("calcular", self.calcular, tentativas=2, descricao="calculando saldos"),
+            Etapa("renderizar", self.renderizar, tentativas=2, descricao="gerando PDFs"),
+            Etapa("upload", self.upload, tentativas=3, descricao="enviando PDFs ao servidor"),
+        ]
+        if self.enviar_whatsapp:
+            # Uma tentativa só: a Graph API não é idempotente e repetir após
+            # timeout pode entregar a mensagem duas vezes (o próximo lote retoma)
+            etapas.append(Etapa("whatsapp", self.whatsapp, descricao="enviando pelo WhatsApp"))
+        etapas.append(Etapa("manifesto", self.salvar_manifesto, descricao="gravando manifesto"))
+        return etapas
+
+    def _progresso(self, texto: str) -> None:
+        if self.on_progresso is not None:
+            try:
+                self.on_progresso(texto)
+            except Exception as e:
+                logger.warning(f"Erro no callback de progresso: {e}")
+
+    # --- Etapas ---
+    def calcular(self, ctx: Dict[str, Any]) -> None:
+        if 'extratos' in ctx:
+            return
+        crediarios, produtos, indice_clientes, saldos = self.carregar()
+        ctx['extratos'] = calcular_extratos(crediarios, produtos, indice_clientes, saldos)
+        self._progresso(f"{len(ctx['extratos'])} cliente(s) com crediário em aberto")
+        anterior = self._manifesto_anterior()
+        if anterior is not None:
+            retomados = self._retomar(ctx['extratos'], anterior)
+            self.retomado_de = anterior.get('lote')
+            self._progresso(f"Retomando o lote {self.retomado_de}: {retomados} cliente(s) reaproveitado(s)")
+        self.salvar_manifesto(ctx)
+
+    def _manifesto_anterior(self) -> Optional[Dict[str, Any]]:
+        """Manifesto mais recente do mesmo período (``None`` sem período ou sem lote anterior)."""
+        if not self.periodo:
+            return None
+        pasta = os.path.join(self.pasta_base, "_lotes")
+        try:
+            lotes = sorted(os.listdir(pasta), reverse=True)
+        except OSError:
+            return None
+        for lote in lotes:
+            if lote == self.carimbo:
+                continue
+            try:
+                with open(os.path.join(pasta, lote, "manifesto.json"), "r", encoding="utf-8") as f:
+                    manifesto = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if isinstance(manifesto, dict) and manifesto.get('periodo') == self.periodo:
+                return manifesto
+        return None
+
+    @staticmethod
+    def _retomar(extratos: List[Dict[str, Any]], manifesto: Dict[str, Any]) -> int:
+        """Copia do lote anterior o que já foi feito para clientes com a mesma conta."""
+        anteriores = {
+            str(c.get('id_cliente')): c for c in manifesto.get('clientes', []) if isinstance(c, dict)
+        }
+        retomados = 0
+        for extrato in extratos:
+            anterior = anteriores.get(extrato['id_cliente'])
+            if anterior is None or round(float(anterior.get('total_liquido') or 0), 2) != \
+                    round(extrato['total_liquido'], 2):
+                continue  # conta mudou desde o lote anterior: refaz do início
+            if anterior.get('url'):
+                campos = ('arquivo', 'pdf_path', 'url', 'enviado')
+            elif anterior.get('pdf_path') and os.path.exists(anterior['pdf_path']):
+                campos = ('arquivo', 'pdf_path')
+            else:
+                continue
+            extrato.update({k: anterior.get(k) for k in campos})
+            retomados += 1
+        return retomados
+
+    def _concluir_etapa(self, ctx: Dict[str, Any], pendentes, feito: Callable[[Dict[str, Any]], bool],
+                        pronto: Callable[[Dict[str, Any]], bool], mensagem: str) -> None:
+        """Falha a etapa (para o job repetir) só se nenhum pendente deu certo e
+        nenhum outro cliente está pronto para a etapa seguinte."""
+        ids_pendentes = {id(e) for e in pendentes}
+        if pendentes and not any(feito(e) for e in pendentes) and \
+                not any(pronto(e) for e in ctx['extratos'] if id(e) not in ids_pendentes):
+            raise Exception(mensagem)
+
+    def renderizar(self, ctx: Dict[str, Any]) -> None:
+        pendentes = [e for e in ctx['extratos'] if not e.get('pdf_path')]
+        for extrato in pendentes:
+            extrato['erro'] = None
+            extrato['arquivo'] = f"{nome_pasta(extrato['nome'])}_{self.carimbo}.pdf"
+            extrato['_destino'] = os.path.join(self.pasta_base, nome_pasta(extrato['nome']), f"{self.carimbo}.pdf")
+        try:
+            self._renderizar_em_processos(pendentes)
+        except (BrokenProcessPool, OSError) as e:
+            # Sem pool de processos disponível: desenha nesta thread mesmo
+            logger.warning(f"Pool de processos indisponível ({e}); gerando PDFs em sequência")
+            for n, extrato in enumerate(pendentes, 1):
+                if not extrato.get('pdf_path'):
+                    self._concluir_pdf(extrato, lambda x=extrato: _desenhar(x))
+                self._progresso(f"PDFs gerados: {n}/{len(pendentes)}")
+        self.salvar_manifesto(ctx)
+        self._concluir_etapa(ctx, pendentes, lambda e: bool(e.get('pdf_path')),
+                             lambda e: bool(e.get('pdf_path')) and not e.get('enviado'),
+                             "Falha ao gerar os PDFs")
+
+    def _renderizar_em_processos(self, pendentes) -> None:
+        if not pendentes:
+            return
+        # spawn: o app tem threads (UI, pool SFTP) e fork as copiaria em estado inconsistente
+        with ProcessPoolExecutor(max_workers=max(1, EXTRATOS_PROCESSOS),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futuros = {pool.submit(_desenhar, e): e for e in pendentes}
+            for n, futuro in enumerate(as_completed(futuros), 1):
+                self._concluir_pdf(futuros[futuro], futuro.result)
+                self._progresso(f"PDFs gerados: {n}/{len(pendentes)}")
+
+    @staticmethod
+    def _concluir_pdf(extrato, obter) -> None:
+        try:
+            extrato['pdf_path'] = obter()
+        except BrokenProcessPool:
+            raise
+        except Exception as e:
+            extrato['erro'] = f"PDF: {e}"
+
+    def upload(self, ctx: Dict[str, Any]) -> None:
+        pendentes = [e for e in ctx['extratos'] if e.get('pdf_path') and not e.get('url')]
+        pasta_remota = self.droplet['pasta_remota']
+        conexao = get_sftp(self.droplet['host'], self.droplet['usuario'], self.droplet['caminho_chave'])
+        resultados = conexao.upload_many(
+            (e['pdf_path'], f"{pasta_remota}/{e['arquivo']}") for e in pendentes
+        )
+        for extrato, (_, erro) in zip(pendentes, resultados):
+            if erro is None:
+                extrato['url'] = f"{self.droplet['url_base']}/{extrato['arquivo']}"
+                extrato['erro'] = None
+            else:
+                extrato['erro'] = f"upload: {erro}"
+        enviados = sum(1 for e in ctx['extratos'] if e.get('url'))
+        self._progresso(f"PDFs no servidor: {enviados}/{len(ctx['extratos'])}")
+        self.salvar_manifesto(ctx)
+        self._concluir_etapa(ctx, pendentes, lambda e: bool(e.get('url')),
+                             lambda e: bool(e.get('url')) and not e.get('enviado'),
+                             "Falha no upload dos PDFs")
+
+    def whatsapp(self, ctx: Dict[str, Any]) -> None:
+        pendentes = [e for e in ctx['extratos'] if e.get('url') and not e.get('enviado')]
+        for extrato in pendentes:
+            if not extrato.get('telefone'):
+                extrato['erro'] = "Telefone do cliente não encontrado"
+        pendentes = [e for e in pendentes if e.get('telefone')]
+        intervalo = _Intervalo(ENVIO_INTERVALO)
+        with ThreadPoolExecutor(max_workers=max(1, ENVIO_CONCORRENCIA), thread_name_prefix="extratos") as pool:
+            futuros = {pool.submit(self._enviar, e, intervalo): e for e in pendentes}
+            for n, futuro in enumerate(as_completed(futuros), 1):
+                futuro.result()
+                self._progresso(f"Mensagens processadas: {n}/{len(pendentes)}")
+        self.salvar_manifesto(ctx)
+        if any(e.get('telefone') and e.get('url') and not e.get('enviado') for e in ctx['extratos']):
+            raise Exception("Falha no envio de algumas mensagens")
+
+    def _enviar(self, extrato: Dict[str, Any], intervalo: _Intervalo) -> None:
+        intervalo.aguardar()
+        try:
+            resposta = self.uploader.enviar_pdf(extrato['telefone'], extrato['url'], nome_arquivo=extrato['arquivo'])
+        except Exception as e:
+            extrato['erro'] = f"whatsapp: {e}"
+            return
+        if not (isinstance(resposta, dict) and resposta.get('messages')):
+            extrato['erro'] = f"whatsapp: {resposta}"
+            return
+        extrato['enviado'] = True
+        extrato['erro'] = None
+        if self.registrar is not None:
+            try:
+                self.registrar(extrato, resposta)
+            except Exception as e:
+                logger.warning(f"Erro ao registrar mensagem de {extrato['nome']}: {e}")
+
+    # --- Resultado ---
+    def salvar_manifesto(self, ctx: Dict[str, Any]) -> None:
+        """Grava o resumo do lote (substituição atômica do arquivo)."""
+        extratos = ctx.get('extratos', [])
+        manifesto = {
+            'lote': self.carimbo,
+            'periodo': self.periodo,
+            'retomado_de': self.retomado_de,
+            'resumo': self.resumo(ctx, texto=False),
+            'clientes': [
+                {k: v for k, v in e.items() if k not in ('linhas', '_destino')}
+                for e in extratos
+            ],
+        }
+        os.makedirs(self.pasta_lote, exist_ok=True)
+        tmp = f"{self.manifesto_path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp, self.manifesto_path)
+        ctx['manifesto'] = self.manifesto_path
+
+    def resumo(self, ctx: Dict[str, Any], texto: bool = True):
+        extratos = ctx.get('extratos', [])
+        dados = {
+            'clientes': len(extratos),
+            'total_a_receber': round(sum(e['total_liquido'] for e in extratos), 2),
+            'pdfs': sum(1 for e in extratos if e.get('pdf_path')),
+            'no_servidor': sum(1 for e in extratos if e.get('url')),
+            'enviados': sum(1 for e in extratos if e.get('enviado')),
+            'falhas': sum(1 for e in extratos if e.get('erro')),
+        }
+        if not texto:
+            return dados
+        return (
+            f"Extratos: {dados['clientes']} cliente(s), R$ {dados['total_a_receber']:.2f} a receber | "
+            f"PDFs {dados['pdfs']} | servidor {dados['no_servidor']} | enviados {dados['enviados']} | "
+            f"falhas {dados['falhas']}"
+        )
@@ -0,0 +1,170 @@
+"""Fila de tarefas em segundo plano para as operações demoradas das telas.
+
+Gerar PDF, enviar ao droplet (SFTP) e mandar pelo WhatsApp (Graph API)
+levam segundos; feitos no callback do Flet, congelam o caixa. Aqui cada
+operação vira um ``Job`` com etapas executadas em sequência por um pool de
+threads, fora da thread da interface.
+
+- Cada etapa tem suas próprias tentativas, com espera crescente entre
+  elas: se o WhatsApp falhar, só o envio é repetido (o upload já feito
+  não é refeito).
+- ``ErroDefinitivo`` encerra o job sem novas tentativas (dados inválidos,
+  arquivo inexistente...).
+- ``on_progresso(job)`` é chamado a cada mudança (etapa iniciada,
+  tentativa com erro, conclusão ou falha); a tela atualiza a mensagem a
+  partir dele (o Flet aceita ``page.update`` vindo de outras threads).
+- Jobs com a mesma ``chave`` não rodam em paralelo: um segundo clique
+  enquanto o primeiro está na fila devolve o job já existente.
+
+As etapas compartilham ``job.contexto`` (dict): o que uma etapa grava ali
+(caminho do PDF, URL pública...) fica disponível para as seguintes.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from utils.logger import get_logger
+
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+JOBS_HISTORICO = int(os.getenv("JOBS_HISTORICO", "100"))
+RETRY_BASE = float(os.getenv("JOBS_RETRY_BASE", "2"))
+
+logger = get_logger("jobs")
+
+FILA, EXECUTANDO, CONCLUIDO, FALHOU = "fila", "executando", "concluido", "falhou"
+
+
+class ErroDefinitivo(Exception):
+    """Erro que não adianta repetir; encerra o job na hora."""
+
+
+class Etapa:
+    def __init__(self, nome: str, funcao: Callable[[Dict[str, Any]], Any], tentativas: int = 1,
+                 descricao: Optional[str] = None):
+        self.nome = nome
+        self.funcao = funcao
+        self.tentativas = max(1, tentativas)
+        self.descricao = descricao or nome
+
+
+class Job:
+    def __init__(self, nome: str, etapas: List[Etapa], contexto: Optional[Dict[str, Any]] = None,
+                 on_progresso: Optional[Callable[["Job"], None]] = None, chave: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.nome = nome
+        self.chave = chave
+        self.etapas = etapas
+        self.contexto: Dict[str, Any] = dict(contexto or {})
+        self.on_progresso = on_progresso
+        self.status = FILA
+        self.etapa: Optional[Etapa] = None
+        self.tentativa = 0
+        self.erro: Optional[str] = None
+        self.concluido = threading.Event()
+
+    @property
+    def ativo(self) -> bool:
+        return self.status in (FILA, EXECUTANDO)
+
+    @property
+    def descricao(self) -> str:
+        """Texto curto do estado atual, para exibir na tela."""
+        if self.status == FILA:
+            return f"{self.nome}: aguardando na fila..."
+        if self.status == EXECUTANDO and self.etapa is not None:
+            sufixo = f" (tentativa {self.tentativa}/{self.etapa.tentativas})" if self.tentativa > 1 else ""
+            return f"{self.nome}: {self.etapa.descricao}...{sufixo}"
+        if self.status == FALHOU:
+            return f"{self.nome}: falhou em '{self.etapa.descricao if self.etapa else ''}': {self.erro}"
+        return f"{self.nome}: concluído"
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        return self.concluido.wait(timeout)
+
+
+class JobRunner:
+    def __init__(self, workers: int = JOBS_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="jobs")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, nome: str, etapas: Iterable[Etapa], contexto: Optional[Dict[str, Any]] = None,
+               on_progresso: Optional[Callable[[Job], None]] = None, chave: Optional[str] = None) -> Job:
+        """Enfileira o job e retorna na hora (a UI não espera)."""
+        with self._lock:
+            if chave is not None:
+                for job in self._jobs.values():
+                    if job.chave == chave and job.ativo:
+                        return job
+            job = Job(nome, list(etapas), contexto, on_progresso, chave)
+            self._jobs[job.id] = job
+            while len(self._jobs) > JOBS_HISTORICO:
+                antigo = next(iter(self._jobs.values()))
+                if antigo.ativo:
+                    break
+                self._jobs.popitem(last=False)
+        self._notificar(job)
+        self._executor.submit(self._executar, job)
+        return job
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _notificar(self, job: Job) -> None:
+        if job.on_progresso is None:
+            return
+        try:
+            job.on_progresso(job)
+        except Exception as e:
+            logger.warning(f"Erro no callback de progresso do job {job.nome}: {e}")
+
+    def _executar(self, job: Job) -> None:
+        job.status = EXECUTANDO
+        try:
+            for etapa in job.etapas:
+                job.etapa = etapa
+                if not self._executar_etapa(job, etapa):
+                    job.status = FALHOU
+                    return
+            job.status = CONCLUIDO
+        finally:
+            if job.status == FALHOU:
+                logger.warning(f"Job {job.nome} falhou na etapa {job.etapa.nome if job.etapa else '?'}: {job.erro}")
+            job.concluido.set()
+            self._notificar(job)
+
+    def _executar_etapa(self, job: Job, etapa: Etapa) -> bool:
+        for tentativa in range(1, etapa.tentativas + 1):
+            job.tentativa = tentativa
+            self._notificar(job)
+            try:
+                etapa.funcao(job.contexto)
+                job.erro = None
+                return True
+            except ErroDefinitivo as e:
+                job.erro = str(e)
+                return False
+            except Exception as e:
+                job.erro = str(e)
+                if tentativa == etapa.tentativas:
+                    return False
+                logger.info(f"Job {job.nome}: etapa {etapa.nome} falhou ({e}); tentando de novo")
+                time.sleep(RETRY_BASE * 2 ** (tentativa - 1))
+        return False
+
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
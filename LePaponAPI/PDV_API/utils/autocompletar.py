@@ -0,0 +1,107 @@
+"""
+Autocompletar de clientes/produtos ligado a um índice de ``models/indices.py``.
+
+A cada tecla o campo de busca só reagenda a consulta (``Debounce``); a busca
+roda quando o usuário para de digitar por ``ATRASO_DIGITACAO`` segundos e
+devolve no máximo ``LIMITE_SUGESTOES`` registros, os mais relevantes primeiro.
+As opções (``ft.dropdown.Option``, ``ft.ListTile``...) são reaproveitadas por
+chave com ``ListaChaveada``: digitar mais uma letra normalmente só remove
+opções, sem recriar as que continuam na lista.
+"""
+import os
+import threading
+
+from models.indices import normalizar
+from utils.lista_chaveada import ListaChaveada
+
+ATRASO_DIGITACAO = float(os.getenv("AUTOCOMPLETAR_ATRASO", "0.25"))
+LIMITE_SUGESTOES = int(os.getenv("AUTOCOMPLETAR_LIMITE", "20"))
+
+
+class Debounce:
+    """Executa ``funcao`` só depois de ``atraso`` segundos sem novas chamadas."""
+
+    def __init__(self, atraso, funcao):
+        self.atraso = atraso
+        self.funcao = funcao
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            if self.atraso <= 0:
+                self._timer = None
+            else:
+                self._timer = threading.Timer(self.atraso, self.funcao, args, kwargs)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+        self.funcao(*args, **kwargs)
+
+    def cancelar(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+class Autocompletar:
+    """Mantém ``container.<atributo>`` com as opções que casam com o texto digitado.
+
+    ``criar(chave, registro)`` monta a opção de um registro do índice e
+    ``atualizar(opcao, registro)`` a altera em lugar se o registro mudar.
+    Com menos de ``minimo`` caracteres a lista fica vazia; sem texto (e
+    ``minimo`` 0) todos os registros são listados, como antes do filtro.
+    """
+
+    def __init__(self, page, container, indice, criar, atualizar=None, atributo="controls",
+                 limite=LIMITE_SUGESTOES, minimo=0, atraso=ATRASO_DIGITACAO):
+        self.page = page
+        self.container = container
+        self.indice = indice
+        self.atributo = atributo
+        self.limite = limite
+        self.minimo = minimo
+        self.texto = ""
+        self.opcoes = ListaChaveada(criar, atualizar)
+        self._lock = threading.Lock()
+        self._debounce = Debounce(atraso, self.filtrar)
+
+    def ao_digitar(self, texto):
+        """Para o ``on_change`` do campo de busca: agenda a busca."""
+        self._debounce(texto or "")
+
+    def _itens(self, texto):
+        termo = normalizar(texto)
+        if len(termo) < self.minimo:
+            return []
+        registros = self.indice.buscar(termo, self.limite if termo else None)
+        return [(str(r.get(self.indice.chave)), r) for r in registros]
+
+    def montar(self, texto=""):
+        """Opções iniciais, sem ``page.update`` (a tela ainda está sendo montada)."""
+        with self._lock:
+            self.texto = texto
+            return self.opcoes.reconciliar(self._itens(texto))
+
+    def filtrar(self, texto=None):
+        """Busca imediatamente e envia só as opções que mudaram."""
+        with self._lock:
+            if texto is not None:
+                self.texto = texto
+            self.opcoes.aplicar(self.container, self._itens(self.texto), self.page, self.atributo)
+
+    def limpar(self):
+        """Esvazia a busca (ex.: após escolher uma opção), sem ``page.update``."""
+        self._debounce.cancelar()
+        with self._lock:
+            self.texto = ""
+            setattr(self.container, self.atributo, self.opcoes.reconciliar([]))
+
+    def trocar_indice(self, indice):
+        """Depois de gravar um registro: usa o índice remontado e refaz a busca atual."""
+        self.indice = indice
+        self._debounce.cancelar()
+        self.filtrar()
@@ -47,7 +47,13 @@ def sanitize_filename(nome):
 def obter_nome_cliente(clientes, cliente_id):
     """
     Obtém o nome completo do cliente pelo ID
+
+    ``clientes`` pode ser a lista ou um ``ClienteIndex`` já montado; quem chama
+    uma vez por linha deve passar o índice (busca O(1) em vez de percorrer a lista).
     """
+    from models.indices import ClienteIndex
+    if isinstance(clientes, ClienteIndex):
+        return clientes.nome_completo(cliente_id, f"Cliente {cliente_id}")
     cliente = next((c for c in clientes if str(c.get('id', '')) == str(cliente_id)), None)
     if cliente:
         return f"{cliente.get('nome', '')} {cliente.get('sobrenome', '')}"
@@ -1,5 +1,7 @@
 import flet as ft
 from models.clientes_api import ClientesAPI
+from models.indices import ClienteIndex, get_cliente_index
+from utils.autocompletar import Autocompletar
 from views.tema_0_0_0 import *
 from config import BASE_URL
 
@@ -27,25 +29,35 @@ def clientes_view(page: ft.Page):
 
     # Busca clientes cadastrados para filtro
     try:
-        data = clientes_api.get_all()
-        if not isinstance(data, list):
-            data = [data] if data else []
+        indice_clientes = get_cliente_index(clientes_api)
     except Exception as e:
         return ft.Text(f"Erro ao buscar clientes: {e}", color="red")
+    data = indice_clientes.registros
 
-    # Caixa de seleção e filtro por nome
+    # Caixa de seleção e filtro por nome (opções com chave = id do cliente)
     filtro_nome = ft.TextField(label="Filtrar por nome", width=200)
-    opcoes_clientes = [ft.dropdown.Option(text=str(f'{c.get("nome", "")} {c.get("sobrenome", "")}')) for c in data if isinstance(c, dict)]
-    dropdown_clientes = ft.Dropdown(options=opcoes_clientes, label="Selecionar cliente", width=350)
+    dropdown_clientes = ft.Dropdown(label="Selecionar cliente", width=350)
+    texto_opcao = lambda c: str(f'{c.get("nome", "")} {c.get("sobrenome", "")}')
+    autocompletar = Autocompletar(
+        page, dropdown_clientes, indice_clientes,
+        lambda chave, c: ft.dropdown.Option(key=chave, text=texto_opcao(c)),
+        lambda opcao, c: setattr(opcao, "text", texto_opcao(c)),
+        atributo="options",
+    )
+    dropdown_clientes.options = autocompletar.montar()
 
     def filtrar_clientes(e):
-        nome_filtro = (filtro_nome.value or "").lower()
-        lista_clientes = data if isinstance(data, list) else []
-        dropdown_clientes.options = [
-            ft.dropdown.Option(text=str(f'{c.get("nome", "")} {c.get("sobrenome", "")}'))
-            for c in lista_clientes if isinstance(c, dict) and nome_filtro in str(c.get("nome", "")).lower()
-        ]
-        page.update()
+        autocompletar.ao_digitar(filtro_nome.value)
+
+    def recarregar_clientes():
+        # Gravações via API invalidam o cache: o índice é remontado com os dados novos
+        nonlocal data
+        try:
+            indice = get_cliente_index(clientes_api)
+        except Exception:
+            indice = ClienteIndex([])
+        data = indice.registros
+        autocompletar.trocar_indice(indice)
 
     filtro_nome.on_change = filtrar_clientes
 
@@ -64,15 +76,7 @@ def clientes_view(page: ft.Page):
             msg.visible = True
             id_field.value = nome_field.value = sobrenome_field.value = fone_field.value = ""
             # Atualiza a lista de clientes e o dropdown
-            try:
-                data_atualizada = clientes_api.get_all()
-                if not isinstance(data_atualizada, list):
-                    data_atualizada = [data_atualizada] if data_atualizada else []
-            except Exception as e:
-                data_atualizada = []
-            nonlocal data
-            data = data_atualizada  # Atualiza a variável data global
-            dropdown_clientes.options = [ft.dropdown.Option(text=str(f'{c.get("nome", "")} {c.get("sobrenome", "")}')) for c in data_atualizada if isinstance(c, dict)]
+            recarregar_clientes()
             page.update()
         except Exception as ex:
             msg.value = f"Erro ao adicionar cliente: {ex}"
@@ -82,26 +86,17 @@ def clientes_view(page: ft.Page):
 
     # Função para preencher campos ao selecionar no dropdown
     def selecionar_cliente(e):
-        nome_sobrenome_selecionado = dropdown_clientes.value
-        lista_clientes = data if isinstance(data, list) else []
-        for c in lista_clientes:
-            if isinstance(c, dict) and f"{c.get('nome', '')} {c.get('sobrenome', '')}" == nome_sobrenome_selecionado:
-                id_field.value = str(c.get("id", ""))
-                nome_field.value = str(c.get("nome", ""))
-                sobrenome_field.value = str(c.get("sobrenome", ""))
-                fone_field.value = str(c.get("fone", ""))
-                break
+        c = autocompletar.indice.get(dropdown_clientes.value)
+        if c is not None:
+            id_field.value = str(c.get("id", ""))
+            nome_field.value = str(c.get("nome", ""))
+            sobrenome_field.value = str(c.get("sobrenome", ""))
+            fone_field.value = str(c.get("fone", ""))
         page.update()
     dropdown_clientes.on_change = selecionar_cliente
 
     def atualizar_clientes(e=None):
-        try:
-            data_atualizada = clientes_api.get_all()
-            if not isinstance(data_atualizada, list):
-                data_atualizada = [data_atualizada] if data_atualizada else []
-        except Exception as e:
-            data_atualizada = []
-        dropdown_clientes.options = [ft.dropdown.Option(text=str(f'{c.get("nome", "")} {c.get("sobrenome", "")}')) for c in data_atualizada if isinstance(c, dict)]
+        recarregar_clientes()
         page.update()
 
     def atualizar_cliente(e):
@@ -117,15 +112,7 @@ def clientes_view(page: ft.Page):
             msg.color = "green"
             msg.visible = True
             # Atualiza a lista de clientes e o dropdown
-            try:
-                data_atualizada = clientes_api.get_all()
-                if not isinstance(data_atualizada, list):
-                    data_atualizada = [data_atualizada] if data_atualizada else []
-            except Exception as e:
-                data_atualizada = []
-            nonlocal data
-            data = data_atualizada  # Atualiza a variável data global
-            dropdown_clientes.options = [ft.dropdown.Option(text=str(f'{c.get("nome", "")} {c.get("sobrenome", "")}')) for c in data_atualizada if isinstance(c, dict)]
+            recarregar_clientes()
             page.update()
         except Exception as ex:
             msg.value = f"Erro ao atualizar cliente: {ex}"
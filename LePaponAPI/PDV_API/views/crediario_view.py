@@ -1,20 +1,25 @@
 import flet as ft
 from models.crediario_api import CrediarioAPI
 from models.clientes_api import ClientesAPI
+from models.indices import ClienteIndex, get_cliente_index
 from models.produtos_todos_api import ProdutosTodosAPI
 from models.enviar_conta_cliente import EnviarContaCliente
 from models.salvar_res_whatsapp import WhatsAppMessageSaver
 from models.recebido_api import RecebidoAPI
+from models.sync_engine import get_sync_engine
+from services.job_runner import CONCLUIDO, FALHOU, Etapa, ErroDefinitivo, get_job_runner
+from services.extratos_crediario import CAMPOS_PDF, LoteExtratos, desenhar_extrato, nome_pasta
 import datetime
 import pandas as pd
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+from utils import transformacoes
 import tempfile
 import flet as ft
 import os
 import re
 from dotenv import load_dotenv
 from config import BASE_URL
+from utils.tabela_paginada import TabelaPaginada
+from utils.autocompletar import Autocompletar
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '../../../.env'))
 
@@ -22,6 +27,8 @@ crediario_api = CrediarioAPI(BASE_URL)
 clientes_api = ClientesAPI(BASE_URL)
 produtos_todos_api = ProdutosTodosAPI(BASE_URL)
 recebido_api = RecebidoAPI(BASE_URL)
+# Leitura por período vem da réplica local sincronizada por delta
+crediario_replica = get_sync_engine(BASE_URL).api("crediario")
 
 API_KEY: str = os.getenv("MINHA_API_KEY") or ""
 HEADERS = {"x-api-key": API_KEY}
@@ -72,18 +79,23 @@ def crediario_view(page: ft.Page):
     )
     # Caixa de seleção de clientes
     try:
-        clientes = clientes_api.get_all()
-        if not isinstance(clientes, list):
-            clientes = [clientes] if clientes else []
+        indice_clientes = get_cliente_index(clientes_api)
     except Exception:
-        clientes = []
-    opcoes_clientes = [ft.dropdown.Option(text=f"{c.get('id', '')} - {c.get('nome', '')} - {c.get('sobrenome', '')}", key=str(c.get('id', ''))) for c in clientes if isinstance(c, dict)]
+        indice_clientes = ClienteIndex([])
     dropdown_clientes = ft.Dropdown(
-        options=opcoes_clientes,
         label="Selecionar Cliente",
         width=350,
         on_change=lambda e: filtrar_crediario_periodo()
     )
+    # Opções reaproveitadas por id do cliente; a busca roda quando a digitação para
+    texto_opcao_cliente = lambda c: f"{c.get('id', '')} - {c.get('nome', '')} - {c.get('sobrenome', '')}"
+    autocompletar_clientes = Autocompletar(
+        page, dropdown_clientes, indice_clientes,
+        lambda chave, c: ft.dropdown.Option(text=texto_opcao_cliente(c), key=chave),
+        lambda opcao, c: setattr(opcao, "text", texto_opcao_cliente(c)),
+        atributo="options",
+    )
+    dropdown_clientes.options = autocompletar_clientes.montar()
     # Caixa de seleção para filtrar por pago
     dropdown_pago = ft.Dropdown(
         options=[
@@ -98,7 +110,7 @@ def crediario_view(page: ft.Page):
     total_crediario_label = ft.Text("Total do período: 0.00", style=ft.TextThemeStyle.TITLE_MEDIUM, width=250)
     saldo_recebido = ft.Text("Saldo Recebido: 0.00", style=ft.TextThemeStyle.TITLE_MEDIUM, width=250)
     saldo_devedor = ft.Text("Saldo Devedor: 0.00", style=ft.TextThemeStyle.TITLE_MEDIUM, width=250)
-    tabela_ref = ft.Ref[ft.DataTable]()
+    tabela = TabelaPaginada(page)
 
     def filtrar_crediario_periodo():
         di = data_inicial.value
@@ -110,28 +122,19 @@ def crediario_view(page: ft.Page):
         di_str = str(di)
         df_str = str(df)
         try:
-            crediarios = crediario_api.get_all()
-            if not isinstance(crediarios, list):
-                crediarios = [crediarios] if crediarios else []
+            crediarios = crediario_replica.query(date_from=di_str, date_to=df_str, cliente_id=cliente_id or None)
             # Busca produtos todos
             produtos_todos = produtos_todos_api.get_all()
             if not isinstance(produtos_todos, list):
                 produtos_todos = [produtos_todos] if produtos_todos else []
             # Converte para DataFrame
             crediario_df = pd.DataFrame(crediarios)
-            produtos_df = pd.DataFrame(produtos_todos)
-            # Faz o merge pelo campo de produto (ajuste o nome se necessário)
-            if not crediario_df.empty and not produtos_df.empty:
-                merged_df = crediario_df.merge(
-                    produtos_df[['id_Prod', 'nome_Prod', 'Valor_Prod']],
-                    left_on='id_Prod', right_on='id_Prod', how='left'
-                )
-            else:
-                merged_df = crediario_df
-            # Filtra por data e cliente (se selecionado)
-            crediarios_periodo = merged_df[(merged_df['data'] >= di_str) & (merged_df['data'] <= df_str)]
-            if cliente_id:
-                crediarios_periodo = crediarios_periodo[crediarios_periodo['id_cliente'].astype(str) == cliente_id]
+            merged_df = transformacoes.juntar_produtos(crediario_df, produtos_todos)
+            # Período e cliente já vêm filtrados por crediario_api.query
+            crediarios_periodo = merged_df
+            if crediarios_periodo.empty:
+                pass
+            elif cliente_id:
                 # Quando um cliente específico é selecionado, mostra apenas os não pagos
                 crediarios_periodo = crediarios_periodo[crediarios_periodo['pago'].astype(str) == '0']
             elif pago_val in ("1", "0"):
@@ -155,40 +158,15 @@ def crediario_view(page: ft.Page):
             if not crediarios_periodo.empty:
                 crediarios_periodo = crediarios_periodo.copy()
                 if 'data' in crediarios_periodo.columns:
-                    def formatar_data(d):
-                        try:
-                            # Tenta extrair apenas a parte da data (YYYY-MM-DD)
-                            data_str = str(d).split('T')[0]
-                            return datetime.datetime.strptime(data_str, '%Y-%m-%d').strftime('%d/%m/%Y')
-                        except Exception:
-                            return d or ''
-                    crediarios_periodo['data'] = crediarios_periodo['data'].apply(formatar_data)
+                    crediarios_periodo['data'] = transformacoes.formatar_datas(crediarios_periodo['data'])
             # Garante que a coluna de subtotal calculado existe
             if not crediarios_periodo.empty:
                 if 'sub_total_calc' not in crediarios_periodo.columns:
-                    crediarios_periodo['sub_total_calc'] = crediarios_periodo.apply(
-                        lambda row: float(row.get('qtd', 0)) * float(str(row.get('Valor_Prod', 0)).replace(",", ".")), axis=1
-                    )
-            # Seleciona apenas os campos desejados
-            if not crediarios_periodo.empty:
-                crediarios_periodo = crediarios_periodo[campos_exibir]
-                columns = [ft.DataColumn(ft.Text(colunas_legenda[c])) for c in campos_exibir]
-            else:
-                columns = [ft.DataColumn(ft.Text("Data"))]
-            rows = []
-            total = 0.0
-            for _, cred in crediarios_periodo.iterrows():
-                row = [ft.DataCell(ft.Text(str(cred.get(c, "")))) for c in campos_exibir]
-                rows.append(ft.DataRow(row))
-                try:
-                    total += float(str(cred.get("sub_total_calc", 0)).replace(",", "."))
-                except:
-                    pass
+                    crediarios_periodo['sub_total_calc'] = transformacoes.sub_total(crediarios_periodo)
+            # Só a página visível vira DataRow; o total usa o período inteiro
+            tabela.mostrar(crediarios_periodo, campos_exibir, colunas_legenda)
+            total = transformacoes.total(crediarios_periodo, 'sub_total_calc')
             #print(f"Total calculado: {total}")
-            if not rows:
-                rows = [ft.DataRow([ft.DataCell(ft.Text("")) for _ in columns])]
-            tabela_ref.current.columns = columns
-            tabela_ref.current.rows = rows
             # Atualiza saldo recebido e devedor
             saldoRecebido = float(get_saldo_recebido_por_cliente(cliente_id) if cliente_id else 0.0)
             saldoDevedor = total - saldoRecebido
@@ -202,8 +180,6 @@ def crediario_view(page: ft.Page):
             msg.visible = True
             page.update()
 
-    # Inicializa tabela vazia
-    tabela = ft.DataTable(ref=tabela_ref, columns=[ft.DataColumn(ft.Text("id"))], rows=[])
     # Carrega crediário do dia atual ao abrir
     filtrar_crediario_periodo()
 
@@ -213,12 +189,7 @@ def crediario_view(page: ft.Page):
         on_change=lambda e: filtrar_opcoes_clientes()
     )
     def filtrar_opcoes_clientes():
-        nome_filtro = (filtro_nome.value or "").lower()
-        dropdown_clientes.options = [
-            ft.dropdown.Option(text=f"{c.get('id', '')} - {c.get('nome', '')} - {c.get('sobrenome', '')}", key=str(c.get('id', '')))
-            for c in clientes if isinstance(c, dict) and nome_filtro in str(c.get('nome', '')).lower()
-        ]
-        page.update()
+        autocompletar_clientes.ao_digitar(filtro_nome.value)
 
     def exportar_pdf():
         try:
@@ -229,24 +200,16 @@ def crediario_view(page: ft.Page):
             pago_val = dropdown_pago.value
             di_str = str(di)
             df_str = str(df)
-            crediarios = crediario_api.get_all()
-            if not isinstance(crediarios, list):
-                crediarios = [crediarios] if crediarios else []
+            crediarios = crediario_replica.query(date_from=di_str, date_to=df_str, cliente_id=cliente_id or None)
             produtos_todos = produtos_todos_api.get_all()
             if not isinstance(produtos_todos, list):
                 produtos_todos = [produtos_todos] if produtos_todos else []
             crediario_df = pd.DataFrame(crediarios)
-            produtos_df = pd.DataFrame(produtos_todos)
-            if not crediario_df.empty and not produtos_df.empty:
-                merged_df = crediario_df.merge(
-                    produtos_df[['id_Prod', 'nome_Prod', 'Valor_Prod']],
-                    left_on='id_Prod', right_on='id_Prod', how='left'
-                )
-            else:
-                merged_df = crediario_df
-            crediarios_periodo = merged_df[(merged_df['data'] >= di_str) & (merged_df['data'] <= df_str)]
-            if cliente_id:
-                crediarios_periodo = crediarios_periodo[crediarios_periodo['id_cliente'].astype(str) == cliente_id]
+            merged_df = transformacoes.juntar_produtos(crediario_df, produtos_todos)
+            crediarios_periodo = merged_df
+            if crediarios_periodo.empty:
+                pass
+            elif cliente_id:
                 # Quando um cliente específico é selecionado, mostra apenas os não pagos
                 crediarios_periodo = crediarios_periodo[crediarios_periodo['pago'].astype(str) == '0']
             elif pago_val in ("1", "0"):
@@ -256,82 +219,23 @@ def crediario_view(page: ft.Page):
             # Ordena sempre colocando pago=0 primeiro, depois por data
             if not crediarios_periodo.empty:
                 crediarios_periodo = crediarios_periodo.sort_values(['pago', 'data'], ascending=[True, True])
-            # Remove a coluna 'hora' do PDF
-            campos_exibir = ['data', 'qtd', 'nome_Prod', 'Valor_Prod', 'sub_total_calc']
-            colunas_legenda = {
-                'data': 'Data',
-                'qtd': 'Qtd',
-                'nome_Prod': 'Produto',
-                'Valor_Prod': 'Valor Unit.',
-                'sub_total_calc': 'Subtotal'
-            }
             if not crediarios_periodo.empty:
                 crediarios_periodo = crediarios_periodo.copy()
                 if 'data' in crediarios_periodo.columns:
-                    def formatar_data(d):
-                        try:
-                            data_str = str(d).split('T')[0]
-                            return datetime.datetime.strptime(data_str, '%Y-%m-%d').strftime('%d/%m/%Y')
-                        except Exception:
-                            return d or ''
-                    crediarios_periodo['data'] = crediarios_periodo['data'].apply(formatar_data)
+                    crediarios_periodo['data'] = transformacoes.formatar_datas(crediarios_periodo['data'])
                 if 'sub_total_calc' not in crediarios_periodo.columns:
-                    crediarios_periodo['sub_total_calc'] = crediarios_periodo.apply(
-                        lambda row: float(row.get('qtd', 0)) * float(str(row.get('Valor_Prod', 0)).replace(",", ".")), axis=1
-                    )
+                    crediarios_periodo['sub_total_calc'] = transformacoes.sub_total(crediarios_periodo)
                 # Geração do PDF
                 if cliente_id:
-                    cliente_nome = next((c.get('nome', '') + ' ' + c.get('sobrenome', '') for c in clientes if str(c.get('id', '')) == str(cliente_id)), f'cliente_{cliente_id}')
+                    cliente_nome = indice_clientes.nome_completo(cliente_id, f'cliente_{cliente_id}')
                 else:
                     cliente_nome = 'todos_clientes'
                 # Remove caracteres inválidos do nome do cliente para pasta
-                cliente_nome_pasta = re.sub(r'[^a-zA-Z0-9_\-]', '_', cliente_nome)
+                cliente_nome_pasta = nome_pasta(cliente_nome)
                 pasta_destino = os.path.join(os.path.dirname(__file__), '../Crediario', cliente_nome_pasta)
                 os.makedirs(pasta_destino, exist_ok=True)
                 data_pdf = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
                 pdf_path = os.path.join(pasta_destino, f'{data_pdf}.pdf')
-                c = canvas.Canvas(pdf_path, pagesize=A4)
-                width, height = A4
-                # Cabeçalho personalizado
-                logo_path = os.path.join(os.path.dirname(__file__), '../acents/L.png')
-                try:
-                    c.drawImage(logo_path, 40, height-100, width=60, height=60, preserveAspectRatio=True, mask='auto')
-                except Exception:
-                    pass  # Se não encontrar o logo, ignora
-                c.setFont("Helvetica-Bold", 16)
-                c.drawString(110, height-60, "LePapon Lanches - Claudemir")
-                c.setFont("Helvetica", 10)
-                c.drawString(110, height-80, "Endereço: João Venâncio Girarde, nº 260")
-                c.drawString(110, height-95, "CNPJ: 33.794.253/0001-33   Fone: (54) 99125-3180")
-                # Data do relatório
-                c.setFont("Helvetica", 10)
-                c.drawString(400, height-60, f"Data: {datetime.datetime.now().strftime('%d/%m/%Y')}")
-                # Título do relatório
-                c.setFont("Helvetica-Bold", 14)
-                c.drawString(40, height-120, f"Relatório de Crediário: {cliente_nome}")
-                c.setFont("Helvetica", 10)
-                y = height-150
-                # Definição das larguras das colunas
-                col_widths = [70, 50, 200, 70, 70]  # data, qtd, nome_Prod, Valor_Prod, sub_total_calc
-                x_positions = [40]
-                for w in col_widths[:-1]:
-                    x_positions.append(x_positions[-1] + w)
-                # Cabeçalho
-                for i, campo in enumerate(campos_exibir):
-                    c.drawString(x_positions[i], y, colunas_legenda[campo])
-                y -= 20
-                # Dados
-                for _, row in crediarios_periodo.iterrows():
-                    for i, campo in enumerate(campos_exibir):
-                        c.drawString(x_positions[i], y, str(row.get(campo, "")))
-                    y -= 18
-                    if y < 60:
-                        c.showPage()
-                        y = height-40
-                # Cálculo de totais com abatimento de saldo anterior
-                if y < 120:
-                    c.showPage()
-                    y = height-40
                 total_bruto = float(crediarios_periodo['sub_total_calc'].sum())
                 saldo_anterior = 0.0
                 try:
@@ -339,24 +243,11 @@ def crediario_view(page: ft.Page):
                         saldo_anterior = float(str(get_saldo_recebido_por_cliente(cliente_id)).replace(',', '.')) or 0.0
                 except Exception:
                     saldo_anterior = 0.0
-                total_liquido = total_bruto - saldo_anterior
-                credito_restante = 0.0
-                if total_liquido < 0:
-                    credito_restante = abs(total_liquido)
-                    total_liquido = 0.0
-                c.setFont("Helvetica-Bold", 12)
-                c.drawString(40, y-10, f"Total bruto: R$ {total_bruto:.2f}")
-                y -= 18
-                c.setFont("Helvetica", 11)
-                c.drawString(40, y-10, f"Saldo anterior: R$ {saldo_anterior:.2f}")
-                y -= 18
-                c.setFont("Helvetica-Bold", 12)
-                c.drawString(40, y-10, f"Total a pagar: R$ {total_liquido:.2f}")
-                y -= 18
-                if credito_restante > 0:
-                    c.setFont("Helvetica", 11)
-                    c.drawString(40, y-10, f"Crédito restante após abatimento: R$ {credito_restante:.2f}")
-                c.save()
+                desenhar_extrato(
+                    pdf_path, cliente_nome,
+                    transformacoes.linhas_texto(crediarios_periodo, CAMPOS_PDF),
+                    total_bruto, saldo_anterior
+                )
                 # Upload PDF para o droplet usando EnviarContaCliente
                 try:
                     uploader = EnviarContaCliente(token=GRAPH_API_TOKEN, phone_number_id="833713429825528")
@@ -391,124 +282,193 @@ def crediario_view(page: ft.Page):
 
 
 
+    def mostrar_progresso_envio(job):
+        # Chamado pela thread do job: atualiza a mensagem da tela
+        if job.status == CONCLUIDO:
+            msg.value = f"Conta enviada para o cliente via WhatsApp! Arquivo: {job.contexto.get('arquivo')}"
+            msg.color = "green"
+        elif job.status == FALHOU:
+            msg.value = job.descricao
+            msg.color = "red"
+        else:
+            msg.value = job.descricao
+            msg.color = "blue"
+        msg.visible = True
+        page.update()
+
     def enviar_conta_cliente(e):
         print("Enviando conta para o cliente...")
-        try:
-            cliente_id = dropdown_clientes.value
-            if not cliente_id:
-                msg.value = "Selecione um cliente para enviar a conta."
-                msg.color = "red"
-                msg.visible = True
-                page.update()
-                return
-            
-            # Nome do cliente e nome do arquivo
-            cliente_nome = next((c.get('nome', '') + ' ' + c.get('sobrenome', '') for c in clientes if str(c.get('id', '')) == str(cliente_id)), f'cliente_{cliente_id}')
-            cliente_nome_pasta = re.sub(r'[^a-zA-Z0-9_\-]', '_', cliente_nome)
-            
+        cliente_id = dropdown_clientes.value
+        if not cliente_id:
+            msg.value = "Selecione um cliente para enviar a conta."
+            msg.color = "red"
+            msg.visible = True
+            page.update()
+            return
+        numero_cliente = indice_clientes.telefone(cliente_id)
+        if not numero_cliente:
+            msg.value = "Telefone do cliente não encontrado."
+            msg.color = "red"
+            msg.visible = True
+            page.update()
+            return
+
+        # Nome do cliente e nome do arquivo
+        cliente_nome = indice_clientes.nome_completo(cliente_id, f'cliente_{cliente_id}')
+        cliente_nome_pasta = re.sub(r'[^a-zA-Z0-9_\-]', '_', cliente_nome)
+        uploader = EnviarContaCliente(token=GRAPH_API_TOKEN, phone_number_id="833713429825528")
+        # Parâmetros do droplet
+        host = "64.23.179.108"
+        usuario = "claus"
+        caminho_chave = "/home/claus/.ssh/id_rsa"
+
+        def localizar_pdf(ctx):
             # Procura pelo PDF mais recente na pasta do cliente
             pasta_cliente = os.path.join(os.path.dirname(__file__), '../Crediario', cliente_nome_pasta)
-            
             if not os.path.exists(pasta_cliente):
-                msg.value = f"Pasta do cliente não encontrada: {pasta_cliente}"
-                msg.color = "red"
-                msg.visible = True
-                page.update()
-                return
-            
-            # Lista todos os PDFs na pasta e pega o mais recente
+                raise ErroDefinitivo(f"Pasta do cliente não encontrada: {pasta_cliente}")
             arquivos_pdf = [f for f in os.listdir(pasta_cliente) if f.lower().endswith('.pdf')]
             if not arquivos_pdf:
-                msg.value = "Nenhum PDF encontrado na pasta do cliente. Gere um PDF primeiro."
-                msg.color = "red"
-                msg.visible = True
-                page.update()
-                return
-            
-            # Ordena por data de modificação e pega o mais recente
-            arquivos_pdf_com_data = [(f, os.path.getmtime(os.path.join(pasta_cliente, f))) for f in arquivos_pdf]
-            arquivos_pdf_com_data.sort(key=lambda x: x[1], reverse=True)
-            arquivo_mais_recente = arquivos_pdf_com_data[0][0]
-            caminho_pdf_completo = os.path.join(pasta_cliente, arquivo_mais_recente)
-            
+                raise ErroDefinitivo("Nenhum PDF encontrado na pasta do cliente. Gere um PDF primeiro.")
+            ctx['arquivo'] = max(arquivos_pdf, key=lambda f: os.path.getmtime(os.path.join(pasta_cliente, f)))
+            ctx['pdf_path'] = os.path.join(pasta_cliente, ctx['arquivo'])
             data_pdf = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-            
-            # Primeiro faz upload do arquivo para o servidor
+            ctx['nome_servidor'] = f"{cliente_nome_pasta}_{data_pdf}.pdf"
+
+        def upload(ctx):
+            caminho_remoto = f"/var/www/lepapon.com.br/Android-LePapon-Pedidos/files/{ctx['nome_servidor']}"
+            uploader.upload_pdf_droplet(host, usuario, ctx['pdf_path'], caminho_remoto, caminho_chave)
+            # URL pública do PDF
+            ctx['pdf_url'] = f"https://lepapon.com.br/api/pdf/{ctx['nome_servidor']}"
+            print(f"PDF enviado para o servidor: {ctx['pdf_url']}")
+
+        def enviar_whatsapp(ctx):
+            resposta = uploader.enviar_pdf(numero_cliente, ctx['pdf_url'], nome_arquivo=ctx['nome_servidor'])
+            print(f"Resposta do envio: {resposta}")
+            if not resposta.get('messages'):
+                raise Exception(f"Falha ao enviar pelo WhatsApp: {resposta}")
+            ctx['resposta'] = resposta
+
+        def registrar_mensagem(ctx):
+            # Salvar a mensagem enviada no servidor (não falha o envio se der erro)
             try:
-                uploader = EnviarContaCliente(token=GRAPH_API_TOKEN, phone_number_id="833713429825528")
-                # Parâmetros do droplet
-                host = "64.23.179.108"
-                usuario = "claus"
-                caminho_chave = "/home/claus/.ssh/id_rsa"
-                nome_arquivo_servidor = f"{cliente_nome_pasta}_{data_pdf}.pdf"
-                caminho_remoto = f"/var/www/lepapon.com.br/Android-LePapon-Pedidos/files/{nome_arquivo_servidor}"
-                
-                # Upload do arquivo mais recente
-                uploader.upload_pdf_droplet(host, usuario, caminho_pdf_completo, caminho_remoto, caminho_chave)
-                
-                # URL pública do PDF
-                pdf_url = f"https://lepapon.com.br/api/pdf/{nome_arquivo_servidor}"
-                print(f"PDF enviado para o servidor: {pdf_url}")
-                
-                # Número do cliente
-                numero_cliente = next((c.get('fone', '') for c in clientes if str(c.get('id', '')) == str(cliente_id)), None)
-                if not numero_cliente:
-                    msg.value = "Telefone do cliente não encontrado."
-                    msg.color = "red"
-                    msg.visible = True
-                    page.update()
-                    return
-                
-                # Envia o PDF via WhatsApp
-                resposta = uploader.enviar_pdf(numero_cliente, pdf_url, nome_arquivo=nome_arquivo_servidor)
-                print(f"Resposta do envio: {resposta}")
-                
-                if resposta.get('messages'):
-                    msg.value = f"Conta enviada para o cliente via WhatsApp! Arquivo: {arquivo_mais_recente}"
-                    msg.color = "green"
-                    
-                    # Salvar a mensagem enviada no servidor
-                    try:
-                        message_data = resposta.get('messages', [])[0]
-                        wamid = message_data.get('id', '')
-                        
-                        if wamid:
-                            saver = WhatsAppMessageSaver(
-                                api_url=DIRECT_MESSAGE_API_URL,
-                                api_key=DIRECT_MESSAGE_API_KEY
-                            )
-                            
-                            save_response = saver.save_pdf_message(
-                                session_id=numero_cliente,
-                                whatsapp_message_id=wamid,
-                                pdf_title=f"Conta Cliente - {cliente_nome}",
-                                media_url=pdf_url,
-                                local_filename=nome_arquivo_servidor
-                            )
-                            print(f"Mensagem salva no servidor: {save_response}")
-                    except Exception as save_err:
-                        print(f"Erro ao salvar mensagem no servidor: {save_err}")
-                        # Não falha o envio se houver erro ao salvar
-                else:
-                    msg.value = f"Falha ao enviar pelo WhatsApp: {resposta}"
-                    msg.color = "orange"
-                    
-            except Exception as upload_err:
-                msg.value = f"Erro ao fazer upload ou enviar: {upload_err}"
-                msg.color = "red"
-            
+                wamid = ctx['resposta'].get('messages', [])[0].get('id', '')
+                if wamid:
+                    saver = WhatsAppMessageSaver(
+                        api_url=DIRECT_MESSAGE_API_URL,
+                        api_key=DIRECT_MESSAGE_API_KEY
+                    )
+                    save_response = saver.save_pdf_message(
+                        session_id=numero_cliente,
+                        whatsapp_message_id=wamid,
+                        pdf_title=f"Conta Cliente - {cliente_nome}",
+                        media_url=ctx['pdf_url'],
+                        local_filename=ctx['nome_servidor']
+                    )
+                    print(f"Mensagem salva no servidor: {save_response}")
+            except Exception as save_err:
+                print(f"Erro ao salvar mensagem no servidor: {save_err}")
+
+        # PDF -> upload -> WhatsApp fora da thread da tela; cada etapa com suas tentativas
+        get_job_runner().submit(
+            f"Conta de {cliente_nome}",
+            [
+                Etapa("pdf", localizar_pdf, descricao="localizando PDF"),
+                Etapa("upload", upload, tentativas=3, descricao="enviando ao servidor"),
+                # Uma tentativa só: repetir após timeout pode entregar a mensagem duas vezes
+                Etapa("whatsapp", enviar_whatsapp, descricao="enviando pelo WhatsApp"),
+                Etapa("registro", registrar_mensagem, descricao="registrando mensagem"),
+            ],
+            on_progresso=mostrar_progresso_envio,
+            chave=f"conta_cliente:{cliente_id}",
+        )
+
+
+    botao_enviar_conta = ft.ElevatedButton(
+        "📤 Enviar conta para o cliente", 
+        on_click=enviar_conta_cliente
+    )
+
+    def enviar_extratos_mes(e):
+        """Extrato de todos os clientes com crediário em aberto no período (job em segundo plano)."""
+        di = data_inicial.value
+        df = data_final.value
+        if not di or not df:
+            msg.value = "Informe o período dos extratos."
+            msg.color = "red"
             msg.visible = True
             page.update()
-        except Exception as e:
-            msg.value = f"Erro ao enviar conta: {e}"
-            msg.color = "red"
+            return
+
+        def carregar():
+            from models.saldo_recebido_api import SaldoRecebidoAPI
+            crediarios = crediario_replica.query(date_from=str(di), date_to=str(df))
+            produtos_todos = produtos_todos_api.get_all()
+            if not isinstance(produtos_todos, list):
+                produtos_todos = [produtos_todos] if produtos_todos else []
+            saldos = SaldoRecebidoAPI(BASE_URL).get_all()
+            if not isinstance(saldos, list):
+                saldos = [saldos] if saldos else []
+            return crediarios, produtos_todos, indice_clientes, saldos
+
+        def registrar(extrato, resposta):
+            wamid = resposta.get('messages', [])[0].get('id', '')
+            if wamid:
+                saver = WhatsAppMessageSaver(
+                    api_url=DIRECT_MESSAGE_API_URL,
+                    api_key=DIRECT_MESSAGE_API_KEY
+                )
+                saver.save_pdf_message(
+                    session_id=extrato['telefone'],
+                    whatsapp_message_id=wamid,
+                    pdf_title=f"Conta Cliente - {extrato['nome']}",
+                    media_url=extrato['url'],
+                    local_filename=extrato['arquivo']
+                )
+
+        def progresso_item(texto):
+            msg.value = f"Extratos do mês: {texto}"
+            msg.color = "blue"
+            msg.visible = True
+            page.update()
+
+        def progresso_job(job):
+            if job.status == CONCLUIDO:
+                msg.value = f"{lote.resumo(job.contexto)}. Manifesto: {job.contexto.get('manifesto')}"
+                msg.color = "green"
+            elif job.status == FALHOU:
+                msg.value = f"{job.descricao} | {lote.resumo(job.contexto)}"
+                msg.color = "red"
+            else:
+                msg.value = job.descricao
+                msg.color = "blue"
             msg.visible = True
             page.update()
 
+        lote = LoteExtratos(
+            carregar,
+            EnviarContaCliente(token=GRAPH_API_TOKEN, phone_number_id="833713429825528"),
+            {
+                'host': "64.23.179.108",
+                'usuario': "claus",
+                'caminho_chave': "/home/claus/.ssh/id_rsa",
+                'pasta_remota': "/var/www/lepapon.com.br/Android-LePapon-Pedidos/files",
+                'url_base': "https://lepapon.com.br/api/pdf",
+            },
+            registrar=registrar,
+            on_progresso=progresso_item,
+            periodo=f"{di}_{df}",
+        )
+        get_job_runner().submit(
+            "Extratos do mês",
+            lote.etapas(),
+            on_progresso=progresso_job,
+            chave="extratos_crediario",
+        )
 
-    botao_enviar_conta = ft.ElevatedButton(
-        "📤 Enviar conta para o cliente", 
-        on_click=enviar_conta_cliente
+    botao_extratos_mes = ft.ElevatedButton(
+        "📨 Enviar extratos do mês",
+        on_click=enviar_extratos_mes
     )
     # Adicionar campo para novo recebimento
     novo_recebimento_valor = ft.TextField(label="Valor Recebido", width=120)
@@ -528,12 +488,8 @@ def crediario_view(page: ft.Page):
             if not isinstance(produtos_todos, list):
                 produtos_todos = [produtos_todos] if produtos_todos else []
             crediario_df = pd.DataFrame(crediarios)
-            produtos_df = pd.DataFrame(produtos_todos)
-            if not crediario_df.empty and not produtos_df.empty:
-                crediario_df = crediario_df.merge(
-                    produtos_df[['id_Prod', 'Valor_Prod']],
-                    left_on='id_Prod', right_on='id_Prod', how='left'
-                )
+            if not crediario_df.empty:
+                crediario_df = transformacoes.juntar_produtos(crediario_df, produtos_todos, campos=('Valor_Prod',))
                 # Atualiza os itens com o novo Valor_Prod
                 crediarios = crediario_df.to_dict(orient='records')
             # Filtra do cliente e não pagos
@@ -689,7 +645,8 @@ def crediario_view(page: ft.Page):
         ]),
         ft.Row([
             botao_pdf,
-            botao_enviar_conta
+            botao_enviar_conta,
+            botao_extratos_mes
         ]),
         ft.Row([
             total_crediario_label,
@@ -703,7 +660,7 @@ def crediario_view(page: ft.Page):
             botao_limpar_pdfs
         ]),
         ft.Column(controls=[
-            tabela,
+            tabela.controle,
             ft.Divider(),
             msg
         ]
@@ -2,8 +2,10 @@ import flet as ft
 from models.pedidostemp_api import PedidosTempAPI
 from models.produtos_todos_api import ProdutosTodosAPI
 from models.numpedidos_api import NumPedidosAPI
+from models.async_base_api import AsyncBaseAPI, fetch_many
 from config import BASE_URL
 from views.tema_0_0_0 import texto_titulo, aplicar_tema
+from utils.lista_chaveada import ListaChaveada
 import pandas as pd
 from dataclasses import dataclass
 from typing import List, Dict, Optional
@@ -43,21 +45,30 @@ class PedidosDataManager:
     def _safe_api_call(self, api_func, default_value=None):
         """Executa chamada de API com tratamento seguro de erros"""
         try:
-            result = api_func()
-            return result if isinstance(result, list) else ([result] if result else (default_value or []))
+            return self._as_list(api_func(), default_value)
         except Exception as e:
             print(f"Erro na API: {e}")
             return default_value or []
+
+    @staticmethod
+    def _as_list(result, default_value=None):
+        """Normaliza a resposta da API para lista"""
+        return result if isinstance(result, list) else ([result] if result else (default_value or []))
     
     def get_merged_data(self, force_refresh=False):
         """Obtém dados mesclados com cache opcional"""
         if not force_refresh and 'merged_data' in self._cache:
             return self._cache['merged_data']
             
-        # Carrega dados das APIs
-        pedidos = self._safe_api_call(self.pedidos_api.get_all)
-        produtos = self._safe_api_call(self.produtos_api.get_all)
-        numpedidos = self._safe_api_call(self.numpedidos_api.get_all)
+        # Carrega dados das APIs em paralelo (tempo ~ da chamada mais lenta)
+        resultados = fetch_many({
+            'pedidos': AsyncBaseAPI.from_api(self.pedidos_api).get_all(),
+            'produtos': AsyncBaseAPI.from_api(self.produtos_api).get_all(),
+            'numpedidos': AsyncBaseAPI.from_api(self.numpedidos_api).get_all(),
+        })
+        pedidos = self._as_list(resultados['pedidos'])
+        produtos = self._as_list(resultados['produtos'])
+        numpedidos = self._as_list(resultados['numpedidos'])
         
         # Cria mapeamento de números de pedidos
         numpedido_dict = {
@@ -247,25 +258,42 @@ def pedidos_accordion_view(page: ft.Page):
             ),
         ], height=50, alignment=ft.MainAxisAlignment.SPACE_BETWEEN, spacing=5)
 
+    def atualizar_linha_item(linha: ft.Row, item: Dict):
+        """Item alterado no servidor: troca o conteúdo da linha já exibida"""
+        linha.controls = criar_linha_item(item).controls
+
+    def itens_chaveados(lista: List[Dict]):
+        return [(item.get("id") if item.get("id") is not None else ("pos", i), item) for i, item in enumerate(lista)]
+
+    def criar_painel(num_id, dados) -> ft.ExpansionPanel:
+        header, lista = dados
+        # Cada painel guarda (em .data) a reconciliação das suas linhas
+        linhas = ListaChaveada(lambda chave, item: criar_linha_item(item), atualizar_linha_item)
+        return ft.ExpansionPanel(
+            header=ft.Text(header),
+            content=ft.Column(linhas.reconciliar(itens_chaveados(lista))),
+            data=linhas,
+        )
+
+    def atualizar_painel(panel: ft.ExpansionPanel, dados):
+        header, lista = dados
+        panel.header.value = header
+        panel.content.controls = panel.data.reconciliar(itens_chaveados(lista))
+
+    # Painéis reaproveitados entre recargas/filtros: só o que mudou vai para a tela
+    paineis = ListaChaveada(criar_painel, atualizar_painel)
+
+    def mostrar_pedidos(grupos) -> None:
+        """Exibe os grupos ``{(numero_real, nome_cliente, num_id): itens}`` no accordion"""
+        paineis.aplicar(accordion, (
+            (num_id, (f"Pedido {numero_real} | ID: {num_id} | Cliente: {nome_cliente}", lista))
+            for (numero_real, nome_cliente, num_id), lista in grupos.items()
+        ), page)
+
     def atualizar_tabela(force_refresh: bool = True):
         """Atualiza a tabela com dados otimizados e cache"""
         try:
-            pedidos_por_num = data_manager.get_merged_data(force_refresh)
-            
-            panels = []
-            for (numero_real, nome_cliente, num_id), lista in pedidos_por_num.items():
-                # Cria linhas de itens de forma otimizada
-                detalhes = [criar_linha_item(item) for item in lista]
-                
-                panels.append(
-                    ft.ExpansionPanel(
-                        header=ft.Text(f"Pedido {numero_real} | ID: {num_id} | Cliente: {nome_cliente}"),
-                        content=ft.Column(detalhes),                    
-                    )
-                )
-            
-            accordion.controls = panels
-            page.update()
+            mostrar_pedidos(data_manager.get_merged_data(force_refresh))
             
         except Exception as ex:
             show_message(f"Erro ao carregar dados: {ex}", "red")
@@ -359,72 +387,57 @@ def pedidos_accordion_view(page: ft.Page):
             
             show_message(f"Enviando {len(valores)} itens para o banco...", "blue")
             
-            # Processa cada item coletado
+            # Índices dos dados já carregados (evita varrer tudo a cada item)
+            pedidos_por_num = data_manager.get_merged_data(force_refresh=False)
+            por_produto = {}
+            for lista in pedidos_por_num.values():
+                for pedido_original in lista:
+                    chave = (str(pedido_original.get("id_Prod", "")), str(pedido_original.get("nome_Prod", "")))
+                    por_produto.setdefault(chave, pedido_original)
+            
+            # Monta todas as alterações e envia de uma vez
+            updates = {}
             for item in valores:
                 try:
-                    # Extrai o ID do pedido do produto (precisa estar nos dados originais)
-                    # Vamos buscar pelos dados originais para pegar o ID do registro
-                    pedidos_por_num = data_manager.get_merged_data(force_refresh=False)
-                    
-                    pedido_id = None
-                    # Procura o ID do pedido pelos dados originais
-                    for (numero_real, nome_cliente, num_id), lista in pedidos_por_num.items():
-                        for pedido_original in lista:
-                            # Compara pelos campos únicos para encontrar o registro correto
-                            if (str(pedido_original.get("id_Prod", "")) == str(item['id_produto']) and
-                                str(pedido_original.get("nome_Prod", "")) == str(item['nome_produto'])):
-                                pedido_id = pedido_original.get("id")
-                                break
-                        if pedido_id:
-                            break
-                    
-                    if pedido_id is None:
+                    pedido_original = por_produto.get((str(item['id_produto']), str(item['nome_produto'])))
+                    if pedido_original is None or pedido_original.get("id") is None:
                         erros += 1
                         erros_detalhes.append(f"ID não encontrado para produto {item['id_produto']}")
                         continue
                     
-                    # Converte para int
-                    pedido_id_int = int(pedido_id)
+                    # Copia dados originais e aplica as alterações
+                    novo_data = pedido_original.copy()
+                    
+                    # Remove campos conflitantes
+                    campos_remover = ["nome_Prod", "id"]
+                    for campo in campos_remover:
+                        novo_data.pop(campo, None)
                     
-                    # Prepara os dados para update
-                    dados_update = {
+                    novo_data.update({
                         'id_cliente': item['id_cliente'] or "",
                         'qtd': item['quantidade'] or "0",
                         'pago': 1 if item['pago'] else 0
-                    }
+                    })
                     
-                    # Busca os dados originais para manter outros campos
-                    for (numero_real, nome_cliente, num_id), lista in pedidos_por_num.items():
-                        for pedido_original in lista:
-                            if pedido_original.get("id") == pedido_id:
-                                # Copia dados originais e aplica as alterações
-                                novo_data = pedido_original.copy()
-                                
-                                # Remove campos conflitantes
-                                campos_remover = ["nome_Prod", "id"]
-                                for campo in campos_remover:
-                                    novo_data.pop(campo, None)
-                                
-                                # Aplica as alterações
-                                novo_data.update(dados_update)
-                                
-                                # Formata data se necessário
-                                if "data" in novo_data and novo_data["data"]:
-                                    try:
-                                        novo_data["data"] = pd.to_datetime(novo_data["data"]).strftime("%Y-%m-%d")
-                                    except Exception:
-                                        pass
-                                
-                                # Envia para a API
-                                resultado = data_manager.pedidos_api.update(pedido_id_int, novo_data)
-                                sucessos += 1
-                                break
+                    # Data ISO ("2024-01-05T03:00:00.000Z") -> "2024-01-05"
+                    if novo_data.get("data"):
+                        novo_data["data"] = str(novo_data["data"])[:10]
+                    
+                    updates[int(pedido_original["id"])] = novo_data
                     
                 except Exception as ex:
                     erros += 1
                     erros_detalhes.append(f"Erro no item {item['id_produto']}: {str(ex)}")
                     print(f"Erro ao processar item {item['id_produto']}: {ex}")
             
+            resultados = data_manager.pedidos_api.update_many(updates)
+            for pedido_id, resultado in resultados.items():
+                if resultado is None:
+                    erros += 1
+                    erros_detalhes.append(f"Falha ao atualizar registro {pedido_id}")
+                else:
+                    sucessos += 1
+            
             # Limpa cache após mudanças
             data_manager.invalidate_cache()
             
@@ -475,32 +488,19 @@ def pedidos_accordion_view(page: ft.Page):
             
         try:
             pedidos_por_num = data_manager.get_merged_data(force_refresh=False)
-            panels = []
+            numero = numero_digitado.strip()
             
             # Procura pelo número digitado
-            encontrou = False
-            for (numero_real, nome_cliente, num_id), lista in pedidos_por_num.items():
-                # Verifica se o número digitado corresponde
-                if str(numero_real) == numero_digitado.strip() or str(num_id) == numero_digitado.strip():
-                    encontrou = True
-                    # Cria linhas de itens de forma otimizada
-                    detalhes = [criar_linha_item(item) for item in lista]
-                    
-                    panels.append(
-                        ft.ExpansionPanel(
-                            header=ft.Text(f"Pedido {numero_real} | ID: {num_id} | Cliente: {nome_cliente}"),
-                            content=ft.Column(detalhes)
-                        )
-                    )
+            encontrados = {
+                chave: lista for chave, lista in pedidos_por_num.items()
+                if str(chave[0]) == numero or str(chave[2]) == numero
+            }
+            mostrar_pedidos(encontrados)
             
-            if encontrou:
-                accordion.controls = panels
+            if encontrados:
                 show_message(f"Pedido {numero_digitado} encontrado!", "green")
             else:
-                accordion.controls = []
                 show_message(f"Pedido {numero_digitado} não encontrado!", "red")
-                
-            page.update()
             
         except Exception as ex:
             show_message(f"Erro ao filtrar pedido: {ex}", "red")
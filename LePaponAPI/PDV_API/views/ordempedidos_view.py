@@ -153,7 +153,7 @@ def ordempedidos_view(page: ft.Page):
         pedido = None
         try:
             # Cria índice para busca O(1) ao invés de O(n)
-            pedidos_dict = {str(row.get('id', '')): row for _, row in df_pedidos.iterrows()} if not df_pedidos.empty else {}
+            pedidos_dict = {str(row.get('id', '')): row for row in df_pedidos.to_dict(orient='records')} if not df_pedidos.empty else {}
             pedido_data = pedidos_dict.get(str(num_pedido_id))
             
             if pedido_data is not None:
@@ -230,14 +230,15 @@ def ordempedidos_view(page: ft.Page):
                 
             # Constrói linhas limitando quantidade para performance
             max_rows = 100  # Limita para evitar travamento
-            for idx, (_, row) in enumerate(df_filtrado.iterrows()):
+            # Só converte as linhas que serão exibidas (+1 para saber se há mais)
+            for idx, row in enumerate(df_filtrado.head(max_rows + 1).to_dict(orient='records')):
                 if idx >= max_rows:
                     # Avisa se há mais resultados
                     if idx == max_rows:
                         show_message(f"⚠️ Mostrando primeiros {max_rows} resultados. Use filtros para refinar.", "orange")
                     break
                     
-                row_data = row.to_dict()
+                row_data = row
                 row_cells = [ft.DataCell(ft.Text(str(row.get(c, "")))) for c in colunas]
                 rows_local.append(ft.DataRow(
                     cells=row_cells, 
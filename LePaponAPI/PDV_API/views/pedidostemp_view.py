@@ -4,18 +4,20 @@ import datetime
 import re
 import requests
 from pathlib import Path
-from contextlib import contextmanager
 from models.pedidostemp_api import PedidosTempAPI
 from models.numpedidos_api import NumPedidosAPI
 from models.produtos_todos_api import ProdutosTodosAPI
 from models.enviar_relatorio_pedido import EnviarRelatorioPedido
+from models.sftp_pool import get_sftp
+from services.job_runner import CONCLUIDO, FALHOU, Etapa, ErroDefinitivo, get_job_runner
+from models.async_base_api import AsyncBaseAPI, fetch_many
 from views.tema_0_0_0 import texto_titulo, aplicar_tema, texto_padrao, botao_acao
 import pandas as pd
+from utils import transformacoes
 from config import BASE_URL
 from dotenv import load_dotenv
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
-import paramiko
 
 # Carrega variáveis de ambiente
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '../../../../.env'))
@@ -66,20 +68,6 @@ def pedidostemp_view(page: ft.Page):
         # Limita tamanho
         return sanitized[:50] if sanitized else "pedido_invalido"
 
-    def safe_float_convert(value, default=0.0):
-        """Converte valor para float de forma segura"""
-        if value is None:
-            return default
-        try:
-            if isinstance(value, (int, float)):
-                return float(value)
-            # Trata string com vírgula decimal brasileira
-            str_val = str(value).strip().replace(',', '.')
-            return float(str_val) if str_val else default
-        except (ValueError, TypeError) as e:
-            print(f"[WARN] Erro na conversão float: {value} -> {e}")
-            return default
-
     def gerar_pdf_pedido(e=None, apenas_gerar: bool = True):
         """Gera o PDF local do pedido selecionado. Se apenas_gerar=False, também retorna metadados."""
         num_pedido_sel = selected_num_pedido.current.value
@@ -98,46 +86,37 @@ def pedidostemp_view(page: ft.Page):
         num_pedido_sanitized = sanitize_filename(str(num_pedido_sel))
         
         try:
-            data = pedidostemp_api.get_all()
+            # Pedidos, produtos e dados do cliente são buscados em paralelo
+            resultados = fetch_many({
+                'pedidos': AsyncBaseAPI.from_api(pedidostemp_api).get_all(),
+                'produtos': AsyncBaseAPI.from_api(produtos_todos_api).get_all(),
+                'numpedido': AsyncBaseAPI.from_api(numpedidos_api).get_by_id(num_pedido_sel),
+            })
+            data = resultados['pedidos']
             if not isinstance(data, list):
                 data = [data] if data else []
             pedidos_filtrados = [d for d in data if str(d.get('numPedido', '')) == str(num_pedido_sel)]
             
-            produtos = produtos_todos_api.get_all()
+            produtos = resultados['produtos']
             if not isinstance(produtos, list):
                 produtos = [produtos] if produtos else []
                 
-            # Buscar dados do cliente em numpedidos
+            # Dados do cliente vindos de numpedidos
             cliente_nome = cliente_sobrenome = cliente_telefone = cliente_endereco = ""
-            try:
-                numpedido = numpedidos_api.get_by_id(num_pedido_sel)
-                if isinstance(numpedido, dict):
-                    cliente_nome = numpedido.get('nome', '')
-                    cliente_sobrenome = numpedido.get('sobrenome', '')
-                    cliente_telefone = numpedido.get('fone', '')
-                    cliente_endereco = numpedido.get('endereco', '')
-            except (requests.RequestException, KeyError, AttributeError) as e:
-                print(f"[WARN] Erro ao buscar dados do cliente: {e}")
+            numpedido = resultados['numpedido']
+            if isinstance(numpedido, dict):
+                cliente_nome = numpedido.get('nome', '')
+                cliente_sobrenome = numpedido.get('sobrenome', '')
+                cliente_telefone = numpedido.get('fone', '')
+                cliente_endereco = numpedido.get('endereco', '')
+            else:
+                print(f"[WARN] Dados do cliente não encontrados para o pedido {num_pedido_sel}")
                 
             df_pedidos = pd.DataFrame(pedidos_filtrados)
-            df_produtos = pd.DataFrame(produtos)
             
-            if not df_pedidos.empty and not df_produtos.empty:
-                df_merged = pd.merge(
-                    df_pedidos,
-                    df_produtos[['id_Prod', 'nome_Prod', 'Valor_Prod']],
-                    left_on='id_Prod', right_on='id_Prod', how='left', suffixes=('', '_Prod')
-                )
-            else:
-                df_merged = df_pedidos
+            df_merged = transformacoes.juntar_produtos(df_pedidos, produtos)
                 
-            if 'qtd' in df_merged.columns and 'Valor_Prod' in df_merged.columns:
-                df_merged['sub_total'] = df_merged.apply(
-                    lambda row: safe_float_convert(row['qtd']) * safe_float_convert(row['Valor_Prod']), 
-                    axis=1
-                )
-            else:
-                df_merged['sub_total'] = 0.0
+            df_merged['sub_total'] = transformacoes.sub_total(df_merged)
                 
             data_pdf = datetime.datetime.now().strftime('%Y-%m-%d')
             pasta_destino = os.path.join(os.path.dirname(__file__), f'../PedidosPDF/{data_pdf}')
@@ -184,16 +163,14 @@ def pedidostemp_view(page: ft.Page):
             for i, campo in enumerate(colunas_legenda):
                 c.drawString(x_positions[i], y, campo)
             y -= 20
-            total = 0.0
-            for _, row in df_merged.iterrows():
-                c.drawString(x_positions[0], y, str(row.get('qtd', '')))
-                c.drawString(x_positions[1], y, str(row.get('nome_Prod', '')))
-                c.drawString(x_positions[2], y, str(row.get('Valor_Prod', '')))
-                c.drawString(x_positions[3], y, f"{row.get('sub_total', 0):.2f}")
-                try:
-                    total += safe_float_convert(row.get('sub_total', 0))
-                except Exception as e:
-                    print(f"[WARN] Erro ao somar total: {e}")
+            total = transformacoes.total(df_merged, 'sub_total')
+            linhas = transformacoes.linhas_texto(
+                df_merged.assign(sub_total=df_merged['sub_total'].map('{:.2f}'.format)),
+                ['qtd', 'nome_Prod', 'Valor_Prod', 'sub_total'],
+            )
+            for valores in linhas:
+                for i, valor in enumerate(valores):
+                    c.drawString(x_positions[i], y, valor)
                 y -= 18
                 if y < 60:
                     c.showPage()
@@ -222,52 +199,6 @@ def pedidostemp_view(page: ft.Page):
             page.update()
             return None
 
-    @contextmanager
-    def ssh_connection(host, usuario, caminho_chave):
-        """Context manager para conexões SSH/SFTP seguras"""
-        transport = None
-        sftp = None
-        try:
-            key = paramiko.RSAKey.from_private_key_file(caminho_chave)
-            transport = paramiko.Transport((host, 22))
-            transport.connect(username=usuario, pkey=key)
-            sftp = paramiko.SFTPClient.from_transport(transport)
-            yield sftp
-        except (paramiko.SSHException, FileNotFoundError, OSError) as e:
-            print(f"[ERROR] Erro na conexão SSH: {e}")
-            raise
-        finally:
-            if sftp:
-                try:
-                    sftp.close()
-                except Exception as e:
-                    print(f"[WARN] Erro ao fechar SFTP: {e}")
-            if transport:
-                try:
-                    transport.close()
-                except Exception as e:
-                    print(f"[WARN] Erro ao fechar Transport: {e}")
-
-    def criar_diretorios_remotos(sftp, pasta_remota):
-        """Cria diretórios remotos de forma segura"""
-        try:
-            partes = pasta_remota.strip('/').split('/')
-            caminho_acum = ''
-            for p in partes:
-                if not p:  # Evita partes vazias
-                    continue
-                caminho_acum += '/' + p
-                try:
-                    sftp.stat(caminho_acum)
-                except IOError:
-                    try:
-                        sftp.mkdir(caminho_acum)
-                        print(f"[DEBUG] Diretório remoto criado: {caminho_acum}")
-                    except (OSError, paramiko.SFTPError) as de:
-                        print(f"[WARN] Falha ao criar dir {caminho_acum}: {de}")
-        except Exception as e:
-            print(f"[WARN] Erro geral na criação de diretórios: {e}")
-
     # Botão 1: exportar (gera + upload)
     GRAPH_API_TOKEN = os.getenv('GRAPH_API_TOKEN', '') or ''
     PHONE_NUMBER_ID = os.getenv('WHATSAPP_PHONE_ID', '465787769946848') or '465787769946848'
@@ -276,70 +207,71 @@ def pedidostemp_view(page: ft.Page):
     if not GRAPH_API_TOKEN:
         print('[WARN] GRAPH_API_TOKEN não definido - funcionalidade WhatsApp limitada')
         
-    def exportar_pdf_servidor(e):
-        print('[DEBUG] exportar_pdf_servidor acionada')
-        pdf_path = gerar_pdf_pedido()
-        if not pdf_path:
-            print('[DEBUG] Abortado: geração de PDF falhou')
-            return
-        if not os.path.isfile(pdf_path):
-            msg_pdf.value = f'Arquivo PDF não encontrado: {pdf_path}'
-            msg_pdf.color = 'red'
+    def mostrar_progresso(mensagem_ok):
+        """Callback de progresso dos jobs: atualiza msg_pdf a partir da thread do job"""
+        def atualizar(job):
+            if job.status == CONCLUIDO:
+                msg_pdf.value = mensagem_ok(job.contexto)
+                msg_pdf.color = 'green'
+            elif job.status == FALHOU:
+                msg_pdf.value = job.descricao
+                msg_pdf.color = 'red'
+                print(f"[ERRO {job.nome}] {job.erro}")
+            else:
+                msg_pdf.value = job.descricao
+                msg_pdf.color = 'blue'
             msg_pdf.visible = True
             page.update()
-            print(f'[DEBUG] Arquivo inexistente após gerar: {pdf_path}')
-            return
+        return atualizar
+
+    def exportar_pdf_servidor(e):
+        print('[DEBUG] exportar_pdf_servidor acionada')
         # Upload não depende do token WhatsApp; apenas o envio posterior.
         if not GRAPH_API_TOKEN:
             print('[WARN] GRAPH_API_TOKEN ausente - upload prossegue, envio via WhatsApp depois falhará até definir token.')
-        try:
-            uploader = EnviarRelatorioPedido(token=str(GRAPH_API_TOKEN or ''), phone_number_id=str(PHONE_NUMBER_ID))
-            host = os.getenv('DROPLET_HOST', '64.23.179.108')
-            usuario = os.getenv('DROPLET_USER', 'claus')
-            caminho_chave = os.path.expanduser(os.getenv('DROPLET_KEY_PATH', '~/.ssh/id_rsa'))
-            nome_remoto = os.path.basename(pdf_path)
-            pasta_remota = "/var/www/lepapon.com.br/Android-LePapon-Pedidos/files/pedidos_relatorios"
-            caminho_remoto = f"{pasta_remota}/{nome_remoto}"
-            
+        uploader = EnviarRelatorioPedido(token=str(GRAPH_API_TOKEN or ''), phone_number_id=str(PHONE_NUMBER_ID))
+        host = os.getenv('DROPLET_HOST', '64.23.179.108')
+        usuario = os.getenv('DROPLET_USER', 'claus')
+        caminho_chave = os.path.expanduser(os.getenv('DROPLET_KEY_PATH', '~/.ssh/id_rsa'))
+        pasta_remota = "/var/www/lepapon.com.br/Android-LePapon-Pedidos/files/pedidos_relatorios"
+
+        def gerar(ctx):
+            pdf_path = gerar_pdf_pedido()
+            if not pdf_path:
+                raise ErroDefinitivo(msg_pdf.value or 'geração de PDF falhou')
+            if not os.path.isfile(pdf_path):
+                raise ErroDefinitivo(f'Arquivo PDF não encontrado: {pdf_path}')
+            ctx['pdf_path'] = pdf_path
+            ctx['nome_remoto'] = os.path.basename(pdf_path)
+
+        def upload(ctx):
+            caminho_remoto = f"{pasta_remota}/{ctx['nome_remoto']}"
             print(f"[DEBUG] Preparando upload: host={host}, usuario={usuario}, caminho_remoto={caminho_remoto}")
-            
-            # Cria diretório remoto usando context manager
+            conexao = get_sftp(host, usuario, caminho_chave)
             try:
-                with ssh_connection(host, usuario, caminho_chave) as sftp:
-                    criar_diretorios_remotos(sftp, pasta_remota)
+                conexao.criar_diretorios(pasta_remota)
             except Exception as de:
                 print(f"[WARN] Não foi possível garantir criação de diretórios remotos: {de}")
-
-            print(f"[DEBUG] Iniciando upload do PDF para o servidor: {caminho_remoto}")
-            uploader.upload_pdf_droplet(host, usuario, pdf_path, caminho_remoto, caminho_chave)
-            
-            # Validar tamanho remoto usando context manager
-            try:
-                with ssh_connection(host, usuario, caminho_chave) as sftp:
-                    if sftp:  # Verifica se conexão foi bem-sucedida
-                        statinfo = sftp.stat(caminho_remoto)
-                        tamanho_remoto = statinfo.st_size
-                        tamanho_local = os.path.getsize(pdf_path)
-                        print(f"[DEBUG] Upload verificado. Local={tamanho_local} bytes, Remoto={tamanho_remoto} bytes")
-                        
-                        if tamanho_local != tamanho_remoto:
-                            raise Exception(f"Tamanhos diferentes! Local: {tamanho_local}, Remoto: {tamanho_remoto}")
-            except Exception as ve:
-                print(f"[WARN] Não foi possível validar upload: {ve}")
-
-            url_publica = f"https://lepapon.com.br/api/relatorios/pedidos/{nome_remoto}"
+            uploader.upload_pdf_droplet(host, usuario, ctx['pdf_path'], caminho_remoto, caminho_chave)
+            # Valida tamanho remoto (na mesma conexão)
+            tamanho_remoto = conexao.tamanho(caminho_remoto)
+            tamanho_local = os.path.getsize(ctx['pdf_path'])
+            print(f"[DEBUG] Upload verificado. Local={tamanho_local} bytes, Remoto={tamanho_remoto} bytes")
+            if tamanho_local != tamanho_remoto:
+                raise Exception(f"Tamanhos diferentes! Local: {tamanho_local}, Remoto: {tamanho_remoto}")
+            url_publica = f"https://lepapon.com.br/api/relatorios/pedidos/{ctx['nome_remoto']}"
             estado_pdf['url_remota'] = url_publica or ""
-            msg_pdf.value = f"Exportado para servidor: {url_publica}"
-            msg_pdf.color = 'green'
-            msg_pdf.visible = True
-            page.update()
-            print('[DEBUG] Exportação concluída com sucesso')
-        except Exception as ex:
-            msg_pdf.value = f"Erro ao exportar: {ex}"
-            msg_pdf.color = 'red'
-            msg_pdf.visible = True
-            page.update()
-            print(f"[ERRO exportar] {ex}")
+            ctx['url_publica'] = url_publica
+
+        get_job_runner().submit(
+            "Exportar PDF",
+            [
+                Etapa("pdf", gerar, descricao="gerando PDF"),
+                Etapa("upload", upload, tentativas=3, descricao="enviando ao servidor"),
+            ],
+            on_progresso=mostrar_progresso(lambda ctx: f"Exportado para servidor: {ctx['url_publica']}"),
+            chave="pedidostemp:exportar",
+        )
 
     # Botão 2: enviar para cliente (WhatsApp)
     def enviar_pdf_cliente(e):
@@ -366,25 +298,22 @@ def pedidostemp_view(page: ft.Page):
             print('[DEBUG] Token ausente')
             page.update()
             return
-        try:
-            uploader = EnviarRelatorioPedido(token=str(GRAPH_API_TOKEN), phone_number_id=str(PHONE_NUMBER_ID))
-            resposta = uploader.enviar_pdf(numero_cliente=str(telefone), pdf_url=str(estado_pdf['url_remota']))
-            if isinstance(resposta, dict) and resposta.get('messages'):
-                msg_pdf.value = f"Enviado ao cliente ({telefone})."
-                msg_pdf.color = 'green'
-            else:
-                msg_pdf.value = f"Tentativa de envio realizada. Resposta: {resposta}"
-                msg_pdf.color = 'orange'
-            msg_pdf.visible = True
+        uploader = EnviarRelatorioPedido(token=str(GRAPH_API_TOKEN), phone_number_id=str(PHONE_NUMBER_ID))
+        pdf_url = str(estado_pdf['url_remota'])
+
+        def enviar_whatsapp(ctx):
+            resposta = uploader.enviar_pdf(numero_cliente=str(telefone), pdf_url=pdf_url)
+            if not (isinstance(resposta, dict) and resposta.get('messages')):
+                raise Exception(f"Tentativa de envio realizada. Resposta: {resposta}")
             print('[DEBUG] Envio processado')
-            page.update()
-        except Exception as ex:
-            msg_pdf.value = f'Erro ao enviar: {ex}'
-            msg_pdf.color = 'red'
-            msg_pdf.visible = True
-            print(f"[ERRO envio] {ex}")
-            print('[DEBUG] Erro no envio')
-            page.update()
+
+        # Uma tentativa só: repetir após timeout pode entregar a mensagem duas vezes
+        get_job_runner().submit(
+            "Enviar ao cliente",
+            [Etapa("whatsapp", enviar_whatsapp, descricao="enviando pelo WhatsApp")],
+            on_progresso=mostrar_progresso(lambda ctx: f"Enviado ao cliente ({telefone})."),
+            chave=f"pedidostemp:enviar:{pdf_url}",
+        )
 
     selected_num_pedido = ft.Ref[ft.Dropdown]()
     tabela = ft.Ref[ft.DataTable]()
@@ -504,33 +433,22 @@ def pedidostemp_view(page: ft.Page):
                 page.update()
                 return
             
-            # Contador para feedback
-            sucessos = 0
-            erros = 0
-            
-            # Atualiza cada item para pago = 1
+            # Atualiza todos os itens de uma vez, reaproveitando as linhas já carregadas
+            linhas = {}
             for pedido in pedidos_filtrados:
                 pedido_id = pedido.get('id')
                 if pedido_id:
-                    try:
-                        # Busca o pedido individual para update
-                        pedido_individual = pedidostemp_api.get_by_id(pedido_id)
-                        if isinstance(pedido_individual, dict):
-                            pedido_individual['pago'] = 1
-                            
-                            # Formata data se necessário
-                            if 'data' in pedido_individual and pedido_individual['data']:
-                                try:
-                                    pedido_individual['data'] = pd.to_datetime(pedido_individual['data']).strftime('%Y-%m-%d')
-                                except (ValueError, TypeError) as e:
-                                    print(f"[WARN] Erro ao formatar data: {e}")
-                            
-                            # Atualiza via API
-                            pedidostemp_api.update(pedido_id, pedido_individual)
-                            sucessos += 1
-                    except (requests.RequestException, KeyError, AttributeError) as ex:
-                        print(f"Erro ao atualizar item {pedido_id}: {ex}")
-                        erros += 1
+                    linha = dict(pedido)
+                    # Data ISO ("2024-01-05T03:00:00.000Z") -> "2024-01-05"
+                    if linha.get('data'):
+                        linha['data'] = str(linha['data'])[:10]
+                    linhas[pedido_id] = linha
+            resultados = pedidostemp_api.patch_many(list(linhas), {'pago': 1}, rows=linhas)
+            sucessos = sum(1 for r in resultados.values() if r is not None)
+            erros = len(resultados) - sucessos
+            for pedido_id, r in resultados.items():
+                if r is None:
+                    print(f"Erro ao atualizar item {pedido_id}")
             
             # Limpa cache para forçar refresh
             if 'pedidos' in _api_cache:
@@ -586,15 +504,7 @@ def pedidostemp_view(page: ft.Page):
         # Merge com validação
         if pedidos_filtrados and produtos:
             df_pedidos = pd.DataFrame(pedidos_filtrados)
-            df_produtos = pd.DataFrame(produtos)
-            if 'id_Prod' in df_pedidos.columns and 'id_Prod' in df_produtos.columns:
-                df_merged = pd.merge(
-                    df_pedidos,
-                    df_produtos[['id_Prod', 'nome_Prod', 'Valor_Prod']],
-                    left_on='id_Prod', right_on='id_Prod', how='left', suffixes=('', '_Prod')
-                )
-            else:
-                df_merged = df_pedidos
+            df_merged = transformacoes.juntar_produtos(df_pedidos, produtos)
         else:
             df_merged = pd.DataFrame(pedidos_filtrados)
             
@@ -604,13 +514,7 @@ def pedidostemp_view(page: ft.Page):
                 df_merged[c] = ''
                 
         # Calcula sub_total com validação
-        if 'qtd' in df_merged.columns and 'Valor_Prod' in df_merged.columns:
-            df_merged['sub_total'] = df_merged.apply(
-                lambda row: safe_float_convert(row['qtd']) * safe_float_convert(row['Valor_Prod']), 
-                axis=1
-            )
-        else:
-            df_merged['sub_total'] = 0.0
+        df_merged['sub_total'] = transformacoes.sub_total(df_merged)
             
         df_final = df_merged[colunas]
         
@@ -636,7 +540,7 @@ def pedidostemp_view(page: ft.Page):
         columns = [ft.DataColumn(ft.Text(str(key))) for key in colunas]
         rows = []
         
-        for _, row in df_final.iterrows():
+        for row in df_final.to_dict(orient="records"):
             row_id = row.get("id")
             row_cells = [ft.DataCell(ft.Text(str(row.get(key, "")))) for key in ['id', 'idOrderPedido', 'qtd', 'nome_Prod', 'Valor_Prod', 'sub_total']]
             
@@ -2,11 +2,17 @@ import flet as ft
 import urllib.parse
 import datetime
 from models.produtos_todos_api import ProdutosTodosAPI
-from models.pedidostemp_api import PedidosTempAPI
+from models.order_outbox import get_outbox
+from models.indices import ProdutoIndex
 from utils.ui_components import create_filter_field
+from utils.autocompletar import Autocompletar
 from config import BASE_URL
 
+# Listener do outbox registrado pela instância atual da view
+_outbox_listener = None
+
 def produtos_todos_view(page: ft.Page):
+    global _outbox_listener
     # Recebe dados via query string
     num_pedido = page.query.get("numPedido")
     id_order = page.query.get("idOrderPedido")
@@ -43,6 +49,27 @@ def produtos_todos_view(page: ft.Page):
     # Cada item é um dict: {"id_Prod":..., "nome_Prod":..., "Valor_Prod":..., "qtd":..., "observ":...}
     lista_provisoria = []
 
+    # Pendências do outbox (itens gravados localmente aguardando envio à API)
+    outbox = get_outbox(BASE_URL)
+    outbox_status = ft.Text(size=12)
+
+    def atualizar_outbox_status(counts):
+        outbox_status.value = f"Envio: {counts['pending']} pendente(s) | {counts['failed']} falha(s)"
+        outbox_status.color = "red" if counts["failed"] else ("orange" if counts["pending"] else "green")
+        try:
+            outbox_status.update()
+        except Exception:
+            pass  # controle ainda não está na página
+
+    def reenviar_falhas(e):
+        outbox.retry_failed()
+
+    if _outbox_listener is not None:
+        outbox.remove_listener(_outbox_listener)
+    _outbox_listener = atualizar_outbox_status
+    outbox.add_listener(atualizar_outbox_status)
+    atualizar_outbox_status(outbox.counts())
+
     filtro_valor = {"texto": ""}
     
     def limpar_msg_apos_tempo():
@@ -62,30 +89,32 @@ def produtos_todos_view(page: ft.Page):
     sugestoes = ft.ListView(expand=1, spacing=5, padding=10, width=800)
     lista_view = ft.ListView(expand=1, spacing=8, padding=10, width=1100)
 
+    def texto_sugestao(prod):
+        try:
+            valor_str = f"{float(prod.get('Valor_Prod', '0.00')):.2f}"
+        except (ValueError, TypeError):
+            valor_str = "0.00"
+        return f"{prod.get('nome_Prod', '')} - R$ {valor_str}"
+
+    def criar_sugestao(chave, prod):
+        return ft.ListTile(
+            title=ft.Text(texto_sugestao(prod)),
+            data=prod,
+            on_click=lambda e: adicionar_produto(e.control.data)
+        )
+
+    def atualizar_sugestao(tile, prod):
+        tile.title.value = texto_sugestao(prod)
+        tile.data = prod
+
+    # Mínimo 2 caracteres, máximo 10 sugestões (as mais relevantes primeiro)
+    autocompletar = Autocompletar(
+        page, sugestoes, ProdutoIndex(produtos_todos), criar_sugestao, atualizar_sugestao,
+        limite=10, minimo=2
+    )
+
     def atualizar_sugestoes(valor):
-        sugestoes.controls.clear()
-        if valor and len(valor.strip()) >= 2:  # Mínimo 2 caracteres
-            matches = 0
-            for prod in produtos_todos:
-                if matches >= 10:  # Máximo 10 sugestões
-                    break
-                nome_prod = str(prod.get("nome_Prod", ""))
-                if valor.lower() in nome_prod.lower():
-                    valor_formatado = prod.get("Valor_Prod", "0.00")
-                    try:
-                        valor_float = float(valor_formatado)
-                        valor_str = f"{valor_float:.2f}"
-                    except (ValueError, TypeError):
-                        valor_str = "0.00"
-                    
-                    sugestoes.controls.append(
-                        ft.ListTile(
-                            title=ft.Text(f'{nome_prod} - R$ {valor_str}'),
-                            on_click=lambda e, prod=prod: adicionar_produto(prod)
-                        )
-                    )
-                    matches += 1
-        page.update()
+        autocompletar.ao_digitar(valor)
 
     def atualizar_lista():
         lista_view.controls.clear()
@@ -155,7 +184,7 @@ def produtos_todos_view(page: ft.Page):
                 except ValueError:
                     item["qtd"] = "1"
                 atualizar_lista()
-                sugestoes.controls.clear()
+                autocompletar.limpar()
                 busca_produto.value = ""
                 page.update()
                 return
@@ -177,7 +206,7 @@ def produtos_todos_view(page: ft.Page):
         })
         atualizar_lista()
         # Limpa sugestões e campo de busca após adicionar
-        sugestoes.controls.clear()
+        autocompletar.limpar()
         busca_produto.value = ""
         page.update()
     def atualizar_observacao(prod_id, valor):
@@ -232,9 +261,7 @@ def produtos_todos_view(page: ft.Page):
             page.update()
             return
         
-        pedidos_temp_api = PedidosTempAPI(BASE_URL)
-        sucesso = True
-        produtos_processados = 0
+        pedidos = []
         
         for prod in lista_provisoria:
             # Validar dados do produto
@@ -272,17 +299,12 @@ def produtos_todos_view(page: ft.Page):
                 "pago": bool(prod.get("pago", False))
             }
             
-            try:
-                pedidos_temp_api.create(pedido)
-                produtos_processados += 1
-            except Exception as ex:
-                sucesso = False
-                msg.value = f"Erro ao registrar produto '{prod.get('nome_Prod', 'Unknown')}': {ex}"
-                msg.color = "red"
-                msg.visible = True
-                break
+            pedidos.append(pedido)
+        
+        # Grava no outbox local (fsync) e retorna; o envio à API é em segundo plano
+        produtos_processados = len(outbox.enqueue_many("pedidos", pedidos)) if pedidos else 0
         
-        if sucesso and produtos_processados > 0:
+        if produtos_processados > 0:
             lista_provisoria.clear()
             atualizar_lista()
             msg.value = f"✅ {produtos_processados} produto(s) registrado(s) com sucesso!"
@@ -319,6 +341,10 @@ def produtos_todos_view(page: ft.Page):
             ft.ElevatedButton("Registrar", on_click=registrar_produtos),
             msg
         ]),
+        ft.Row([
+            outbox_status,
+            ft.TextButton("Reenviar falhas", on_click=reenviar_falhas),
+        ]),
         sugestoes,
         ft.Divider(),
         # Campo de observações gerais removido
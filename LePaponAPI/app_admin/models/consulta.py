@@ -0,0 +1,138 @@
+"""Consultas filtradas (período, cliente, campos, ordenação) sobre os recursos da API.
+
+Os filtros são enviados na query string (``dataInicio``, ``dataFim``,
+``<campo_cliente>``, ``fields``, ``orderBy``) para que o servidor devolva só o
+período pedido. Se o servidor ignorar os parâmetros (devolvendo registros
+fora do filtro), o recurso é marcado como sem suporte: a resposta já recebida
+é filtrada localmente (e gravada na réplica) e as consultas seguintes usam
+``get_all`` + filtro local, como era feito antes nas views.
+
+Os clients do app_admin não herdam de uma classe base, então expõem
+``query`` delegando para ``consultar``.
+"""
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import requests
+
+# API_SERVER_FILTERS=0 força sempre o filtro local
+SERVER_FILTERS = os.getenv("API_SERVER_FILTERS", "1") != "0"
+CONSULTA_TIMEOUT = float(os.getenv("API_TIMEOUT", "8"))  # segundos
+
+_suporte: Dict[str, bool] = {}
+_lock = threading.Lock()
+
+
+def suporta_filtros(resource: str) -> bool:
+    """``False`` se o servidor já mostrou que ignora os filtros deste recurso."""
+    return SERVER_FILTERS and _suporte.get(resource, True)
+
+
+def marcar_suporte(resource: str, suportado: bool) -> None:
+    with _lock:
+        _suporte[resource] = suportado
+
+
+def montar_params(date_from=None, date_to=None, cliente_id=None, campo_cliente: str = "id_cliente",
+                  fields: Optional[Sequence[str]] = None,
+                  order_by: Optional[Union[str, Sequence[str]]] = None) -> Dict[str, str]:
+    params: Dict[str, str] = {}
+    if date_from:
+        params["dataInicio"] = str(date_from)
+    if date_to:
+        params["dataFim"] = str(date_to)
+    if cliente_id not in (None, ""):
+        params[campo_cliente] = str(cliente_id)
+    if fields:
+        params["fields"] = ",".join(fields)
+    if order_by:
+        params["orderBy"] = order_by if isinstance(order_by, str) else ",".join(order_by)
+    return params
+
+
+def _dentro(registro: Dict[str, Any], date_from, date_to, cliente_id, campo_cliente: str,
+            parcial: bool = False) -> bool:
+    # parcial=True: só confere os campos presentes (resposta com ``fields``)
+    if not parcial or "data" in registro:
+        data = str(registro.get("data", ""))
+        if date_from and data < str(date_from):
+            return False
+        if date_to and data > str(date_to):
+            return False
+    if cliente_id not in (None, "") and (not parcial or campo_cliente in registro):
+        if str(registro.get(campo_cliente)) != str(cliente_id):
+            return False
+    return True
+
+
+def todos_dentro(registros: Iterable[Dict[str, Any]], date_from=None, date_to=None, cliente_id=None,
+                 campo_cliente: str = "id_cliente") -> bool:
+    return all(_dentro(r, date_from, date_to, cliente_id, campo_cliente, parcial=True)
+               for r in registros if isinstance(r, dict))
+
+
+def registros_completos(registros: Iterable[Any], fields: Optional[Sequence[str]] = None) -> bool:
+    """``True`` se a resposta traz os registros inteiros (o servidor não aplicou ``fields``)."""
+    if not fields:
+        return True
+    return any(isinstance(r, dict) and set(r) - set(fields) for r in registros)
+
+
+def filtrar_registros(registros: Iterable[Any], date_from=None, date_to=None, cliente_id=None,
+                      campo_cliente: str = "id_cliente", fields: Optional[Sequence[str]] = None,
+                      order_by: Optional[Union[str, Sequence[str]]] = None) -> List[Dict[str, Any]]:
+    """Aplica localmente os mesmos filtros que seriam enviados ao servidor.
+
+    As datas são comparadas como texto ``AAAA-MM-DD`` (mesmo critério das
+    views). ``order_by`` aceita um campo ou uma lista; ``-campo`` ordena de
+    forma decrescente.
+    """
+    saida = [r for r in registros if isinstance(r, dict) and _dentro(r, date_from, date_to, cliente_id, campo_cliente)]
+    if order_by:
+        campos = [order_by] if isinstance(order_by, str) else list(order_by)
+        for campo in reversed(campos):
+            desc = campo.startswith("-")
+            nome = campo.lstrip("-")
+            saida.sort(key=lambda r: str(r.get(nome, "")), reverse=desc)
+    if fields:
+        saida = [{f: r.get(f) for f in fields if f in r} for r in saida]
+    return saida
+
+
+def consultar(base_url: str, resource: str, get_all, date_from=None, date_to=None, cliente_id=None,
+              fields=None, order_by=None, campo_cliente: str = "id_cliente") -> List[Dict[str, Any]]:
+    """Implementação de ``query`` para os clients de ``models/``."""
+    filtros = dict(date_from=date_from, date_to=date_to, cliente_id=cliente_id, campo_cliente=campo_cliente)
+    params = montar_params(fields=fields, order_by=order_by, **filtros)
+    if params and suporta_filtros(resource):
+        try:
+            resp = requests.get(f"{base_url}/api/{resource}", params=params, timeout=CONSULTA_TIMEOUT)
+            resp.raise_for_status()
+            dados = resp.json()
+        except (requests.RequestException, ValueError):
+            dados = None
+        if isinstance(dados, list):
+            if todos_dentro(dados, **filtros):
+                return filtrar_registros(dados, fields=fields, order_by=order_by, **filtros)
+            marcar_suporte(resource, False)
+            if registros_completos(dados, fields):
+                # Servidor ignorou os filtros e mandou tudo: usa o que já chegou
+                return _filtrar_resposta(resource, dados, fields=fields, order_by=order_by, **filtros)
+    dados = get_all()
+    from models.sqlite_replica import REPLICATED_RESOURCES, get_replica
+    if resource in REPLICATED_RESOURCES:
+        # get_all acabou de atualizar a réplica (ou caiu nela): filtra por índice
+        return get_replica().query(resource, fields=fields, order_by=order_by, **filtros)
+    if not isinstance(dados, list):
+        dados = [dados] if dados else []
+    return filtrar_registros(dados, fields=fields, order_by=order_by, **filtros)
+
+
+def _filtrar_resposta(resource: str, dados: List[Dict[str, Any]], fields=None, order_by=None,
+                      **filtros) -> List[Dict[str, Any]]:
+    from models.sqlite_replica import REPLICATED_RESOURCES, get_replica
+    if resource in REPLICATED_RESOURCES:
+        get_replica().merge(resource, dados)
+        return get_replica().query(resource, fields=fields, order_by=order_by, **filtros)
+    return filtrar_registros(dados, fields=fields, order_by=order_by, **filtros)
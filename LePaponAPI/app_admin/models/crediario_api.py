@@ -1,4 +1,6 @@
 import requests
+from models.consulta import consultar
+from models.sqlite_replica import ler_com_replica
 
 class CrediarioAPI:
     def get_sum_period(self, data_inicio, data_fim):
@@ -9,7 +11,12 @@ class CrediarioAPI:
         self.base_url = base_url.rstrip('/')
 
     def get_all(self):
-        return requests.get(f"{self.base_url}/api/crediario").json()
+        return ler_com_replica("crediario", lambda: requests.get(f"{self.base_url}/api/crediario").json())
+
+    def query(self, date_from=None, date_to=None, cliente_id=None, fields=None, order_by=None, campo_cliente='id_cliente'):
+        """Lista crediario filtrado por período/cliente (filtros enviados ao servidor quando suportado)."""
+        return consultar(self.base_url, "crediario", self.get_all, date_from, date_to, cliente_id,
+                         fields, order_by, campo_cliente)
 
     def get_by_id(self, id):
         return requests.get(f"{self.base_url}/api/crediario/{id}").json()
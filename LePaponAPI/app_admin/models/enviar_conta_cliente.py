@@ -1,6 +1,6 @@
 import requests
 import os
-import paramiko
+from models.sftp_pool import get_sftp
 
 class EnviarContaCliente:
     def __init__(self, token, phone_number_id):
@@ -17,19 +17,7 @@ class EnviarContaCliente:
         - caminho_remoto: caminho destino no droplet (ex: /var/www/html/arquivo.pdf)
         - caminho_chave: caminho da chave privada SSH
         """
-        if not os.path.isfile(caminho_local):
-            raise FileNotFoundError(f"Arquivo não encontrado: {caminho_local}")
-        key = paramiko.RSAKey.from_private_key_file(caminho_chave)
-        transport = paramiko.Transport((host, 22))
-        transport.connect(username=usuario, pkey=key)
-        sftp = paramiko.SFTPClient.from_transport(transport)
-        if sftp is None:
-            transport.close()
-            raise ConnectionError("Falha ao criar o cliente SFTP. Verifique as credenciais e a conexão.")
-        sftp.put(caminho_local, caminho_remoto)
-        sftp.close()
-        transport.close()
-        return True
+        return get_sftp(host, usuario, caminho_chave).upload(caminho_local, caminho_remoto)
 
     def enviar_pdf(self, numero_cliente, pdf_url, nome_arquivo=None):
         """
@@ -63,16 +51,7 @@ class EnviarContaCliente:
         - caminho_chave: caminho da chave privada SSH
         """
         try:
-            key = paramiko.RSAKey.from_private_key_file(caminho_chave)
-            transport = paramiko.Transport((host, 22))
-            transport.connect(username=usuario, pkey=key)
-            sftp = paramiko.SFTPClient.from_transport(transport)
-            if sftp is None:
-                transport.close()
-                raise ConnectionError("Falha ao criar o cliente SFTP. Verifique as credenciais e a conexão.")
-            sftp.remove(caminho_remoto)
-            sftp.close()
-            transport.close()
+            get_sftp(host, usuario, caminho_chave).remover(caminho_remoto)
             return True
         except Exception as e:
             print(f"Erro ao remover arquivo remoto: {e}")
@@ -87,30 +66,21 @@ class EnviarContaCliente:
         - caminho_chave: caminho da chave privada SSH
         """
         try:
-            key = paramiko.RSAKey.from_private_key_file(caminho_chave)
-            transport = paramiko.Transport((host, 22))
-            transport.connect(username=usuario, pkey=key)
-            sftp = paramiko.SFTPClient.from_transport(transport)
-            if sftp is None:
-                transport.close()
-                raise ConnectionError("Falha ao criar o cliente SFTP. Verifique as credenciais e a conexão.")
-            
+            conexao = get_sftp(host, usuario, caminho_chave)
             # Lista todos os arquivos da pasta
-            arquivos = sftp.listdir(pasta_remota)
+            arquivos = conexao.listar(pasta_remota)
             pdfs_removidos = 0
             
             for arquivo in arquivos:
                 if arquivo.lower().endswith('.pdf'):
                     caminho_arquivo = f"{pasta_remota}/{arquivo}"
                     try:
-                        sftp.remove(caminho_arquivo)
+                        conexao.remover(caminho_arquivo)
                         pdfs_removidos += 1
                         print(f"PDF removido: {arquivo}")
                     except Exception as e:
                         print(f"Erro ao remover {arquivo}: {e}")
             
-            sftp.close()
-            transport.close()
             return pdfs_removidos
         except Exception as e:
             print(f"Erro ao limpar pasta de PDFs: {e}")
@@ -1,11 +1,12 @@
 import requests
+from models.sqlite_replica import ler_com_replica
 
 class ProdutosTodosAPI:
     def __init__(self, base_url):
         self.base_url = base_url.rstrip('/')
 
     def get_all(self):
-        return requests.get(f"{self.base_url}/api/produtostodos").json()
+        return ler_com_replica("produtostodos", lambda: requests.get(f"{self.base_url}/api/produtostodos").json())
 
     def get_by_id(self, id):
         return requests.get(f"{self.base_url}/api/produtostodos/{id}").json()
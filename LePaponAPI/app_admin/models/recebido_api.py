@@ -1,4 +1,6 @@
 import requests
+from models.consulta import consultar
+from models.sqlite_replica import ler_com_replica
 
 class RecebidoAPI:
     def get_sum_period(self, data_inicio, data_fim):
@@ -9,7 +11,12 @@ class RecebidoAPI:
         self.base_url = base_url.rstrip('/')
 
     def get_all(self):
-        return requests.get(f"{self.base_url}/api/recebido").json()
+        return ler_com_replica("recebido", lambda: requests.get(f"{self.base_url}/api/recebido").json())
+
+    def query(self, date_from=None, date_to=None, cliente_id=None, fields=None, order_by=None, campo_cliente='id_cliente'):
+        """Lista recebido filtrado por período/cliente (filtros enviados ao servidor quando suportado)."""
+        return consultar(self.base_url, "recebido", self.get_all, date_from, date_to, cliente_id,
+                         fields, order_by, campo_cliente)
 
     def get_by_id(self, id):
         return requests.get(f"{self.base_url}/api/recebido/{id}").json()
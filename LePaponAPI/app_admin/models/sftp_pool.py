@@ -0,0 +1,182 @@
+"""Conexões SFTP reaproveitadas com o droplet.
+
+Antes cada upload/remoção abria um ``paramiko.Transport`` novo (handshake SSH
++ leitura da chave) e o fechava no fim. Aqui há uma conexão por
+``(host, usuário, chave, porta)``, aberta no primeiro uso e mantida viva
+(keepalive) entre as operações:
+
+- a chave privada é lida e parseada uma vez (recarregada se o arquivo mudar);
+- antes de usar, a conexão é verificada (``transport.is_active()``) e
+  reaberta se o servidor a derrubou;
+- se a conexão cair no meio de uma operação, ela é reaberta e a operação
+  repetida uma vez (erros do SFTP com a conexão ativa, como arquivo
+  inexistente, são repassados);
+- ``upload_many`` envia vários arquivos na mesma sessão.
+
+Uso::
+
+    conexao = get_sftp(host, usuario, caminho_chave)
+    conexao.upload(local, remoto)
+    conexao.upload_many([(local1, remoto1), (local2, remoto2)])
+"""
+import logging
+import os
+import posixpath
+import socket
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import paramiko
+
+SFTP_PORTA = int(os.getenv("SFTP_PORTA", "22"))
+SFTP_KEEPALIVE = int(os.getenv("SFTP_KEEPALIVE", "30"))
+# Conexão parada por mais que isso é fechada e reaberta no próximo uso
+SFTP_OCIOSO_MAX = float(os.getenv("SFTP_OCIOSO_MAX", "300"))
+
+logger = logging.getLogger("sftp")
+
+_ERROS_CONEXAO = (paramiko.SSHException, EOFError, ConnectionError, socket.timeout)
+
+_chaves: Dict[str, Tuple[float, paramiko.RSAKey]] = {}
+_chaves_lock = threading.Lock()
+
+
+def carregar_chave(caminho_chave: str) -> paramiko.RSAKey:
+    """``RSAKey`` parseada uma vez por arquivo (de novo só se o arquivo mudar)."""
+    caminho = os.path.abspath(os.path.expanduser(caminho_chave))
+    mtime = os.path.getmtime(caminho)
+    with _chaves_lock:
+        em_cache = _chaves.get(caminho)
+        if em_cache is None or em_cache[0] != mtime:
+            em_cache = _chaves[caminho] = (mtime, paramiko.RSAKey.from_private_key_file(caminho))
+        return em_cache[1]
+
+
+class ConexaoSFTP:
+    def __init__(self, host: str, usuario: str, caminho_chave: str, porta: int = SFTP_PORTA):
+        self.host = host
+        self.usuario = usuario
+        self.caminho_chave = caminho_chave
+        self.porta = porta
+        self._transport: Optional[paramiko.Transport] = None
+        self._sftp: Optional[paramiko.SFTPClient] = None
+        self._ultimo_uso = 0.0
+        self._lock = threading.RLock()
+
+    # --- Conexão ---
+    def _ativa(self) -> bool:
+        if self._transport is None or self._sftp is None or not self._transport.is_active():
+            return False
+        return time.monotonic() - self._ultimo_uso < SFTP_OCIOSO_MAX
+
+    def _conectar(self) -> paramiko.SFTPClient:
+        """Garante uma sessão aberta (chamar com ``_lock``)."""
+        if self._ativa():
+            return self._sftp
+        self.fechar()
+        transport = paramiko.Transport((self.host, self.porta))
+        try:
+            transport.connect(username=self.usuario, pkey=carregar_chave(self.caminho_chave))
+            transport.set_keepalive(SFTP_KEEPALIVE)
+            sftp = paramiko.SFTPClient.from_transport(transport)
+            if sftp is None:
+                raise ConnectionError("Falha ao criar o cliente SFTP. Verifique as credenciais e a conexão.")
+        except Exception:
+            transport.close()
+            raise
+        logger.info(f"Conexão SFTP aberta com {self.usuario}@{self.host}")
+        self._transport, self._sftp = transport, sftp
+        return sftp
+
+    def _caiu(self, erro: Exception) -> bool:
+        """O erro veio da conexão (e não da operação em si)?"""
+        if isinstance(erro, _ERROS_CONEXAO):
+            return True
+        return self._transport is None or not self._transport.is_active()
+
+    def fechar(self) -> None:
+        with self._lock:
+            for recurso in (self._sftp, self._transport):
+                if recurso is not None:
+                    try:
+                        recurso.close()
+                    except Exception as e:
+                        logger.warning(f"Erro ao fechar conexão SFTP: {e}")
+            self._sftp = self._transport = None
+
+    def executar(self, operacao: Callable[[paramiko.SFTPClient], object]):
+        """Executa ``operacao(sftp)``, reconectando e repetindo uma vez se a conexão cair."""
+        with self._lock:
+            for tentativa in (1, 2):
+                sftp = self._conectar()
+                try:
+                    resultado = operacao(sftp)
+                    self._ultimo_uso = time.monotonic()
+                    return resultado
+                except Exception as e:
+                    if not self._caiu(e):
+                        raise  # erro do próprio SFTP (permissão, arquivo inexistente...)
+                    self.fechar()
+                    if tentativa == 2:
+                        raise
+                    logger.warning(f"Conexão SFTP com {self.host} caiu ({e}); reconectando")
+
+    # --- Operações ---
+    def upload(self, caminho_local: str, caminho_remoto: str) -> bool:
+        if not os.path.isfile(caminho_local):
+            raise FileNotFoundError(f"Arquivo não encontrado: {caminho_local}")
+        self.executar(lambda sftp: sftp.put(caminho_local, caminho_remoto))
+        return True
+
+    def upload_many(self, arquivos: Iterable[Tuple[str, str]]) -> List[Tuple[str, Optional[Exception]]]:
+        """Envia ``(local, remoto)`` em sequência na mesma sessão.
+
+        Retorna ``[(remoto, erro ou None), ...]``: a falha de um arquivo não
+        impede o envio dos demais.
+        """
+        resultados = []
+        with self._lock:  # a sessão fica com este lote até o fim
+            for caminho_local, caminho_remoto in arquivos:
+                try:
+                    self.upload(caminho_local, caminho_remoto)
+                    resultados.append((caminho_remoto, None))
+                except Exception as e:
+                    logger.warning(f"Falha no upload de {caminho_local}: {e}")
+                    resultados.append((caminho_remoto, e))
+        return resultados
+
+    def remover(self, caminho_remoto: str) -> None:
+        self.executar(lambda sftp: sftp.remove(caminho_remoto))
+
+    def listar(self, pasta_remota: str) -> List[str]:
+        return self.executar(lambda sftp: sftp.listdir(pasta_remota))
+
+    def tamanho(self, caminho_remoto: str) -> int:
+        return self.executar(lambda sftp: sftp.stat(caminho_remoto).st_size)
+
+    def criar_diretorios(self, pasta_remota: str) -> None:
+        """Cria ``pasta_remota`` e as pastas acima dela que ainda não existem."""
+        def criar(sftp):
+            caminho = "/" if pasta_remota.startswith("/") else ""
+            for parte in [p for p in pasta_remota.split("/") if p]:
+                caminho = posixpath.join(caminho, parte)
+                try:
+                    sftp.stat(caminho)
+                except IOError:
+                    sftp.mkdir(caminho)
+        self.executar(criar)
+
+
+_conexoes: Dict[tuple, ConexaoSFTP] = {}
+_conexoes_lock = threading.Lock()
+
+
+def get_sftp(host: str, usuario: str, caminho_chave: str, porta: int = SFTP_PORTA) -> ConexaoSFTP:
+    """Conexão compartilhada para o destino (criada sob demanda, aberta no primeiro uso)."""
+    chave = (host, usuario, os.path.abspath(os.path.expanduser(caminho_chave)), porta)
+    with _conexoes_lock:
+        conexao = _conexoes.get(chave)
+        if conexao is None:
+            conexao = _conexoes[chave] = ConexaoSFTP(host, usuario, caminho_chave, porta)
+        return conexao
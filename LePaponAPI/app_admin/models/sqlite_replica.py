@@ -0,0 +1,183 @@
+"""Réplica local em SQLite dos recursos consultados pelas views.
+
+Cada recurso vira uma tabela com o registro completo em ``doc`` (JSON) e as
+colunas usadas em filtros extraídas e indexadas (``data``, ``id_cliente``,
+``numPedido``, ``id_Prod``). Os clients gravam aqui o que recebem da API
+(write-through) e leem daqui quando a API está fora do ar, permitindo que o
+caixa continue trabalhando durante quedas curtas do ``lepapon.api``.
+
+Leituras de rotina mesclam as linhas pelo ``id`` (``gravar_lista``); apagar
+e regravar a tabela inteira só acontece na carga completa periódica
+(``REPLICA_FULL_INTERVAL``), que é quando as exclusões chegam à réplica.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+
+from models import consulta
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SQLITE_REPLICA_PATH = os.getenv(
+    "SQLITE_REPLICA_PATH", os.path.join(_BASE_DIR, "..", "storage", "data", "replica.sqlite3")
+)
+# Recursos gravados pelos clients (write-through) e lidos durante quedas da API
+REPLICATED_RESOURCES = {"clientes", "produtostodos", "crediario", "vendas", "recebido"}
+INDEXED_COLUMNS = ("data", "hora", "id_cliente", "numPedido", "id_Prod")
+# Intervalo entre cargas completas (DELETE + INSERT) feitas pelas leituras
+REPLICA_FULL_INTERVAL = float(os.getenv("SYNC_FULL_INTERVAL", "3600"))
+_NOME_VALIDO = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _texto(valor: Any) -> Optional[str]:
+    return None if valor is None else str(valor)
+
+
+class SqliteReplica:
+    """Acesso thread-safe à réplica (uma conexão compartilhada, modo WAL)."""
+
+    def __init__(self, path: str = SQLITE_REPLICA_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
+        self._tabelas = set()
+        self._carga_completa: Dict[str, float] = {}  # recurso -> time.monotonic()
+
+    def _tabela(self, resource: str) -> str:
+        if not _NOME_VALIDO.match(resource):
+            raise ValueError(f"Nome de recurso inválido: {resource!r}")
+        if resource not in self._tabelas:
+            colunas = ", ".join(f'"{c}" TEXT' for c in INDEXED_COLUMNS)
+            self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{resource}" (id TEXT PRIMARY KEY, {colunas}, doc TEXT NOT NULL)')
+            for c in INDEXED_COLUMNS:
+                if c != "hora":
+                    self._conn.execute(f'CREATE INDEX IF NOT EXISTS "ix_{resource}_{c}" ON "{resource}" ("{c}")')
+            self._conn.commit()
+            self._tabelas.add(resource)
+        return f'"{resource}"'
+
+    @staticmethod
+    def _linha(row: Dict[str, Any]):
+        return (_texto(row.get("id")),) + tuple(_texto(row.get(c)) for c in INDEXED_COLUMNS) + (
+            json.dumps(row, ensure_ascii=False, default=str),
+        )
+
+    # --- Escrita ---
+    def merge(self, resource: str, linhas: Iterable[Dict[str, Any]]) -> int:
+        """Insere ou substitui as linhas pelo ``id``."""
+        valores = [self._linha(r) for r in linhas if isinstance(r, dict)]
+        marcadores = ", ".join("?" for _ in range(len(INDEXED_COLUMNS) + 2))
+        with self._lock:
+            tabela = self._tabela(resource)
+            with self._conn:
+                self._conn.executemany(f"INSERT OR REPLACE INTO {tabela} VALUES ({marcadores})", valores)
+        return len(valores)
+
+    def replace(self, resource: str, linhas: Iterable[Dict[str, Any]]) -> int:
+        """Substitui o conteúdo inteiro do recurso (carga completa)."""
+        valores = [self._linha(r) for r in linhas if isinstance(r, dict)]
+        marcadores = ", ".join("?" for _ in range(len(INDEXED_COLUMNS) + 2))
+        with self._lock:
+            tabela = self._tabela(resource)
+            with self._conn:
+                self._conn.execute(f"DELETE FROM {tabela}")
+                self._conn.executemany(f"INSERT OR REPLACE INTO {tabela} VALUES ({marcadores})", valores)
+            self._carga_completa[resource] = time.monotonic()
+        return len(valores)
+
+    def gravar_lista(self, resource: str, linhas: Iterable[Dict[str, Any]]) -> int:
+        """Grava a lista completa lida da API: mescla pelo ``id`` e só substitui
+        tudo quando a última carga completa passou de ``REPLICA_FULL_INTERVAL``."""
+        ultima = self._carga_completa.get(resource)
+        if ultima is None or time.monotonic() - ultima > REPLICA_FULL_INTERVAL:
+            return self.replace(resource, linhas)
+        return self.merge(resource, linhas)
+
+    def delete(self, resource: str, _id) -> None:
+        with self._lock:
+            tabela = self._tabela(resource)
+            with self._conn:
+                self._conn.execute(f"DELETE FROM {tabela} WHERE id = ?", (_texto(_id),))
+
+    # --- Leitura ---
+    def _select(self, sql: str, params=()) -> List[Dict[str, Any]]:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            return [json.loads(doc) for (doc,) in cursor.fetchall()]
+
+    def rows(self, resource: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            tabela = self._tabela(resource)
+        return self._select(f"SELECT doc FROM {tabela}")
+
+    def count(self, resource: str) -> int:
+        with self._lock:
+            tabela = self._tabela(resource)
+            return self._conn.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+
+    def get(self, resource: str, _id) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            tabela = self._tabela(resource)
+        linhas = self._select(f"SELECT doc FROM {tabela} WHERE id = ?", (_texto(_id),))
+        return linhas[0] if linhas else None
+
+    def query(self, resource: str, date_from=None, date_to=None, cliente_id=None, fields=None, order_by=None,
+              campo_cliente: str = "id_cliente") -> List[Dict[str, Any]]:
+        """Mesma semântica de ``consulta.filtrar_registros``, filtrando por índice."""
+        where, params = [], []
+        if date_from:
+            where.append("data >= ?")
+            params.append(str(date_from))
+        if date_to:
+            where.append("data <= ?")
+            params.append(str(date_to))
+        filtro_local = None
+        if cliente_id not in (None, ""):
+            if campo_cliente in INDEXED_COLUMNS:
+                where.append(f'"{campo_cliente}" = ?')
+                params.append(str(cliente_id))
+            else:
+                filtro_local = cliente_id
+        with self._lock:
+            tabela = self._tabela(resource)
+        sql = f"SELECT doc FROM {tabela}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        linhas = self._select(sql, params)
+        # Ordenação/projeção (e cliente fora dos índices) seguem a regra comum
+        return consulta.filtrar_registros(linhas, cliente_id=filtro_local, campo_cliente=campo_cliente,
+                                          fields=fields, order_by=order_by)
+
+
+_replica: Optional[SqliteReplica] = None
+_replica_lock = threading.Lock()
+
+
+def get_replica() -> SqliteReplica:
+    """Instância única por processo."""
+    global _replica
+    with _replica_lock:
+        if _replica is None:
+            _replica = SqliteReplica()
+        return _replica
+
+
+def ler_com_replica(resource: str, buscar: Callable[[], Any]) -> Any:
+    """Para clients sem ``BaseAPI``: executa ``buscar()`` gravando a lista na
+    réplica; se a API falhar, devolve a última cópia local."""
+    try:
+        dados = buscar()
+    except (requests.RequestException, ValueError):
+        return get_replica().rows(resource)
+    if isinstance(dados, list):
+        get_replica().gravar_lista(resource, dados)
+    return dados
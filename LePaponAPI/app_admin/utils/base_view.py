@@ -4,7 +4,11 @@ Classe base para views com funcionalidades comuns
 import flet as ft
 import datetime
 import pandas as pd
-from utils.common_utils import BASE_URL, formatar_data, obter_nome_cliente
+from models.indices import ClienteIndex
+from utils.common_utils import BASE_URL
+from utils.tabela_paginada import TabelaPaginada
+from utils.autocompletar import Autocompletar
+from utils import transformacoes
 
 class BaseView:
     """Classe base para views com filtros e funcionalidades comuns"""
@@ -24,6 +28,7 @@ class BaseView:
                     self.clientes = [self.clientes] if self.clientes else []
             except Exception:
                 self.clientes = []
+        self.indice_clientes = ClienteIndex(self.clientes)
     
     def criar_filtros_data(self, on_change_callback):
         """Cria filtros de data inicial e final"""
@@ -49,23 +54,31 @@ class BaseView:
     
     def criar_dropdown_clientes(self, on_change_callback):
         """Cria dropdown de seleção de clientes"""
-        opcoes_clientes = [
-            ft.dropdown.Option(
-                text=f"{c.get('id', '')} - {c.get('nome', '')} - {c.get('sobrenome', '')}", 
-                key=str(c.get('id', ''))
-            ) 
-            for c in self.clientes if isinstance(c, dict)
-        ]
-        
         dropdown_clientes = ft.Dropdown(
-            options=opcoes_clientes,
             label="Selecionar Cliente",
             width=350,
             on_change=lambda e: on_change_callback()
         )
+        # Opções reaproveitadas por id do cliente entre um filtro e outro
+        autocompletar = Autocompletar(
+            self.page, dropdown_clientes, self.indice_clientes,
+            self._criar_opcao_cliente, self._atualizar_opcao_cliente, atributo="options"
+        )
+        dropdown_clientes.options = autocompletar.montar()
+        dropdown_clientes.data = autocompletar
         
         return dropdown_clientes
     
+    @staticmethod
+    def _texto_opcao_cliente(c):
+        return f"{c.get('id', '')} - {c.get('nome', '')} - {c.get('sobrenome', '')}"
+    
+    def _criar_opcao_cliente(self, chave, c):
+        return ft.dropdown.Option(text=self._texto_opcao_cliente(c), key=chave)
+    
+    def _atualizar_opcao_cliente(self, opcao, c):
+        opcao.text = self._texto_opcao_cliente(c)
+    
     def criar_filtro_nome_cliente(self, dropdown_clientes):
         """Cria filtro por nome do cliente"""
         filtro_nome = ft.TextField(
@@ -77,21 +90,23 @@ class BaseView:
         return filtro_nome
     
     def filtrar_opcoes_clientes(self, filtro_nome, dropdown_clientes):
-        """Filtra opções do dropdown por nome"""
-        nome_filtro = (filtro_nome.value or "").lower()
-        dropdown_clientes.options = [
-            ft.dropdown.Option(
-                text=f"{c.get('id', '')} - {c.get('nome', '')} - {c.get('sobrenome', '')}", 
-                key=str(c.get('id', ''))
-            )
-            for c in self.clientes 
-            if isinstance(c, dict) and nome_filtro in str(c.get('nome', '')).lower()
-        ]
-        self.page.update()
+        """Filtra opções do dropdown por nome (busca sem acentos, após a digitação parar)"""
+        dropdown_clientes.data.ao_digitar(filtro_nome.value)
     
     def processar_dados_periodo(self, data_inicial, data_final, cliente_id=None, campo_cliente='id_cliente'):
         """Processa dados de um período específico"""
         try:
+            if hasattr(self.api, 'query'):
+                # Filtro e ordenação feitos pela API (servidor ou fallback local)
+                dados = self.api.query(
+                    date_from=str(data_inicial),
+                    date_to=str(data_final),
+                    cliente_id=cliente_id or None,
+                    campo_cliente=campo_cliente,
+                    order_by=['data', 'hora'],
+                )
+                return pd.DataFrame(dados)
+
             dados = self.api.get_all()
             if not isinstance(dados, list):
                 dados = [dados] if dados else []
@@ -132,47 +147,21 @@ class BaseView:
         
         # Formata data
         if 'data' in df_copia.columns:
-            df_copia['data'] = df_copia['data'].apply(formatar_data)
+            df_copia['data'] = transformacoes.formatar_datas(df_copia['data'])
         
         # Adiciona nome do cliente se necessário
         if 'id_cliente' in df_copia.columns and 'nome_cliente' not in df_copia.columns:
-            df_copia['nome_cliente'] = df_copia['id_cliente'].apply(
-                lambda x: obter_nome_cliente(self.clientes, x)
-            )
+            df_copia['nome_cliente'] = transformacoes.nomes_clientes(df_copia['id_cliente'], self.clientes)
         
         return df_copia[campos_exibir] if all(campo in df_copia.columns for campo in campos_exibir) else df_copia
     
-    def criar_tabela_datatable(self, df, campos_exibir, colunas_legenda):
-        """Cria uma DataTable do Flet"""
-        if df.empty or not all(campo in df.columns for campo in campos_exibir):
-            columns = [ft.DataColumn(ft.Text("Data"))]
-            rows = [ft.DataRow([ft.DataCell(ft.Text(""))])]
-        else:
-            columns = [ft.DataColumn(ft.Text(colunas_legenda[c])) for c in campos_exibir]
-            rows = []
-            
-            for _, row in df.iterrows():
-                cells = [ft.DataCell(ft.Text(str(row.get(c, "")))) for c in campos_exibir]
-                rows.append(ft.DataRow(cells))
-            
-            if not rows:
-                rows = [ft.DataRow([ft.DataCell(ft.Text("")) for _ in columns])]
-        
-        return columns, rows
+    def criar_tabela_paginada(self, **kwargs_tabela):
+        """Cria uma TabelaPaginada (só a página visível vira DataRow); ver ``utils/tabela_paginada.py``"""
+        return TabelaPaginada(self.page, **kwargs_tabela)
     
     def calcular_total(self, df, campo_valor='valor'):
         """Calcula o total de uma coluna de valores"""
-        if df.empty or campo_valor not in df.columns:
-            return 0.0
-        
-        total = 0.0
-        for _, row in df.iterrows():
-            try:
-                total += float(str(row.get(campo_valor, 0)).replace(",", "."))
-            except:
-                pass
-        
-        return total
+        return transformacoes.total(df, campo_valor)
     
     def mostrar_mensagem(self, texto, cor="blue"):
         """Mostra mensagem para o usuário"""
@@ -49,11 +49,17 @@ def sanitize_filename(nome):
     import re
     return re.sub(r'[^a-zA-Z0-9_\-]', '_', nome)
 
+_indice_clientes = {"lista": None, "tamanho": -1, "indice": None}
+
 def obter_nome_cliente(clientes, cliente_id):
     """
     Obtém o nome completo do cliente pelo ID
+
+    O índice por id é montado uma vez por lista de clientes (os relatórios
+    chamam esta função uma vez por linha com a mesma lista).
     """
-    cliente = next((c for c in clientes if str(c.get('id', '')) == str(cliente_id)), None)
-    if cliente:
-        return f"{cliente.get('nome', '')} {cliente.get('sobrenome', '')}"
-    return f"Cliente {cliente_id}"
+    from models.indices import ClienteIndex
+    cache = _indice_clientes
+    if cache["lista"] is not clientes or cache["tamanho"] != len(clientes):
+        cache.update(lista=clientes, tamanho=len(clientes), indice=ClienteIndex(clientes))
+    return cache["indice"].nome_completo(cliente_id, f"Cliente {cliente_id}")
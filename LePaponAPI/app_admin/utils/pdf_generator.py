@@ -6,6 +6,8 @@ import datetime
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 
+from utils import transformacoes
+
 class PDFGenerator:
     """Classe para gerar PDFs com cabeçalho padrão"""
     
@@ -65,24 +67,22 @@ class PDFGenerator:
         y -= 20
         
         # Dados da tabela
-        total = 0.0
-        for _, row in dados.iterrows():
-            for i, campo in enumerate(colunas_legenda.keys()):
-                valor = str(row.get(campo, ""))
+        campos = list(colunas_legenda.keys())
+        for valores in transformacoes.linhas_texto(dados, campos):
+            for i, valor in enumerate(valores):
                 canvas_obj.drawString(x_positions[i], y, valor)
-                
-                # Soma valores se for campo de valor
-                if 'valor' in campo.lower() or 'total' in campo.lower():
-                    try:
-                        total += float(str(row.get(campo, 0)).replace(",", "."))
-                    except:
-                        pass
             
             y -= 18
             if y < 60:
                 canvas_obj.showPage()
                 y = A4[1] - 40
         
+        # Soma os campos de valor de uma vez
+        total = sum(
+            transformacoes.total(dados, campo) for campo in campos
+            if 'valor' in campo.lower() or 'total' in campo.lower()
+        )
+        
         return y, total
     
     def finalizar_pdf(self, canvas_obj, y_atual, total, moeda="R$"):
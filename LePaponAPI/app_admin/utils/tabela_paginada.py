@@ -0,0 +1,114 @@
+"""
+DataTable paginada para relatórios de período.
+
+Um mês de vendas tem milhares de registros; criar um ``ft.DataRow`` para
+cada um trava a tela. ``TabelaPaginada`` guarda os dados do período e monta
+apenas as linhas da página visível (``TAMANHO_PAGINA`` por vez). As mesmas
+linhas são reaproveitadas ao trocar de página: só o texto das células muda.
+
+Os totais e a exportação em PDF continuam usando o DataFrame completo do
+período; a paginação é só da exibição.
+"""
+import os
+
+import flet as ft
+import pandas as pd
+
+from utils.lista_chaveada import ListaChaveada
+
+TAMANHO_PAGINA = int(os.getenv("TABELA_TAMANHO_PAGINA", "50"))
+
+
+class TabelaPaginada:
+    def __init__(self, page, tamanho=TAMANHO_PAGINA, **kwargs_tabela):
+        self.page = page
+        self.tamanho = max(1, int(tamanho))
+        self.pagina = 0
+        self.total = 0
+        self._dados = None
+        self._legendas = None
+        self._linhas = ListaChaveada(self._criar_linha, self._atualizar_linha)
+
+        self.tabela = ft.DataTable(columns=[ft.DataColumn(ft.Text("Data"))], rows=[], **kwargs_tabela)
+        self.info = ft.Text("")
+        self.btn_anterior = ft.IconButton(
+            icon=ft.Icons.CHEVRON_LEFT, tooltip="Página anterior",
+            on_click=lambda e: self.ir_para(self.pagina - 1),
+        )
+        self.btn_proxima = ft.IconButton(
+            icon=ft.Icons.CHEVRON_RIGHT, tooltip="Próxima página",
+            on_click=lambda e: self.ir_para(self.pagina + 1),
+        )
+        self.navegacao = ft.Row([self.btn_anterior, self.info, self.btn_proxima])
+        # Navegação acima da tabela: fica visível mesmo em containers de altura fixa
+        self.controle = ft.Column([self.navegacao, self.tabela])
+
+    # --- Linhas ---
+    @staticmethod
+    def _criar_linha(posicao, valores):
+        return ft.DataRow([ft.DataCell(ft.Text(v)) for v in valores])
+
+    @staticmethod
+    def _atualizar_linha(linha, valores):
+        for celula, valor in zip(linha.cells, valores):
+            celula.content.value = valor
+
+    # --- Dados ---
+    @property
+    def paginas(self):
+        return max(1, -(-self.total // self.tamanho))
+
+    def mostrar(self, df, campos_exibir, colunas_legenda):
+        """Exibe um DataFrame (ou lista de dicts) a partir da primeira página.
+
+        Não chama ``page.update``: quem filtra já atualiza a tela em seguida.
+        """
+        if isinstance(df, list):
+            df = pd.DataFrame(df)
+        if df.empty or not all(campo in df.columns for campo in campos_exibir):
+            self._dados = None
+            self.total = 0
+            self._configurar_colunas(["Data"])
+        else:
+            self._dados = df[campos_exibir]
+            self.total = len(df)
+            self._configurar_colunas([colunas_legenda[c] for c in campos_exibir])
+        self.pagina = 0
+        self._desenhar()
+
+    def _configurar_colunas(self, legendas):
+        if legendas != self._legendas:
+            self._legendas = legendas
+            self.tabela.columns = [ft.DataColumn(ft.Text(l)) for l in legendas]
+            # Número de células mudou: as linhas antigas não servem mais
+            self._linhas.limpar()
+
+    def _desenhar(self):
+        inicio = self.pagina * self.tamanho
+        if self._dados is None:
+            rows = []
+        else:
+            pagina = self._dados.iloc[inicio:inicio + self.tamanho].astype(str)
+            # Chave = posição na página: ao paginar as linhas são reaproveitadas
+            rows = self._linhas.reconciliar(enumerate(pagina.itertuples(index=False, name=None)))
+        if not rows:
+            rows = [ft.DataRow([ft.DataCell(ft.Text("")) for _ in self.tabela.columns])]
+        self.tabela.rows = rows
+
+        fim = min(inicio + self.tamanho, self.total)
+        self.info.value = (
+            f"{inicio + 1}-{fim} de {self.total} (página {self.pagina + 1} de {self.paginas})"
+            if self.total else "Nenhum registro"
+        )
+        self.btn_anterior.disabled = self.pagina == 0
+        self.btn_proxima.disabled = self.pagina >= self.paginas - 1
+        self.navegacao.visible = self.total > self.tamanho
+
+    def ir_para(self, pagina):
+        pagina = min(max(0, pagina), self.paginas - 1)
+        if pagina == self.pagina:
+            return
+        self.pagina = pagina
+        self._desenhar()
+        if self.controle.page is not None:
+            self.page.update(self.controle)
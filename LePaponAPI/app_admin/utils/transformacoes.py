@@ -0,0 +1,106 @@
+"""
+Transformações vetorizadas de DataFrames usadas pelas views e pelos PDFs.
+
+Substituem os ``iterrows()`` / ``apply(axis=1)`` espalhados pelas telas:
+cada função opera na coluna inteira (pandas/NumPy), então montar um
+relatório de um mês custa praticamente o mesmo que o de um dia.
+
+Mesmas regras das funções linha a linha de ``utils/common_utils.py``:
+``parse_float`` (vírgula decimal, inválido vira 0), ``formatar_data``
+(ISO -> DD/MM/AAAA, mantendo o valor original se não for data) e
+``obter_nome_cliente`` ("nome sobrenome" ou "Cliente <id>").
+"""
+import pandas as pd
+
+
+def _serie(valores):
+    return valores if isinstance(valores, pd.Series) else pd.Series(list(valores), dtype=object)
+
+
+def para_decimal(valores, padrao=0.0):
+    """Converte para float aceitando vírgula decimal ("12,50") e milhar ("1.234,56")."""
+    serie = _serie(valores)
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.astype(float).fillna(padrao)
+    texto = serie.astype(str).str.strip()
+    # Com vírgula e ponto no mesmo número, o ponto é separador de milhar
+    milhar = texto.str.contains(",", regex=False) & texto.str.contains(".", regex=False)
+    texto = texto.where(~milhar, texto.str.replace(".", "", regex=False))
+    numeros = pd.to_numeric(texto.str.replace(",", ".", regex=False), errors="coerce")
+    return numeros.where(serie.notna()).fillna(padrao).astype(float)
+
+
+def sub_total(df, campo_qtd="qtd", campo_valor="Valor_Prod"):
+    """``qtd * valor`` de cada linha (0 onde faltar a coluna ou o número)."""
+    if df.empty or campo_qtd not in df.columns or campo_valor not in df.columns:
+        return pd.Series(0.0, index=df.index)
+    return para_decimal(df[campo_qtd]) * para_decimal(df[campo_valor])
+
+
+def total(dados, coluna=None):
+    """Soma de uma coluna (ou Series) de valores, ignorando o que não for número."""
+    if coluna is not None:
+        if dados.empty or coluna not in dados.columns:
+            return 0.0
+        dados = dados[coluna]
+    return float(para_decimal(dados).sum())
+
+
+def formatar_datas(valores):
+    """Datas ISO ("2024-01-05" ou "2024-01-05T03:00:00.000Z") para DD/MM/AAAA."""
+    serie = _serie(valores)
+    datas = pd.to_datetime(serie.astype(str).str.split("T").str[0], format="%Y-%m-%d", errors="coerce")
+    # O que não é data fica como veio (vazio para None/NaN)
+    return datas.dt.strftime("%d/%m/%Y").where(datas.notna(), serie.where(serie.notna(), ""))
+
+
+def mapa_por_id(registros, campo, chave="id"):
+    """``{str(chave): campo}`` a partir de uma lista de dicts (índice para ``map``)."""
+    return {
+        str(r.get(chave)): r.get(campo)
+        for r in (registros or []) if isinstance(r, dict) and r.get(chave) is not None
+    }
+
+
+def nomes_clientes(ids, clientes):
+    """Nome completo do cliente de cada id ("Cliente <id>" se não encontrado)."""
+    ids = _serie(ids)
+    nomes = {
+        str(c.get("id")): f"{c.get('nome', '')} {c.get('sobrenome', '')}"
+        for c in (clientes or []) if isinstance(c, dict)
+    }
+    encontrados = ids.astype(str).map(nomes)
+    return encontrados.where(encontrados.notna(), "Cliente " + ids.astype(str))
+
+
+def nomes_produtos(ids, produtos, campo="nome_Prod", chave="id_Prod"):
+    """Nome do produto de cada id ("Produto <id>" se não encontrado)."""
+    ids = _serie(ids)
+    encontrados = ids.astype(str).map(mapa_por_id(produtos, campo, chave))
+    return encontrados.where(encontrados.notna(), "Produto " + ids.astype(str))
+
+
+def juntar_produtos(df, produtos, campos=("nome_Prod", "Valor_Prod"), chave="id_Prod"):
+    """Acrescenta ``campos`` do produto a cada linha por ``map`` no id.
+
+    Equivale ao ``pd.merge(..., how='left')`` que as views faziam, sem
+    duplicar linhas; colunas que o DataFrame já tem são mantidas.
+    """
+    if df.empty or chave not in df.columns:
+        return df
+    df = df.copy()
+    ids = df[chave].astype(str)
+    for campo in campos:
+        if campo not in df.columns:
+            df[campo] = ids.map(mapa_por_id(produtos, campo, chave))
+    return df
+
+
+def linhas_texto(df, campos):
+    """Tuplas com os valores (texto) de ``campos`` em cada linha, para desenhar no PDF."""
+    if df.empty:
+        return []
+    tabela = pd.DataFrame(
+        {c: (df[c].astype(str) if c in df.columns else "") for c in campos}, index=df.index
+    )
+    return list(tabela.itertuples(index=False, name=None))
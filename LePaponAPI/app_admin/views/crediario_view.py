@@ -1,12 +1,16 @@
 import flet as ft
 from models.crediario_api import CrediarioAPI
 from models.clientes_api import ClientesAPI
+from models.indices import ClienteIndex
 from models.produtos_todos_api import ProdutosTodosAPI
 from models.enviar_conta_cliente import EnviarContaCliente
 # from models.salvar_res_whatsapp import WhatsAppMessageSaver
 from models.recebido_api import RecebidoAPI
 import datetime
 import pandas as pd
+from utils import transformacoes
+from utils.tabela_paginada import TabelaPaginada
+from utils.autocompletar import Autocompletar
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 import tempfile
@@ -72,13 +76,21 @@ def crediario_view(page: ft.Page):
             clientes = [clientes] if clientes else []
     except Exception:
         clientes = []
-    opcoes_clientes = [ft.dropdown.Option(text=f"{c.get('id', '')} - {c.get('nome', '')} - {c.get('sobrenome', '')}", key=str(c.get('id', ''))) for c in clientes if isinstance(c, dict)]
+    indice_clientes = ClienteIndex(clientes)
     dropdown_clientes = ft.Dropdown(
-        options=opcoes_clientes,
         label="Selecionar Cliente",
         width=350,
         on_change=lambda e: filtrar_crediario_periodo()
     )
+    # Opções reaproveitadas por id do cliente; a busca roda quando a digitação para
+    texto_opcao_cliente = lambda c: f"{c.get('id', '')} - {c.get('nome', '')} - {c.get('sobrenome', '')}"
+    autocompletar_clientes = Autocompletar(
+        page, dropdown_clientes, indice_clientes,
+        lambda chave, c: ft.dropdown.Option(text=texto_opcao_cliente(c), key=chave),
+        lambda opcao, c: setattr(opcao, "text", texto_opcao_cliente(c)),
+        atributo="options",
+    )
+    dropdown_clientes.options = autocompletar_clientes.montar()
     # Caixa de seleção para filtrar por pago
     dropdown_pago = ft.Dropdown(
         options=[
@@ -93,7 +105,7 @@ def crediario_view(page: ft.Page):
     total_crediario_label = ft.Text("Total do período: 0.00", style=ft.TextThemeStyle.TITLE_MEDIUM, width=250)
     saldo_recebido = ft.Text("Saldo Recebido: 0.00", style=ft.TextThemeStyle.TITLE_MEDIUM, width=250)
     saldo_devedor = ft.Text("Saldo Devedor: 0.00", style=ft.TextThemeStyle.TITLE_MEDIUM, width=250)
-    tabela_ref = ft.Ref[ft.DataTable]()
+    tabela = TabelaPaginada(page)
 
     def filtrar_crediario_periodo():
         di = data_inicial.value
@@ -114,15 +126,7 @@ def crediario_view(page: ft.Page):
                 produtos_todos = [produtos_todos] if produtos_todos else []
             # Converte para DataFrame
             crediario_df = pd.DataFrame(crediarios)
-            produtos_df = pd.DataFrame(produtos_todos)
-            # Faz o merge pelo campo de produto (ajuste o nome se necessário)
-            if not crediario_df.empty and not produtos_df.empty:
-                merged_df = crediario_df.merge(
-                    produtos_df[['id_Prod', 'nome_Prod', 'Valor_Prod']],
-                    left_on='id_Prod', right_on='id_Prod', how='left'
-                )
-            else:
-                merged_df = crediario_df
+            merged_df = transformacoes.juntar_produtos(crediario_df, produtos_todos)
             # Filtra por data e cliente (se selecionado)
             crediarios_periodo = merged_df[(merged_df['data'] >= di_str) & (merged_df['data'] <= df_str)]
             if cliente_id:
@@ -150,40 +154,15 @@ def crediario_view(page: ft.Page):
             if not crediarios_periodo.empty:
                 crediarios_periodo = crediarios_periodo.copy()
                 if 'data' in crediarios_periodo.columns:
-                    def formatar_data(d):
-                        try:
-                            # Tenta extrair apenas a parte da data (YYYY-MM-DD)
-                            data_str = str(d).split('T')[0]
-                            return datetime.datetime.strptime(data_str, '%Y-%m-%d').strftime('%d/%m/%Y')
-                        except Exception:
-                            return d or ''
-                    crediarios_periodo['data'] = crediarios_periodo['data'].apply(formatar_data)
+                    crediarios_periodo['data'] = transformacoes.formatar_datas(crediarios_periodo['data'])
             # Garante que a coluna de subtotal calculado existe
             if not crediarios_periodo.empty:
                 if 'sub_total_calc' not in crediarios_periodo.columns:
-                    crediarios_periodo['sub_total_calc'] = crediarios_periodo.apply(
-                        lambda row: float(row.get('qtd', 0)) * float(str(row.get('Valor_Prod', 0)).replace(",", ".")), axis=1
-                    )
-            # Seleciona apenas os campos desejados
-            if not crediarios_periodo.empty:
-                crediarios_periodo = crediarios_periodo[campos_exibir]
-                columns = [ft.DataColumn(ft.Text(colunas_legenda[c])) for c in campos_exibir]
-            else:
-                columns = [ft.DataColumn(ft.Text("Data"))]
-            rows = []
-            total = 0.0
-            for _, cred in crediarios_periodo.iterrows():
-                row = [ft.DataCell(ft.Text(str(cred.get(c, "")))) for c in campos_exibir]
-                rows.append(ft.DataRow(row))
-                try:
-                    total += float(str(cred.get("sub_total_calc", 0)).replace(",", "."))
-                except:
-                    pass
+                    crediarios_periodo['sub_total_calc'] = transformacoes.sub_total(crediarios_periodo)
+            # Só a página visível vira DataRow; o total usa o período inteiro
+            tabela.mostrar(crediarios_periodo, campos_exibir, colunas_legenda)
+            total = transformacoes.total(crediarios_periodo, 'sub_total_calc')
             #print(f"Total calculado: {total}")
-            if not rows:
-                rows = [ft.DataRow([ft.DataCell(ft.Text("")) for _ in columns])]
-            tabela_ref.current.columns = columns
-            tabela_ref.current.rows = rows
             # Atualiza saldo recebido e devedor
             saldoRecebido = float(get_saldo_recebido_por_cliente(cliente_id) if cliente_id else 0.0)
             saldoDevedor = total - saldoRecebido
@@ -197,8 +176,6 @@ def crediario_view(page: ft.Page):
             msg.visible = True
             page.update()
 
-    # Inicializa tabela vazia
-    tabela = ft.DataTable(ref=tabela_ref, columns=[ft.DataColumn(ft.Text("id"))], rows=[])
     # Carrega crediário do dia atual ao abrir
     filtrar_crediario_periodo()
 
@@ -208,12 +185,7 @@ def crediario_view(page: ft.Page):
         on_change=lambda e: filtrar_opcoes_clientes()
     )
     def filtrar_opcoes_clientes():
-        nome_filtro = (filtro_nome.value or "").lower()
-        dropdown_clientes.options = [
-            ft.dropdown.Option(text=f"{c.get('id', '')} - {c.get('nome', '')} - {c.get('sobrenome', '')}", key=str(c.get('id', '')))
-            for c in clientes if isinstance(c, dict) and nome_filtro in str(c.get('nome', '')).lower()
-        ]
-        page.update()
+        autocompletar_clientes.ao_digitar(filtro_nome.value)
 
     def exportar_pdf():
         try:
@@ -231,14 +203,7 @@ def crediario_view(page: ft.Page):
             if not isinstance(produtos_todos, list):
                 produtos_todos = [produtos_todos] if produtos_todos else []
             crediario_df = pd.DataFrame(crediarios)
-            produtos_df = pd.DataFrame(produtos_todos)
-            if not crediario_df.empty and not produtos_df.empty:
-                merged_df = crediario_df.merge(
-                    produtos_df[['id_Prod', 'nome_Prod', 'Valor_Prod']],
-                    left_on='id_Prod', right_on='id_Prod', how='left'
-                )
-            else:
-                merged_df = crediario_df
+            merged_df = transformacoes.juntar_produtos(crediario_df, produtos_todos)
             crediarios_periodo = merged_df[(merged_df['data'] >= di_str) & (merged_df['data'] <= df_str)]
             if cliente_id:
                 crediarios_periodo = crediarios_periodo[crediarios_periodo['id_cliente'].astype(str) == cliente_id]
@@ -263,20 +228,12 @@ def crediario_view(page: ft.Page):
             if not crediarios_periodo.empty:
                 crediarios_periodo = crediarios_periodo.copy()
                 if 'data' in crediarios_periodo.columns:
-                    def formatar_data(d):
-                        try:
-                            data_str = str(d).split('T')[0]
-                            return datetime.datetime.strptime(data_str, '%Y-%m-%d').strftime('%d/%m/%Y')
-                        except Exception:
-                            return d or ''
-                    crediarios_periodo['data'] = crediarios_periodo['data'].apply(formatar_data)
+                    crediarios_periodo['data'] = transformacoes.formatar_datas(crediarios_periodo['data'])
                 if 'sub_total_calc' not in crediarios_periodo.columns:
-                    crediarios_periodo['sub_total_calc'] = crediarios_periodo.apply(
-                        lambda row: float(row.get('qtd', 0)) * float(str(row.get('Valor_Prod', 0)).replace(",", ".")), axis=1
-                    )
+                    crediarios_periodo['sub_total_calc'] = transformacoes.sub_total(crediarios_periodo)
                 # Geração do PDF
                 if cliente_id:
-                    cliente_nome = next((c.get('nome', '') + ' ' + c.get('sobrenome', '') for c in clientes if str(c.get('id', '')) == str(cliente_id)), f'cliente_{cliente_id}')
+                    cliente_nome = indice_clientes.nome_completo(cliente_id, f'cliente_{cliente_id}')
                 else:
                     cliente_nome = 'todos_clientes'
                 # Remove caracteres inválidos do nome do cliente para pasta
@@ -316,9 +273,9 @@ def crediario_view(page: ft.Page):
                     c.drawString(x_positions[i], y, colunas_legenda[campo])
                 y -= 20
                 # Dados
-                for _, row in crediarios_periodo.iterrows():
-                    for i, campo in enumerate(campos_exibir):
-                        c.drawString(x_positions[i], y, str(row.get(campo, "")))
+                for valores in transformacoes.linhas_texto(crediarios_periodo, campos_exibir):
+                    for i, valor in enumerate(valores):
+                        c.drawString(x_positions[i], y, valor)
                     y -= 18
                     if y < 60:
                         c.showPage()
@@ -373,7 +330,7 @@ def crediario_view(page: ft.Page):
                 page.update()
                 return
             # Nome do cliente e nome do arquivo
-            cliente_nome = next((c.get('nome', '') + ' ' + c.get('sobrenome', '') for c in clientes if str(c.get('id', '')) == str(cliente_id)), f'cliente_{cliente_id}')
+            cliente_nome = indice_clientes.nome_completo(cliente_id, f'cliente_{cliente_id}')
             cliente_nome_pasta = re.sub(r'[^a-zA-Z0-9_\-]', '_', cliente_nome)
             data_pdf = datetime.datetime.now().strftime('%Y-%m-%d')
             pdf_path = os.path.join(os.path.dirname(__file__), '../Crediario', cliente_nome_pasta, f'{cliente_nome_pasta}_{data_pdf}.pdf')
@@ -381,7 +338,7 @@ def crediario_view(page: ft.Page):
             #data_pdf = '2025-06-15'
             pdf_url = "https://lepapon.com.br/api/pdf/"+ cliente_nome_pasta + '_' + data_pdf + ".pdf"
             # Número do cliente (ajuste para buscar do cadastro se necessário)
-            numero_cliente = next((c.get('telefone', '') for c in clientes if str(c.get('id', '')) == str(cliente_id)), None)
+            numero_cliente = indice_clientes.telefone(cliente_id)
             if not numero_cliente:
                 msg.value = "Telefone do cliente não encontrado."
                 msg.color = "red"
@@ -446,12 +403,8 @@ def crediario_view(page: ft.Page):
             if not isinstance(produtos_todos, list):
                 produtos_todos = [produtos_todos] if produtos_todos else []
             crediario_df = pd.DataFrame(crediarios)
-            produtos_df = pd.DataFrame(produtos_todos)
-            if not crediario_df.empty and not produtos_df.empty:
-                crediario_df = crediario_df.merge(
-                    produtos_df[['id_Prod', 'Valor_Prod']],
-                    left_on='id_Prod', right_on='id_Prod', how='left'
-                )
+            if not crediario_df.empty:
+                crediario_df = transformacoes.juntar_produtos(crediario_df, produtos_todos, campos=('Valor_Prod',))
                 # Atualiza os itens com o novo Valor_Prod
                 crediarios = crediario_df.to_dict(orient='records')
             # Filtra do cliente e não pagos
@@ -618,7 +571,7 @@ def crediario_view(page: ft.Page):
             botao_limpar_pdfs
         ]),
         ft.Column(controls=[
-            tabela,
+            tabela.controle,
             ft.Divider(),
             msg
         ]
@@ -15,7 +15,8 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../utils'))
 from utils.base_view import BaseView
 from utils.pdf_generator import PDFGenerator
-from utils.common_utils import BASE_URL, parse_float, formatar_data, obter_nome_cliente, sanitize_filename, get_current_datetime
+from utils import transformacoes
+from utils.common_utils import BASE_URL, parse_float, obter_nome_cliente, sanitize_filename, get_current_datetime
 
 # APIs
 crediario_api = CrediarioAPI(BASE_URL)
@@ -62,7 +63,10 @@ def crediario_view(page: ft.Page):
     # Controles específicos do crediário
     total_crediario_label = ft.Text("Total do período: 0.00", style=ft.TextThemeStyle.TITLE_MEDIUM, width=250)
     saldo_cliente_label = ft.Text("Saldo recebido do cliente: 0.00", style=ft.TextThemeStyle.TITLE_SMALL, width=300)
-    tabela_ref = ft.Ref[ft.DataTable]()
+    tabela = view_helper.criar_tabela_paginada(
+        show_checkbox_column=False,
+        heading_row_height=40
+    )
 
     def filtrar_crediario_periodo():
         di = data_inicial.value
@@ -95,26 +99,18 @@ def crediario_view(page: ft.Page):
                 if not isinstance(produtos, list):
                     produtos = [produtos] if produtos else []
                 
-                produtos_dict = {str(p.get('id', '')): p for p in produtos if isinstance(p, dict)}
-                
-                def obter_nome_produto(produto_id):
-                    produto = produtos_dict.get(str(produto_id), {})
-                    return produto.get('nome', f'Produto {produto_id}')
-                
                 crediario_periodo = crediario_periodo.copy()
-                crediario_periodo['nome_produto'] = crediario_periodo['id_produto'].apply(obter_nome_produto)
+                crediario_periodo['nome_produto'] = transformacoes.nomes_produtos(
+                    crediario_periodo['id_produto'], produtos, campo='nome', chave='id'
+                )
             except Exception:
-                crediario_periodo['nome_produto'] = crediario_periodo['id_produto'].apply(lambda x: f'Produto {x}')
+                crediario_periodo['nome_produto'] = 'Produto ' + crediario_periodo['id_produto'].astype(str)
         
         # Formata dados para exibição
         crediario_exibir = view_helper.formatar_dados_exibicao(crediario_periodo, campos_exibir)
         
-        # Cria a tabela
-        columns, rows = view_helper.criar_tabela_datatable(crediario_exibir, campos_exibir, colunas_legenda)
-        
-        # Atualiza a tabela
-        tabela_ref.current.columns = columns
-        tabela_ref.current.rows = rows
+        # Atualiza a tabela (só a página visível é montada)
+        tabela.mostrar(crediario_exibir, campos_exibir, colunas_legenda)
         
         # Calcula e exibe o total
         total = view_helper.calcular_total(crediario_periodo, 'total')
@@ -158,23 +154,17 @@ def crediario_view(page: ft.Page):
                 if not isinstance(produtos, list):
                     produtos = [produtos] if produtos else []
                 
-                produtos_dict = {str(p.get('id', '')): p for p in produtos if isinstance(p, dict)}
-                
-                def obter_nome_produto(produto_id):
-                    produto = produtos_dict.get(str(produto_id), {})
-                    return produto.get('nome', f'Produto {produto_id}')
-                
                 crediario_periodo = crediario_periodo.copy()
-                crediario_periodo['nome_produto'] = crediario_periodo['id_produto'].apply(obter_nome_produto)
+                crediario_periodo['nome_produto'] = transformacoes.nomes_produtos(
+                    crediario_periodo['id_produto'], produtos, campo='nome', chave='id'
+                )
             except Exception:
-                crediario_periodo['nome_produto'] = crediario_periodo['id_produto'].apply(lambda x: f'Produto {x}')
+                crediario_periodo['nome_produto'] = 'Produto ' + crediario_periodo['id_produto'].astype(str)
             
             # Formata dados para PDF
             df_pdf = crediario_periodo.copy()
-            df_pdf['data'] = df_pdf['data'].apply(formatar_data)
-            df_pdf['nome_cliente'] = df_pdf['id_cliente'].apply(
-                lambda x: obter_nome_cliente(view_helper.clientes, x)
-            )
+            df_pdf['data'] = transformacoes.formatar_datas(df_pdf['data'])
+            df_pdf['nome_cliente'] = transformacoes.nomes_clientes(df_pdf['id_cliente'], view_helper.clientes)
             
             # Configurações do PDF
             colunas_legenda = {
@@ -244,22 +234,16 @@ def crediario_view(page: ft.Page):
                 if not isinstance(produtos, list):
                     produtos = [produtos] if produtos else []
                 
-                produtos_dict = {str(p.get('id', '')): p for p in produtos if isinstance(p, dict)}
-                
-                def obter_nome_produto(produto_id):
-                    produto = produtos_dict.get(str(produto_id), {})
-                    return produto.get('nome', f'Produto {produto_id}')
-                
                 crediario_periodo = crediario_periodo.copy()
-                crediario_periodo['nome_produto'] = crediario_periodo['id_produto'].apply(obter_nome_produto)
+                crediario_periodo['nome_produto'] = transformacoes.nomes_produtos(
+                    crediario_periodo['id_produto'], produtos, campo='nome', chave='id'
+                )
             except Exception:
-                crediario_periodo['nome_produto'] = crediario_periodo['id_produto'].apply(lambda x: f'Produto {x}')
+                crediario_periodo['nome_produto'] = 'Produto ' + crediario_periodo['id_produto'].astype(str)
             
             df_pdf = crediario_periodo.copy()
-            df_pdf['data'] = df_pdf['data'].apply(formatar_data)
-            df_pdf['nome_cliente'] = df_pdf['id_cliente'].apply(
-                lambda x: obter_nome_cliente(view_helper.clientes, x)
-            )
+            df_pdf['data'] = transformacoes.formatar_datas(df_pdf['data'])
+            df_pdf['nome_cliente'] = transformacoes.nomes_clientes(df_pdf['id_cliente'], view_helper.clientes)
             
             # Gera PDF temporário
             colunas_legenda = {
@@ -285,7 +269,7 @@ def crediario_view(page: ft.Page):
             )
             
             # Busca dados do cliente
-            cliente = next((c for c in view_helper.clientes if str(c.get('id', '')) == str(cliente_id)), None)
+            cliente = view_helper.indice_clientes.get(cliente_id)
             if not cliente:
                 view_helper.mostrar_mensagem("Cliente não encontrado.", "red")
                 return
@@ -360,14 +344,6 @@ def crediario_view(page: ft.Page):
         except Exception as e:
             view_helper.mostrar_mensagem(f"Erro ao enviar via WhatsApp: {e}", "red")
 
-    # Inicializa tabela vazia
-    tabela_ref.current = ft.DataTable(
-        columns=[ft.DataColumn(ft.Text("Data"))],
-        rows=[ft.DataRow([ft.DataCell(ft.Text(""))])],
-        show_checkbox_column=False,
-        heading_row_height=40
-    )
-    
     # Layout da view
     content = ft.Column([
         # Título
@@ -394,7 +370,7 @@ def crediario_view(page: ft.Page):
         
         # Tabela
         ft.Container(
-            content=tabela_ref.current,
+            content=tabela.controle,
             height=400,
             border=ft.border.all(1),
             border_radius=8,
@@ -1,6 +1,7 @@
 import flet as ft
 from models.recebido_api import RecebidoAPI
 from models.clientes_api import ClientesAPI
+from models.indices import ClienteIndex
 import datetime
 import pandas as pd
 import os
@@ -12,6 +13,9 @@ from reportlab.lib.pagesizes import A4
 # Importa as novas classes utilitárias
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../utils'))
 from utils.base_view import BaseView
+from utils.tabela_paginada import TabelaPaginada
+from utils.autocompletar import Autocompletar
+from utils import transformacoes
 from utils.pdf_generator import PDFGenerator
 from utils.common_utils import BASE_URL, parse_float, formatar_data, obter_nome_cliente, sanitize_filename
 
@@ -44,16 +48,24 @@ def recebido_view(page: ft.Page):
             clientes = [clientes] if clientes else []
     except Exception:
         clientes = []
-    opcoes_clientes = [ft.dropdown.Option(text=f"{c.get('id', '')} - {c.get('nome', '')} - {c.get('sobrenome', '')}", key=str(c.get('id', ''))) for c in clientes if isinstance(c, dict)]
+    indice_clientes = ClienteIndex(clientes)
     dropdown_clientes = ft.Dropdown(
-        options=opcoes_clientes,
         label="Selecionar Cliente",
         width=350,
         on_change=lambda e: filtrar_recebidos_periodo()
     )
+    # Opções reaproveitadas por id do cliente; a busca roda quando a digitação para
+    texto_opcao_cliente = lambda c: f"{c.get('id', '')} - {c.get('nome', '')} - {c.get('sobrenome', '')}"
+    autocompletar_clientes = Autocompletar(
+        page, dropdown_clientes, indice_clientes,
+        lambda chave, c: ft.dropdown.Option(text=texto_opcao_cliente(c), key=chave),
+        lambda opcao, c: setattr(opcao, "text", texto_opcao_cliente(c)),
+        atributo="options",
+    )
+    dropdown_clientes.options = autocompletar_clientes.montar()
     
     total_recebidos_label = ft.Text("Total do período: 0.00", style=ft.TextThemeStyle.TITLE_MEDIUM, width=250)
-    tabela_ref = ft.Ref[ft.DataTable]()
+    tabela = TabelaPaginada(page)
 
     def filtrar_recebidos_periodo():
         di = data_inicial.value
@@ -100,47 +112,16 @@ def recebido_view(page: ft.Page):
             if not recebidos_periodo.empty:
                 recebidos_periodo = recebidos_periodo.copy()
                 if 'data' in recebidos_periodo.columns:
-                    def formatar_data(d):
-                        try:
-                            data_str = str(d).split('T')[0]
-                            return datetime.datetime.strptime(data_str, '%Y-%m-%d').strftime('%d/%m/%Y')
-                        except Exception:
-                            return d or ''
-                    recebidos_periodo['data'] = recebidos_periodo['data'].apply(formatar_data)
+                    recebidos_periodo['data'] = transformacoes.formatar_datas(recebidos_periodo['data'])
                 
                 # Adiciona nome do cliente
                 if 'id_cliente' in recebidos_periodo.columns:
-                    def obter_nome_cliente(cliente_id):
-                        cliente = next((c for c in clientes if str(c.get('id', '')) == str(cliente_id)), None)
-                        if cliente:
-                            return f"{cliente.get('nome', '')} {cliente.get('sobrenome', '')}"
-                        return f"Cliente {cliente_id}"
-                    recebidos_periodo['nome_cliente'] = recebidos_periodo['id_cliente'].apply(obter_nome_cliente)
-            
-            # Seleciona apenas os campos desejados
-            if not recebidos_periodo.empty and all(campo in recebidos_periodo.columns for campo in campos_exibir):
-                recebidos_periodo = recebidos_periodo[campos_exibir]
-                columns = [ft.DataColumn(ft.Text(colunas_legenda[c])) for c in campos_exibir]
-            else:
-                columns = [ft.DataColumn(ft.Text("Data"))]
-            
-            rows = []
-            total = 0.0
-            
-            if not recebidos_periodo.empty:
-                for _, recebido in recebidos_periodo.iterrows():
-                    row = [ft.DataCell(ft.Text(str(recebido.get(c, "")))) for c in campos_exibir]
-                    rows.append(ft.DataRow(row))
-                    try:
-                        total += float(str(recebido.get("valor", 0)).replace(",", "."))
-                    except:
-                        pass
+                    recebidos_periodo['nome_cliente'] = transformacoes.nomes_clientes(recebidos_periodo['id_cliente'], clientes)
             
-            if not rows:
-                rows = [ft.DataRow([ft.DataCell(ft.Text("")) for _ in columns])]
+            # Só a página visível vira DataRow; o total usa o período inteiro
+            tabela.mostrar(recebidos_periodo, campos_exibir, colunas_legenda)
+            total = transformacoes.total(recebidos_periodo, 'valor')
             
-            tabela_ref.current.columns = columns
-            tabela_ref.current.rows = rows
             total_recebidos_label.value = f"Total do período: {total:.2f}"
             page.update()
             
@@ -150,8 +131,6 @@ def recebido_view(page: ft.Page):
             msg.visible = True
             page.update()
 
-    # Inicializa tabela vazia
-    tabela = ft.DataTable(ref=tabela_ref, columns=[ft.DataColumn(ft.Text("Data"))], rows=[])
     # Carrega recebidos do dia atual ao abrir
     filtrar_recebidos_periodo()
 
@@ -162,12 +141,7 @@ def recebido_view(page: ft.Page):
     )
     
     def filtrar_opcoes_clientes():
-        nome_filtro = (filtro_nome.value or "").lower()
-        dropdown_clientes.options = [
-            ft.dropdown.Option(text=f"{c.get('id', '')} - {c.get('nome', '')} - {c.get('sobrenome', '')}", key=str(c.get('id', '')))
-            for c in clientes if isinstance(c, dict) and nome_filtro in str(c.get('nome', '')).lower()
-        ]
-        page.update()
+        autocompletar_clientes.ao_digitar(filtro_nome.value)
 
     def exportar_pdf():
         try:
@@ -206,26 +180,15 @@ def recebido_view(page: ft.Page):
             if not recebidos_periodo.empty:
                 recebidos_periodo = recebidos_periodo.copy()
                 if 'data' in recebidos_periodo.columns:
-                    def formatar_data(d):
-                        try:
-                            data_str = str(d).split('T')[0]
-                            return datetime.datetime.strptime(data_str, '%Y-%m-%d').strftime('%d/%m/%Y')
-                        except Exception:
-                            return d or ''
-                    recebidos_periodo['data'] = recebidos_periodo['data'].apply(formatar_data)
+                    recebidos_periodo['data'] = transformacoes.formatar_datas(recebidos_periodo['data'])
                 
                 # Adiciona nome do cliente
                 if 'id_cliente' in recebidos_periodo.columns:
-                    def obter_nome_cliente(cliente_id):
-                        cliente = next((c for c in clientes if str(c.get('id', '')) == str(cliente_id)), None)
-                        if cliente:
-                            return f"{cliente.get('nome', '')} {cliente.get('sobrenome', '')}"
-                        return f"Cliente {cliente_id}"
-                    recebidos_periodo['nome_cliente'] = recebidos_periodo['id_cliente'].apply(obter_nome_cliente)
+                    recebidos_periodo['nome_cliente'] = transformacoes.nomes_clientes(recebidos_periodo['id_cliente'], clientes)
                 
                 # Geração do PDF
                 if cliente_id:
-                    cliente_nome = next((c.get('nome', '') + ' ' + c.get('sobrenome', '') for c in clientes if str(c.get('id', '')) == str(cliente_id)), f'cliente_{cliente_id}')
+                    cliente_nome = indice_clientes.nome_completo(cliente_id, f'cliente_{cliente_id}')
                 else:
                     cliente_nome = 'todos_clientes'
                 
@@ -275,9 +238,9 @@ def recebido_view(page: ft.Page):
                 y -= 20
                 
                 # Dados
-                for _, row in recebidos_periodo.iterrows():
-                    for i, campo in enumerate(campos_exibir):
-                        c.drawString(x_positions[i], y, str(row.get(campo, "")))
+                for valores in transformacoes.linhas_texto(recebidos_periodo, campos_exibir):
+                    for i, valor in enumerate(valores):
+                        c.drawString(x_positions[i], y, valor)
                     y -= 18
                     if y < 60:
                         c.showPage()
@@ -288,7 +251,7 @@ def recebido_view(page: ft.Page):
                     c.showPage()
                     y = height-40
                 c.setFont("Helvetica-Bold", 12)
-                c.drawString(40, y-10, f"Total do período: R$ {recebidos_periodo['valor'].astype(float).sum():.2f}")
+                c.drawString(40, y-10, f"Total do período: R$ {transformacoes.total(recebidos_periodo, 'valor'):.2f}")
                 c.save()
                 
                 msg.value = f"PDF gerado em: {pdf_path}"
@@ -321,7 +284,7 @@ def recebido_view(page: ft.Page):
             total_recebidos_label
         ]),
         ft.Column(controls=[
-            tabela,
+            tabela.controle,
             ft.Divider(),
             msg
         ], scroll=ft.ScrollMode.ALWAYS, height=600, width=900),
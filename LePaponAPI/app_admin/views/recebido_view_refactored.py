@@ -10,7 +10,8 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../utils'))
 from utils.base_view import BaseView
 from utils.pdf_generator import PDFGenerator
-from utils.common_utils import BASE_URL, parse_float, formatar_data, obter_nome_cliente, sanitize_filename
+from utils import transformacoes
+from utils.common_utils import BASE_URL, parse_float, obter_nome_cliente, sanitize_filename
 
 recebido_api = RecebidoAPI(BASE_URL)
 clientes_api = ClientesAPI(BASE_URL)
@@ -25,7 +26,11 @@ def recebido_view(page: ft.Page):
     filtro_nome = view_helper.criar_filtro_nome_cliente(dropdown_clientes)
     
     total_recebidos_label = ft.Text("Total do período: 0.00", style=ft.TextThemeStyle.TITLE_MEDIUM, width=250)
-    tabela_ref = ft.Ref[ft.DataTable]()
+    tabela = view_helper.criar_tabela_paginada(
+        show_checkbox_column=False,
+        heading_row_color=ft.Colors.GREY_200,
+        heading_row_height=40
+    )
 
     def filtrar_recebidos_periodo():
         di = data_inicial.value
@@ -50,12 +55,8 @@ def recebido_view(page: ft.Page):
         # Formata dados para exibição
         recebidos_exibir = view_helper.formatar_dados_exibicao(recebidos_periodo, campos_exibir)
         
-        # Cria a tabela
-        columns, rows = view_helper.criar_tabela_datatable(recebidos_exibir, campos_exibir, colunas_legenda)
-        
-        # Atualiza a tabela
-        tabela_ref.current.columns = columns
-        tabela_ref.current.rows = rows
+        # Atualiza a tabela (só a página visível é montada)
+        tabela.mostrar(recebidos_exibir, campos_exibir, colunas_legenda)
         
         # Calcula e exibe o total
         total = view_helper.calcular_total(recebidos_periodo, 'valor')
@@ -82,10 +83,8 @@ def recebido_view(page: ft.Page):
             
             # Formata dados para PDF
             df_pdf = recebidos_periodo.copy()
-            df_pdf['data'] = df_pdf['data'].apply(formatar_data)
-            df_pdf['nome_cliente'] = df_pdf['id_cliente'].apply(
-                lambda x: obter_nome_cliente(view_helper.clientes, x)
-            )
+            df_pdf['data'] = transformacoes.formatar_datas(df_pdf['data'])
+            df_pdf['nome_cliente'] = transformacoes.nomes_clientes(df_pdf['id_cliente'], view_helper.clientes)
             
             # Configurações do PDF
             colunas_legenda = {
@@ -163,15 +162,6 @@ def recebido_view(page: ft.Page):
         except Exception as e:
             view_helper.mostrar_mensagem(f"Erro ao adicionar recebimento: {e}", "red")
     
-    # Inicializa tabela vazia
-    tabela_ref.current = ft.DataTable(
-        columns=[ft.DataColumn(ft.Text("Data"))],
-        rows=[ft.DataRow([ft.DataCell(ft.Text(""))])],
-        show_checkbox_column=False,
-        heading_row_color=ft.Colors.GREY_200,
-        heading_row_height=40
-    )
-    
     # Layout da view
     content = ft.Column([
         # Título
@@ -203,7 +193,7 @@ def recebido_view(page: ft.Page):
         ft.Divider(),
         total_recebidos_label,
         ft.Container(
-            content=tabela_ref.current,
+            content=tabela.controle,
             height=400,
             border=ft.border.all(1, ft.Colors.OUTLINE),
             border_radius=8,
@@ -3,6 +3,8 @@ from models.vendas_api import VendasAPI
 from models.produtos_todos_api import ProdutosTodosAPI
 import datetime
 import pandas as pd
+from utils.tabela_paginada import TabelaPaginada
+from utils import transformacoes
 
 BASE_URL = "http://lepapon.novo:3000"
 vendas_api = VendasAPI(BASE_URL)
@@ -26,7 +28,7 @@ def vendas_view(page: ft.Page):
         hint_text="AAAA-MM-DD"
     )
     total_vendas_label = ft.Text("Total do período: 0.00", style=ft.TextThemeStyle.TITLE_MEDIUM)
-    tabela_ref = ft.Ref[ft.DataTable]()
+    tabela = TabelaPaginada(page, expand=True)
 
     def filtrar_vendas_periodo():
         di = data_inicial.value
@@ -46,24 +48,15 @@ def vendas_view(page: ft.Page):
                 produtos_todos = [produtos_todos] if produtos_todos else []
             # Converte para DataFrame
             vendas_df = pd.DataFrame(vendas)
-            produtos_df = pd.DataFrame(produtos_todos)
-            # Faz o merge pelo campo de produto (ajuste o nome se necessário)
-            if not vendas_df.empty and not produtos_df.empty:
-                merged_df = vendas_df.merge(
-                    produtos_df[['id_Prod', 'nome_Prod', 'Valor_Prod']],
-                    left_on='id_Prod', right_on='id_Prod', how='left'
-                )
-            else:
-                merged_df = vendas_df
+            # Nome e preço do produto por id (map, sem merge)
+            merged_df = transformacoes.juntar_produtos(vendas_df, produtos_todos)
             # Filtra por data
             vendas_periodo = merged_df[(merged_df['data'] >= di_str) & (merged_df['data'] <= df_str)]
             # Calcula sub_total e renomeia Valor_Prod para V_unit
             if not vendas_periodo.empty:
                 vendas_periodo = vendas_periodo.copy()
                 vendas_periodo['V_unit'] = vendas_periodo['Valor_Prod']
-                vendas_periodo['sub_total'] = vendas_periodo.apply(
-                    lambda row: float(row.get('qtd', 0)) * float(str(row.get('V_unit', 0)).replace(",", ".")), axis=1
-                )
+                vendas_periodo['sub_total'] = transformacoes.sub_total(vendas_periodo, 'qtd', 'V_unit')
             # Seleciona apenas os campos desejados na ordem correta
             campos_exibir = ['hora', 'qtd', 'nome_Prod', 'V_unit', 'sub_total']
             colunas_legenda = {
@@ -73,24 +66,9 @@ def vendas_view(page: ft.Page):
                 'V_unit': 'V_unit',
                 'sub_total': 'Subtotal'
             }
-            if not vendas_periodo.empty:
-                vendas_periodo = vendas_periodo[campos_exibir]
-                columns = [ft.DataColumn(ft.Text(colunas_legenda[c])) for c in campos_exibir]
-            else:
-                columns = [ft.DataColumn(ft.Text("Hora"))]
-            rows = []
-            total = 0.0
-            for _, venda in vendas_periodo.iterrows():
-                row = [ft.DataCell(ft.Text(str(venda.get(c, "")))) for c in campos_exibir]
-                rows.append(ft.DataRow(row))
-                try:
-                    total += float(str(venda.get("sub_total", 0)).replace(",", "."))
-                except:
-                    pass
-            if not rows:
-                rows = [ft.DataRow([ft.DataCell(ft.Text("")) for _ in columns])]
-            tabela_ref.current.columns = columns
-            tabela_ref.current.rows = rows
+            # Só a página visível vira DataRow; o total usa o período inteiro
+            tabela.mostrar(vendas_periodo, campos_exibir, colunas_legenda)
+            total = transformacoes.total(vendas_periodo, 'sub_total')
             total_vendas_label.value = f"Total do período: {total:.2f}"
             page.update()
         except Exception as e:
@@ -99,8 +77,6 @@ def vendas_view(page: ft.Page):
             msg.visible = True
             page.update()
 
-    # Inicializa tabela vazia
-    tabela = ft.DataTable(ref=tabela_ref, columns=[ft.DataColumn(ft.Text("id"))], rows=[], expand=True)
     # Carrega vendas do dia atual ao abrir
     filtrar_vendas_periodo()
 
@@ -112,7 +88,7 @@ def vendas_view(page: ft.Page):
             total_vendas_label
         ]),       
         ft.Column(
-            [tabela,        
+            [tabela.controle,
             msg,
             ft.Divider()],
             scroll=ft.ScrollMode.ALWAYS,